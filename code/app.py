@@ -1,4 +1,11 @@
+import time
+started_at = time.perf_counter()
 import streamlit as st
+from telemetry import startup_report
+from utils import get_metrics_server, start_warm_up
+
+# Time the imports of the first script run (later runs find the modules already loaded)
+startup_report.record("import app modules", time.perf_counter() - started_at)
 
 # Define the pages for the application with respective titles and icons
 create_page = st.Page("data_upload.py", title="Data Upload", icon=":material/add_circle:")  # Page for uploading CSV and PDF files
@@ -12,5 +19,12 @@ pg = st.navigation([create_page, delete_page, chat, faq])
 # Configure main page title and icon for the app
 st.set_page_config(page_title="RetainAI", page_icon="🤖")
 
-# Run the navigation to render the selected page content
-pg.run()
+# Serve the per-step workflow metrics for scraping (started once per process)
+get_metrics_server()
+
+# Load the LLM dependencies and build the document indexes in the background, so pages open right away
+start_warm_up()
+
+# Run the navigation to render the selected page content, timing the first render of each page
+with startup_report.timed(f"first render: {pg.title}"):
+    pg.run()
@@ -0,0 +1,64 @@
+import asyncio
+import time
+import pandas as pd
+
+
+# Employees above this attrition probability get a recommendation
+ATTRITION_THRESHOLD = 0.5
+
+# Default for the load batches put on the LLM endpoint: LLM requests started per minute
+REQUESTS_PER_MINUTE = 60
+
+
+class RateLimiter:
+    """
+    Spaces out LLM requests so that no more than a fixed number start per minute.
+
+    Requests are granted evenly spaced time slots in the order they ask for one, so bursts from
+    concurrently running workflows are smoothed out instead of hitting the endpoint at once.
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE):
+        """
+        Parameters:
+            requests_per_minute (float): Maximum number of requests started per minute.
+        """
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Waits until the next request slot is available."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def select_at_risk(df, threshold=ATTRITION_THRESHOLD):
+    """
+    Selects the employees at risk of attrition, highest risk first.
+
+    Parameters:
+        df (DataFrame): Employee data with an "Attrition Probability" column.
+        threshold (float): Probability above which an employee is considered at risk.
+
+    Returns:
+        DataFrame: The at-risk employees sorted by descending attrition probability.
+    """
+    return df[df["Attrition Probability"] > threshold].sort_values("Attrition Probability", ascending=False)
+
+
+def results_to_frame(results):
+    """
+    Converts batch result records into a table for display and download.
+
+    Parameters:
+        results (list): Result records with "Employee ID", "Full Name", "Attrition Probability",
+            "Recommendation" and "cache_key", e.g. from recommendation_jobs.batch_results().
+
+    Returns:
+        DataFrame: One row per employee with their attrition probability and recommendation.
+    """
+    columns = ["Employee ID", "Full Name", "Attrition Probability", "Recommendation"]
+    return pd.DataFrame(results, columns=columns + ["cache_key"])[columns]
@@ -0,0 +1,374 @@
+"""
+Micro-benchmarks for the non-LLM hot paths.
+
+Runs feature engineering, snapshot generation, column mapping, PDF creation and attrition prediction on
+synthetic employee data at increasing sizes, and reports the time and peak memory of each. Results can be
+saved as a baseline; later runs are compared against it and fail when a benchmark got slower than allowed.
+
+Example:
+    python benchmarks.py --save-baseline
+    python benchmarks.py --max-slowdown 1.3
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from functools import cached_property
+import numpy as np
+import pandas as pd
+from scoring import MODEL_PATH, load_attrition_model
+from snapshots import SnapshotEngine
+from utils import auto_map_columns, create_pdf, expected_columns_sets, feature_engineering, rename_and_filter_columns
+
+
+# Where the baseline timings are saved
+BASELINE_PATH = "/project/data/scratch/benchmark_baseline.json"
+
+# Employee counts each benchmark runs at
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+# A benchmark fails when it is this many times slower than its baseline...
+DEFAULT_MAX_SLOWDOWN = 1.5
+
+# ...and also slower by more than this many seconds, so timer noise on very fast benchmarks is ignored
+NOISE_FLOOR_SECONDS = 0.005
+
+# Values used to fill the synthetic employee data
+ROLES = ["Account Executive", "Sales Manager", "Software Engineer", "Data Analyst", "HR Specialist", "Director"]
+DEPARTMENTS = ["Sales", "IT", "HR", "Finance", "Marketing"]
+LOCATIONS = ["Remote", "Office-Based", "Hybrid"]
+FISCAL_QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+BENEFIT_CATEGORIES = ["Health Insurance", "Retirement Plan", "Gym Membership", "Learning Budget"]
+SURVEY_QUESTIONS = [
+    "How satisfied are you with your work-life balance?",
+    "Do you feel recognized for your contributions?",
+    "How likely are you to recommend the company as a place to work?",
+]
+REVIEW_SUMMARIES = [
+    "Consistently exceeds targets and mentors new team members.",
+    "Meets expectations but needs to improve communication with stakeholders.",
+    "Struggled with deadlines this quarter due to high workload.",
+]
+SURVEY_COMMENTS = [
+    "Long hours are affecting my personal life.",
+    "I enjoy working with my team.",
+    "I would like more opportunities for growth.",
+]
+
+# A recommendation of typical length, used for the PDF benchmark
+SAMPLE_RECOMMENDATION = (
+    "Recommendation: Adjust compensation to the industry benchmark. "
+    "Rationale: The employee's current salary is below the benchmark for the role and region. "
+) * 40
+
+
+class SyntheticData:
+    """
+    Synthetic employee data with the columns of expected_columns_sets.
+
+    The side tables have several rows per employee, like real review, benefits and survey exports,
+    and are only generated when a benchmark needs them.
+    """
+
+    def __init__(self, n_employees, seed=0):
+        """
+        Parameters:
+            n_employees (int): Number of employees.
+            seed (int): Seed of the random generator, so every run benchmarks the same data.
+        """
+        self.n_employees = n_employees
+        self.seed = seed
+
+    def _rng(self, offset):
+        return np.random.default_rng(self.seed + offset)
+
+    @cached_property
+    def employees(self):
+        """DataFrame: One row per employee."""
+        n = self.n_employees
+        rng = self._rng(0)
+        ids = np.arange(1, n + 1)
+        starting_salary = rng.normal(55_000, 12_000, n).round(-2)
+        df = pd.DataFrame({
+            "Employee ID": ids,
+            "Full Name": "Employee " + pd.Series(ids).astype(str),
+            "Gender": rng.choice(["Male", "Female"], n),
+            "Age": rng.integers(22, 65, n),
+            "Tenure": rng.integers(0, 20, n),
+            "Role": rng.choice(ROLES, n),
+            "Department": rng.choice(DEPARTMENTS, n),
+            "Starting Salary": starting_salary,
+            "Current Salary": (starting_salary * rng.uniform(1.0, 1.6, n)).round(-2),
+            "Location": rng.choice(LOCATIONS, n),
+            "Contract": rng.choice(["Full-time", "Part-time"], n),
+            "Years of Experience": rng.integers(1, 35, n),
+            "Average Monthly Working Hours": rng.normal(165, 20, n).round(1),
+            "Months in Role": rng.integers(1, 60, n),
+            "Promotion History": rng.integers(0, 5, n),
+            "Last Performance Review Score": rng.integers(1, 6, n),
+        })
+        return df[expected_columns_sets["employee"]]
+
+    @cached_property
+    def reviews(self):
+        """DataFrame: One performance review per employee and fiscal quarter."""
+        rng = self._rng(1)
+        ids = np.repeat(self.employees["Employee ID"].to_numpy(), len(FISCAL_QUARTERS))
+        df = pd.DataFrame({
+            "Employee ID": ids,
+            "Fiscal Quarter": np.tile(FISCAL_QUARTERS, self.n_employees),
+            "Score": rng.integers(1, 6, len(ids)),
+            "Performance Review Summary": rng.choice(REVIEW_SUMMARIES, len(ids)),
+        })
+        return df[expected_columns_sets["reviews"]]
+
+    @cached_property
+    def benefits(self):
+        """DataFrame: One enrollment status per employee and benefit category."""
+        rng = self._rng(2)
+        ids = np.repeat(self.employees["Employee ID"].to_numpy(), len(BENEFIT_CATEGORIES))
+        df = pd.DataFrame({
+            "Employee ID": ids,
+            "Category": np.tile(BENEFIT_CATEGORIES, self.n_employees),
+            "Enrollment Status": rng.random(len(ids)) < 0.6,
+        })
+        return df[expected_columns_sets["benefits"]]
+
+    @cached_property
+    def survey(self):
+        """DataFrame: One answer per employee and survey question."""
+        rng = self._rng(3)
+        ids = np.repeat(self.employees["Employee ID"].to_numpy(), len(SURVEY_QUESTIONS))
+        df = pd.DataFrame({
+            "Employee ID": ids,
+            "Question": np.tile(SURVEY_QUESTIONS, self.n_employees),
+            "Score": rng.integers(1, 6, len(ids)),
+            "Comment": rng.choice(SURVEY_COMMENTS, len(ids)),
+        })
+        return df[expected_columns_sets["survey"]]
+
+    @cached_property
+    def uploaded_employees(self):
+        """DataFrame: The employee data with column names as they might appear in an HRIS export."""
+        return self.employees.rename(columns=upload_column_names())
+
+
+def upload_column_names():
+    """
+    Returns:
+        dict: Mapping of expected employee column names to the variants used in the synthetic upload.
+    """
+    return {column: column.upper().replace(" ", "_") for column in expected_columns_sets["employee"]}
+
+
+def bench_feature_engineering(data, model_path):
+    """Feature engineering applied by the attrition pipeline before preprocessing."""
+    employees = data.employees
+    return lambda: feature_engineering(employees)
+
+
+def bench_employee_snapshot(data, model_path):
+    """Cold path of get_employee_snapshot: group the side tables, then render one employee."""
+    employees, reviews, benefits, survey = data.employees, data.reviews, data.benefits, data.survey
+    selected_row_df = employees.iloc[[len(employees) // 2]]
+    return lambda: SnapshotEngine(reviews, benefits, survey).snapshot(selected_row_df)
+
+
+def bench_employee_snapshots(data, model_path):
+    """Rendering every employee, as batch recommendations do, on an already grouped engine."""
+    engine = SnapshotEngine(data.reviews, data.benefits, data.survey)
+    employees = data.employees
+    return lambda: engine.employee_snapshots(employees)
+
+
+def bench_auto_map_columns(data, model_path):
+    """Fuzzy matching of an uploaded header to the expected employee columns."""
+    columns = list(data.uploaded_employees.columns)
+    return lambda: auto_map_columns(columns, expected_columns_sets["employee"])
+
+
+def bench_rename_and_filter_columns(data, model_path):
+    """Applying a column mapping to an uploaded employee file."""
+    uploaded = data.uploaded_employees
+    mappings = {variant: column for column, variant in upload_column_names().items()}
+    return lambda: rename_and_filter_columns(uploaded, mappings)
+
+
+def bench_create_pdf(data, model_path):
+    """Rendering a recommendation of typical length to PDF."""
+    return lambda: create_pdf(SAMPLE_RECOMMENDATION)
+
+
+def bench_predict_proba(data, model_path):
+    """Attrition prediction with the saved pipeline."""
+    model = load_attrition_model(model_path)
+    employees = data.employees
+    return lambda: model.predict_proba(employees)
+
+
+# Benchmarks by name: setup function and whether the work grows with the number of employees.
+# Setup functions build their inputs outside the timed region and return the callable to time.
+BENCHMARKS = {
+    "feature_engineering": (bench_feature_engineering, True),
+    "employee_snapshot": (bench_employee_snapshot, True),
+    "employee_snapshots": (bench_employee_snapshots, True),
+    "auto_map_columns": (bench_auto_map_columns, False),
+    "rename_and_filter_columns": (bench_rename_and_filter_columns, True),
+    "create_pdf": (bench_create_pdf, False),
+    "predict_proba": (bench_predict_proba, True),
+}
+
+
+def measure(func, repeats):
+    """
+    Times a function and measures its peak memory.
+
+    Time is the best of several runs without memory tracing; peak memory comes from one extra traced run.
+
+    Parameters:
+        func (callable): Function to benchmark.
+        repeats (int): Number of timed runs.
+
+    Returns:
+        dict: Best time in seconds and peak memory allocated during the call in MB.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_mb": peak / 2**20}
+
+
+def run_benchmarks(names, sizes, repeats=3, model_path=MODEL_PATH):
+    """
+    Runs benchmarks at the given employee counts.
+
+    Benchmarks whose work does not depend on the number of employees run only once, at the smallest size.
+
+    Parameters:
+        names (list): Names of the benchmarks to run (keys of BENCHMARKS).
+        sizes (list): Employee counts to run the benchmarks at.
+        repeats (int): Number of timed runs per benchmark.
+        model_path (str): Path of the saved attrition pipeline.
+
+    Yields:
+        tuple: Result key ("name@size") and the measured time and peak memory.
+    """
+    sizes = sorted(sizes)
+    for size in sizes:
+        data = SyntheticData(size)
+        for name in names:
+            setup, scales_with_rows = BENCHMARKS[name]
+            if not scales_with_rows and size != sizes[0]:
+                continue
+            yield f"{name}@{size}", measure(setup(data, model_path), repeats)
+
+
+def load_baseline(path):
+    """
+    Loads saved baseline results.
+
+    Parameters:
+        path (str): Path of the baseline JSON file.
+
+    Returns:
+        dict: Baseline results by key, empty if no baseline was saved.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)["results"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    """
+    Saves results as the new baseline, together with the machine they were measured on.
+
+    Parameters:
+        path (str): Path of the baseline JSON file.
+        results (dict): Results by key.
+    """
+    baseline = {
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+
+def is_regression(result, baseline, max_slowdown):
+    """
+    Checks whether a result is slower than its baseline by more than the allowed factor.
+
+    Parameters:
+        result (dict): Measured time and peak memory.
+        baseline (dict or None): Baseline time and peak memory, None if there is no baseline.
+        max_slowdown (float): Allowed ratio of measured to baseline time.
+
+    Returns:
+        bool: True if the benchmark regressed.
+    """
+    if baseline is None:
+        return False
+    return (result["seconds"] > baseline["seconds"] * max_slowdown
+            and result["seconds"] - baseline["seconds"] > NOISE_FLOOR_SECONDS)
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the non-LLM hot paths on synthetic employee data.")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="Employee counts to run at (default: 1000 10000 100000 1000000)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per benchmark (default: 3)")
+    parser.add_argument("--model", default=MODEL_PATH, help="Path of the saved attrition pipeline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Path of the baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help="Fail if a benchmark is this many times slower than its baseline (default: 1.5)")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+
+    print(f"{'benchmark':<40}{'seconds':>12}{'peak MB':>12}{'vs baseline':>14}")
+    for key, result in run_benchmarks(args.benchmarks, args.sizes, args.repeats, args.model):
+        results[key] = result
+        previous = baseline.get(key)
+        ratio = f"{result['seconds'] / previous['seconds']:.2f}x" if previous else "-"
+        flag = ""
+        if is_regression(result, previous, args.max_slowdown):
+            regressions.append(key)
+            flag = "  SLOWER"
+        print(f"{key:<40}{result['seconds']:>12.4f}{result['peak_mb']:>12.1f}{ratio:>14}{flag}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f"Saved baseline to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) more than {args.max_slowdown}x slower than baseline: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
 import streamlit as st
-from utils import get_chat_engine, get_query_engine, get_employee_snapshot, rename_and_filter_columns
+from utils import get_chat_engine, get_query_engine, get_team_context, rename_and_filter_columns, get_session_df
 from llama_index.core.llms import ChatMessage, MessageRole
 from llama_index.core import PromptTemplate
+from streaming import StreamMetrics, timed_stream, format_metrics
 
 # Main function for the chat interface
 def main():
@@ -9,7 +10,7 @@ def main():
     st.title("Retain AI: Chat")
     
     # Check if essential data is loaded; if not, prompt user to start with data upload
-    if "employee data_df" not in st.session_state and "employee_mappings" not in st.session_state:
+    if "employee data_handle" not in st.session_state and "employee_mappings" not in st.session_state:
         st.warning("Start with Data Upload tab to upload your files or use sample dataset")
         return
     
@@ -20,15 +21,9 @@ def main():
 
     # Load employee data, applying renaming and filtering based on mappings if not in demo mode
     df = (
-        st.session_state["employee data_df"]
+        get_session_df("employee data")
         if st.session_state["demo_mode"]
-        else rename_and_filter_columns(st.session_state["employee data_df"], st.session_state["employee_mappings"])
-    )
-
-    # Generate a full snapshot of all employees to provide necessary context for the LLM model
-    full_snapshot = "\n".join(
-        get_employee_snapshot(df.iloc[[index]]) 
-        for index, _ in df.iloc[:10].iterrows()
+        else rename_and_filter_columns(get_session_df("employee data"), st.session_state["employee_mappings"])
     )
 
     # Initialize chat messages history if it doesn't already exist
@@ -65,20 +60,23 @@ def main():
     )
     qa_template = PromptTemplate(template)
     
-    # Format the messages with context (employee snapshot) and user query
-    messages = qa_template.format_messages(context_str=full_snapshot, query_str=prompt)
-    
     # If last message is from the user, generate a response from the assistant
     if st.session_state.messages[-1]["role"] != "assistant":
+        query = st.session_state.messages[-1]["content"]
+
+        # Retrieve snapshots of only the employees relevant to the question as context for the LLM model
+        team_context = get_team_context(df, query)
+
+        # Format the messages with context (employee snapshots) and user query
+        messages = qa_template.format_messages(context_str=team_context, query_str=query)
+
         with st.chat_message("assistant"):
-            response = st.session_state.chat_engine.chat(messages)
+            metrics = StreamMetrics("chat")
+            response = st.session_state.chat_engine.stream_chat(messages)
 
-            # Stream the assistant's response to the UI as it is generated
-            placeholder = st.empty()
-            full_response = ""
-            for chunk in response.message.content:
-                full_response += chunk
-                placeholder.markdown(full_response)
+            # Stream the assistant's response to the UI token by token as it is generated
+            full_response = st.write_stream(timed_stream((chunk.delta for chunk in response), metrics))
+            st.caption(format_metrics(metrics))
             
             # Add the assistant's response to message history
             message = {"role": "assistant", "content": full_response}
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+import numpy as np
+from fuzzywuzzy import fuzz
+from scipy.optimize import linear_sum_assignment
+
+
+# Placeholder used for uploaded columns that have no matching expected column
+NO_MAPPING = "No mapping available"
+
+# JSON file with the confirmed mappings of previously seen file layouts
+PROFILES_PATH = "/project/data/scratch/mapping_profiles.json"
+
+# Guards the profiles file against concurrent sessions saving at the same time
+_profiles_lock = threading.Lock()
+
+
+def normalize_header(name):
+    """
+    Normalizes a column header for matching.
+
+    CamelCase, snake_case and punctuation are split into lowercase tokens, so "EmployeeID", "employee_id"
+    and "Employee ID" all normalize to "employee id".
+
+    Parameters:
+        name (str): Column header.
+
+    Returns:
+        str: The header's lowercase tokens joined by single spaces.
+    """
+    name = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(name))
+    name = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", name)
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def score_matrix(df_columns, expected_columns):
+    """
+    Scores every uploaded column against every expected column.
+
+    Headers are normalized once up front and each distinct pair is scored once, with the same WRatio scorer
+    fuzzywuzzy's extractOne uses by default.
+
+    Parameters:
+        df_columns (list): Uploaded column names.
+        expected_columns (list): Expected column names.
+
+    Returns:
+        ndarray: Scores from 0 to 100, one row per uploaded column and one column per expected column.
+    """
+    uploaded = [normalize_header(col) for col in df_columns]
+    expected = [normalize_header(col) for col in expected_columns]
+
+    scores = np.zeros((len(uploaded), len(expected)))
+    pair_scores = {}
+    for i, a in enumerate(uploaded):
+        for j, b in enumerate(expected):
+            if (a, b) not in pair_scores:
+                pair_scores[a, b] = 100 if a == b else fuzz.WRatio(a, b, full_process=False) if a and b else 0
+            scores[i, j] = pair_scores[a, b]
+    return scores
+
+
+@lru_cache(maxsize=256)
+def _solve_mapping(df_columns, expected_columns, threshold):
+    """Memoized assignment of uploaded to expected columns; arguments are tuples so they can be cached."""
+    scores = score_matrix(df_columns, expected_columns)
+    mappings = dict.fromkeys(df_columns, NO_MAPPING)
+    if scores.size == 0:
+        return mappings
+
+    # Pick the one-to-one assignment with the highest total score; pairs below the threshold never count
+    eligible = np.where(scores >= threshold, scores, 0)
+    rows, cols = linear_sum_assignment(eligible, maximize=True)
+    for i, j in zip(rows, cols):
+        if eligible[i, j] > 0:
+            mappings[df_columns[i]] = expected_columns[j]
+    return mappings
+
+
+def solve_mapping(df_columns, expected_columns, threshold=80):
+    """
+    Maps uploaded columns to expected columns by solving the assignment globally.
+
+    Unlike matching column by column, an early column can never take an expected column that a later column
+    matches better. Results are memoized, so reruns of the mapping dialog do not recompute them.
+
+    Parameters:
+        df_columns (list): Uploaded column names.
+        expected_columns (list): Expected column names.
+        threshold (int): Minimum matching score to accept.
+
+    Returns:
+        dict: Mapping of every uploaded column to an expected column or NO_MAPPING.
+    """
+    return dict(_solve_mapping(tuple(df_columns), tuple(expected_columns), threshold))
+
+
+def schema_fingerprint(df_columns, expected_columns):
+    """
+    Identifies a file layout: its exact column headers, in order, and the columns they are mapped to.
+
+    Parameters:
+        df_columns (list): Uploaded column names.
+        expected_columns (list): Expected column names.
+
+    Returns:
+        str: Hex digest identifying the layout.
+    """
+    payload = json.dumps([list(map(str, df_columns)), list(expected_columns)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_profiles(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_profile(df_columns, expected_columns, path=PROFILES_PATH):
+    """
+    Returns the confirmed mapping saved for a file layout.
+
+    Parameters:
+        df_columns (list): Uploaded column names.
+        expected_columns (list): Expected column names.
+        path (str): JSON file with the saved profiles.
+
+    Returns:
+        dict or None: The saved mapping, or None if this layout has not been mapped before.
+    """
+    return _load_profiles(path).get(schema_fingerprint(df_columns, expected_columns))
+
+
+def save_profile(df_columns, expected_columns, mappings, path=PROFILES_PATH):
+    """
+    Saves a confirmed mapping so the same file layout is mapped without the dialog next time.
+
+    Parameters:
+        df_columns (list): Uploaded column names.
+        expected_columns (list): Expected column names.
+        mappings (dict): Confirmed mapping of uploaded to expected columns.
+        path (str): JSON file with the saved profiles.
+    """
+    with _profiles_lock:
+        profiles = _load_profiles(path)
+        profiles[schema_fingerprint(df_columns, expected_columns)] = mappings
+
+        # Write atomically so a crash never leaves a truncated profiles file behind
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,347 @@
+"""
+Array-backed inference engine for the attrition pipeline.
+
+The fitted scikit-learn pipeline (FunctionTransformer(feature_engineering) -> ColumnTransformer with
+SimpleImputer/StandardScaler and SimpleImputer/OneHotEncoder -> RandomForestClassifier) is flattened into
+plain NumPy arrays: imputation statistics, scaling parameters and category lists for the preprocessor, and
+concatenated feature indices, thresholds, child pointers and leaf values for the forest. Prediction then
+runs vectorized over a whole batch without any per-estimator Python overhead.
+
+Probabilities match the pipeline's predict_proba bit for bit: features are cast to float32 exactly as the
+trees do, and tree outputs are accumulated in estimator order before dividing by the number of trees.
+
+Example:
+    python compiled_model.py /project/models/attrition_model_pipeline.joblib /project/models/attrition_model_compiled.npz
+"""
+import argparse
+import json
+import numpy as np
+import pandas as pd
+
+
+# Number of (tree, row) pairs traversed per vectorized step, which bounds the engine's working memory
+MAX_TRAVERSAL_CELLS = 4_000_000
+
+# Number of tree levels walked between removals of (tree, row) pairs that have reached a leaf
+COMPACTION_INTERVAL = 4
+
+# Columns the feature engineering step derives from the raw employee data
+ENGINEERED_COLUMNS = ["Salary Percentage Change", "Salary Raise Per Year", "Promotion Frequency"]
+
+
+def _engineer_features(df):
+    """
+    Vectorized equivalent of utils.feature_engineering, returning only the derived columns.
+
+    Parameters:
+        df (DataFrame): Employee data.
+
+    Returns:
+        dict: Derived column name to float64 array.
+    """
+    current = df["Current Salary"]
+    starting = df["Starting Salary"]
+    tenure = df["Tenure"].to_numpy()
+
+    # Avoid division by zero exactly like feature_engineering (non-positive or missing tenure -> epsilon)
+    adjusted_tenure = pd.Series(np.where(tenure > 0, tenure, 1e-6).astype(np.float64), index=df.index)
+
+    return {
+        "Salary Percentage Change": ((current - starting) / starting).to_numpy(np.float64),
+        "Salary Raise Per Year": ((current - starting) / adjusted_tenure).to_numpy(np.float64),
+        "Promotion Frequency": (df["Promotion History"] / adjusted_tenure).to_numpy(np.float64),
+    }
+
+
+class CompiledAttritionModel:
+    """
+    Flattened, NumPy-only version of the fitted attrition pipeline.
+
+    Use compile_pipeline() to build one from a fitted pipeline, save() / load() to persist it.
+    """
+
+    def __init__(self, arrays, spec):
+        """
+        Parameters:
+            arrays (dict): Forest and scaling arrays (see compile_pipeline).
+            spec (dict): JSON-serializable preprocessing specification and class labels.
+        """
+        self.arrays = arrays
+        self.spec = spec
+        self.classes_ = np.asarray(spec["classes"])
+        self._category_index = [
+            pd.Index(categories)
+            for block in spec["blocks"] if block["kind"] == "categorical"
+            for categories in block["categories"]
+        ]
+
+    def transform(self, df):
+        """
+        Applies feature engineering and preprocessing, producing the matrix the forest is fitted on.
+
+        Parameters:
+            df (DataFrame): Mapped employee data.
+
+        Returns:
+            ndarray: Float64 feature matrix of shape (n_rows, n_features).
+        """
+        engineered = _engineer_features(df)
+        n_rows = len(df)
+        blocks = []
+        category_index = iter(self._category_index)
+
+        for block in self.spec["blocks"]:
+            if block["kind"] == "numeric":
+                columns = [
+                    engineered[c] if c in engineered else df[c].to_numpy(np.float64) for c in block["columns"]
+                ]
+                values = np.column_stack(columns) if columns else np.empty((n_rows, 0))
+                statistics = self.arrays[f"{block['name']}_statistics"]
+                values = np.where(np.isnan(values), statistics, values)
+                if block["with_mean"]:
+                    values = values - self.arrays[f"{block['name']}_mean"]
+                if block["with_std"]:
+                    values = values / self.arrays[f"{block['name']}_scale"]
+                blocks.append(values)
+            else:
+                for j, column in enumerate(block["columns"]):
+                    values = df[column].to_numpy(dtype=object)
+
+                    # Impute NaN the way SimpleImputer does for object columns (x != x)
+                    missing = values != values
+                    if missing.any():
+                        values = np.where(missing, block["statistics"][j], values)
+
+                    categories = next(category_index)
+                    codes = categories.get_indexer(values)
+
+                    # One-hot encode; unknown categories are ignored (all zeros)
+                    onehot = np.zeros((n_rows, len(categories)), dtype=np.float64)
+                    known = codes >= 0
+                    onehot[np.flatnonzero(known), codes[known]] = 1.0
+                    blocks.append(onehot)
+
+        return np.hstack(blocks)
+
+    def _forest_proba(self, X):
+        """
+        Runs every tree over the rows of X and averages the leaf class probabilities.
+
+        Parameters:
+            X (ndarray): Float64 feature matrix.
+
+        Returns:
+            ndarray: Class probabilities of shape (n_rows, n_classes).
+        """
+        a = self.arrays
+        roots = a["tree_roots"]
+        n_trees = len(roots)
+        n_rows, n_features = X.shape
+
+        # Trees compare float32 features; thresholds were rounded down to float32 at export, which keeps
+        # x <= threshold exact for every float32 x
+        X = np.ascontiguousarray(X, dtype=np.float32)
+
+        proba = np.zeros((n_rows, a["leaf_values"].shape[1]), dtype=np.float64)
+        rows_per_step = max(1, MAX_TRAVERSAL_CELLS // n_trees)
+        for start in range(0, n_rows, rows_per_step):
+            n_chunk = min(rows_per_step, n_rows - start)
+            X_chunk = X[start:start + n_chunk].ravel()
+
+            # One (tree, row) pair per entry, tree-major so leaves can be accumulated tree by tree
+            leaves = np.repeat(roots, n_chunk)
+            offsets = np.tile(np.arange(n_chunk, dtype=np.int32) * n_features, n_trees)
+            active = np.flatnonzero(~a["is_leaf"][leaves])
+            nodes, offsets = leaves[active], offsets[active]
+
+            # Walk the pairs down several levels at a time; leaves point to themselves, so pairs that
+            # finish early stay put until the next compaction drops them
+            while active.size:
+                for _ in range(COMPACTION_INTERVAL):
+                    go_left = X_chunk[offsets + a["features"][nodes]] <= a["thresholds"][nodes]
+                    nodes = a["children"][2 * nodes + go_left]
+                finished = a["is_leaf"][nodes]
+                leaves[active[finished]] = nodes[finished]
+                keep = ~finished
+                active, nodes, offsets = active[keep], nodes[keep], offsets[keep]
+
+            # Accumulate tree outputs in estimator order, as RandomForestClassifier does
+            chunk_proba = proba[start:start + n_chunk]
+            for tree_leaves in leaves.reshape(n_trees, n_chunk):
+                chunk_proba += a["leaf_values"][tree_leaves]
+
+        proba /= n_trees
+        return proba
+
+    def predict_proba(self, df):
+        """
+        Predicts class probabilities for a batch of employees.
+
+        Parameters:
+            df (DataFrame): Mapped employee data.
+
+        Returns:
+            ndarray: Class probabilities of shape (n_rows, n_classes), identical to the pipeline's predict_proba.
+        """
+        return self._forest_proba(self.transform(df))
+
+    def save(self, path):
+        """
+        Saves the compiled model as a NumPy .npz archive.
+
+        Parameters:
+            path (str): Destination file.
+        """
+        np.savez(path, spec=np.array(json.dumps(self.spec)), **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a compiled model saved with save().
+
+        Parameters:
+            path (str): Path of the .npz archive.
+
+        Returns:
+            CompiledAttritionModel: The loaded model.
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            arrays = {key: archive[key] for key in archive.files if key != "spec"}
+            spec = json.loads(str(archive["spec"]))
+        return cls(arrays, spec)
+
+
+def _compile_transformer(name, transformer, columns, arrays):
+    """
+    Flattens one ColumnTransformer branch into a block specification and arrays.
+
+    Parameters:
+        name (str): Branch name, used to prefix its arrays.
+        transformer (Pipeline): Fitted branch: SimpleImputer followed by StandardScaler or OneHotEncoder.
+        columns (list): Input columns of the branch.
+        arrays (dict): Output dictionary receiving the branch's arrays.
+
+    Returns:
+        dict: Block specification.
+    """
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    steps = [step for _, step in transformer.steps]
+    if len(steps) != 2 or not isinstance(steps[0], SimpleImputer):
+        raise ValueError(f"Unsupported transformer in branch '{name}': {transformer}")
+    imputer, encoder = steps
+
+    if isinstance(encoder, StandardScaler):
+        arrays[f"{name}_statistics"] = imputer.statistics_.astype(np.float64)
+        block = {"kind": "numeric", "name": name, "columns": list(columns),
+                 "with_mean": bool(encoder.with_mean), "with_std": bool(encoder.with_std)}
+        if encoder.with_mean:
+            arrays[f"{name}_mean"] = encoder.mean_
+        if encoder.with_std:
+            arrays[f"{name}_scale"] = encoder.scale_
+        return block
+
+    if isinstance(encoder, OneHotEncoder):
+        if (encoder.drop is not None or encoder.handle_unknown != "ignore"
+                or getattr(encoder, "_infrequent_enabled", False)):
+            raise ValueError(f"Unsupported OneHotEncoder settings in branch '{name}'")
+        return {"kind": "categorical", "name": name, "columns": list(columns),
+                "statistics": imputer.statistics_.tolist(),
+                "categories": [categories.tolist() for categories in encoder.categories_]}
+
+    raise ValueError(f"Unsupported encoder in branch '{name}': {encoder}")
+
+
+def compile_pipeline(pipeline):
+    """
+    Flattens a fitted attrition pipeline into a CompiledAttritionModel.
+
+    Parameters:
+        pipeline (Pipeline): Fitted pipeline with feature_engineering, preprocessor and classifier steps.
+
+    Returns:
+        CompiledAttritionModel: Array-backed equivalent of the pipeline.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    feature_step = pipeline.named_steps["feature_engineering"]
+    preprocessor = pipeline.named_steps["preprocessor"]
+    forest = pipeline.named_steps["classifier"]
+    if getattr(feature_step.func, "__name__", None) != "feature_engineering":
+        raise ValueError("The first pipeline step must be FunctionTransformer(feature_engineering)")
+    if not isinstance(forest, RandomForestClassifier) or forest.n_outputs_ != 1:
+        raise ValueError("The classifier must be a single-output RandomForestClassifier")
+
+    arrays = {}
+    blocks = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder":
+            if transformer != "drop":
+                raise ValueError("Only remainder='drop' is supported")
+            continue
+        blocks.append(_compile_transformer(name, transformer, columns, arrays))
+
+    # Concatenate all trees into one node table with global child indices; children[2 * node + go_left]
+    # holds the right (even slot) and left (odd slot) child, and leaves point to themselves
+    features, thresholds, children, is_leaf, leaf_values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count)
+        roots.append(offset)
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        children.append(np.column_stack((
+            np.where(leaf, node_ids, tree.children_right),
+            np.where(leaf, node_ids, tree.children_left),
+        )) + offset)
+        is_leaf.append(leaf)
+        leaf_values.append(tree.value[:, 0, :])
+        offset += tree.node_count
+
+    # Round thresholds down to float32: for float32 features x, x <= t holds exactly when x <= round_down(t)
+    thresholds = np.concatenate(thresholds).astype(np.float64)
+    thresholds32 = thresholds.astype(np.float32)
+    rounded_up = thresholds32.astype(np.float64) > thresholds
+    thresholds32[rounded_up] = np.nextafter(thresholds32[rounded_up], np.float32(-np.inf))
+
+    arrays.update({
+        "tree_roots": np.asarray(roots, dtype=np.int32),
+        "features": np.concatenate(features).astype(np.int32),
+        "thresholds": thresholds32,
+        "children": np.concatenate(children).astype(np.int32).ravel(),
+        "is_leaf": np.concatenate(is_leaf),
+        "leaf_values": np.concatenate(leaf_values).astype(np.float64),
+    })
+    spec = {"blocks": blocks, "classes": forest.classes_.tolist()}
+    return CompiledAttritionModel(arrays, spec)
+
+
+def main(argv=None):
+    """Command-line entry point: export a saved pipeline and verify it on optional sample data."""
+    from joblib import load
+
+    parser = argparse.ArgumentParser(description="Compile the attrition pipeline into NumPy arrays.")
+    parser.add_argument("pipeline", help="Path of the saved joblib pipeline")
+    parser.add_argument("output", help="Path of the .npz file to write")
+    parser.add_argument("--verify", help="CSV with mapped employee data to check predictions against")
+    args = parser.parse_args(argv)
+
+    pipeline = load(args.pipeline)
+    compiled = compile_pipeline(pipeline)
+    compiled.save(args.output)
+
+    if args.verify:
+        df = pd.read_csv(args.verify)
+        expected = pipeline.predict_proba(df)
+        actual = CompiledAttritionModel.load(args.output).predict_proba(df)
+        if not np.array_equal(expected, actual):
+            raise SystemExit(f"Compiled predictions differ from the pipeline on {args.verify}")
+        print(f"Verified {len(df)} rows: predictions are identical")
+    print(f"Compiled {len(compiled.arrays['tree_roots'])} trees -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
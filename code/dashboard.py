@@ -2,14 +2,29 @@ import streamlit as st
 import pandas as pd
 from utils import (
     get_employee_snapshot,
+    get_employee_snapshots,
     create_pdf,
     download_pdf,
     rename_and_filter_columns,
+    get_session_df,
     feature_engineering,
 )
-from workflow import run_workflow
-import asyncio
-from joblib import load
+from recommendation_jobs import (
+    DONE,
+    FAILED,
+    QUEUED,
+    batch_results,
+    clear_finished_jobs,
+    queue_batch,
+    queue_recommendation,
+    session_batch,
+    session_jobs,
+)
+from scoring import predict_attrition
+from batch_recommendations import results_to_frame, select_at_risk
+
+# Seconds between refreshes of the recommendation job list and batch while jobs are queued or running
+JOB_REFRESH_SECONDS = 1.0
 
 
 def main():
@@ -22,7 +37,7 @@ def main():
     st.title("RetainAI: Dashboard")
 
     # Check if the employee data and mappings are available in session state, or if demo mode is enabled
-    if "employee data_df" not in st.session_state and "employee_mappings" not in st.session_state:
+    if "employee data_handle" not in st.session_state and "employee_mappings" not in st.session_state:
         st.warning("Start with Data Upload tab to upload your files or use sample dataset")
         return
     elif not st.session_state["demo_mode"] and "employee_mappings" not in st.session_state:
@@ -31,18 +46,20 @@ def main():
 
     # Load employee data, applying renaming and filtering based on mappings if not in demo mode
     df = (
-        st.session_state["employee data_df"]
+        get_session_df("employee data")
         if st.session_state["demo_mode"]
-        else rename_and_filter_columns(st.session_state["employee data_df"], st.session_state["employee_mappings"])
+        else rename_and_filter_columns(get_session_df("employee data"), st.session_state["employee_mappings"])
     )
 
-    # Load the pre-trained attrition model and use it to generate attrition probability predictions
-    loaded_model = load("/project/models/attrition_model_pipeline.joblib")
-    predictions = loaded_model.predict_proba(df)[:, 1]
-    df["Attrition Probability"] = predictions
+    # Predict attrition probabilities with the process-wide model; unchanged data is served from the prediction cache
+    predictions = predict_attrition(df)
+    df = df.assign(**{"Attrition Probability": predictions})
+
+    # Keep every at-risk employee for batch recommendations before limiting the table
+    df_at_risk = select_at_risk(df)
 
     # Load feature importance data for the attrition model
-    df_feature_importance = pd.read_csv("/project/data/feature_importance.csv")
+    df_feature_importance = load_feature_importance()
     df = df.round(2).head(15)  # Round off values to two decimals and limit display to the first 15 rows
 
     # Display overall employee metrics (full-time/part-time, attrition risk count, etc.)
@@ -52,6 +69,8 @@ def main():
     tab1, tab2 = st.tabs(["Predicted Attrition", "AP Methodology"])
     with tab1:
         display_predicted_attrition(df)
+        display_recommendation_jobs()
+        display_batch_recommendations(df_at_risk)
     with tab2:
         st.write("The table below highlights the key factors the model uses to predict employee attrition. Each factor’s importance score shows how much it influences the likelihood of an employee leaving.")
         display_attrition_methodology(df_feature_importance)
@@ -121,14 +140,14 @@ def display_predicted_attrition(df):
 
 
 def get_retention_recommendation(df, selected_row_index):
-    """Generate and download a personalized retention recommendation PDF for a selected employee.
+    """Queue a personalized retention recommendation for a selected employee.
     
     Args:
         df (pd.DataFrame): DataFrame containing employee data with selected row's details.
         selected_row_index (int): Index of the row selected by the user.
         
-    This function allows the user to download a retention recommendation PDF with tailored suggestions 
-    for the selected employee based on attrition data.
+    The recommendation is generated by the background job queue, so the manager can keep browsing and
+    queue more employees while it runs. Its progress and result are shown in the job list.
     """
     selected_row_df = df.iloc[[selected_row_index]]
     employee_name = selected_row_df["Full Name"].values[0]
@@ -140,15 +159,134 @@ def get_retention_recommendation(df, selected_row_index):
     # Button to initiate retention recommendation generation workflow
     get_rec_button = st.button("Retention Recommendation 🪄")
     if get_rec_button:
-        # Run the recommendation workflow asynchronously to avoid blocking the UI
-        recommendation = asyncio.run(run_workflow())
-        
-        # Format and clean up the recommendation text
-        recommendation = recommendation.replace("**", "")
+        # Queue the recommendation; a cached one for unchanged data, prompts, model and documents is reused
+        job = queue_recommendation(employee_name, employee_snapshot)
+        st.toast(f"Recommendation for {employee_name} {'ready' if job.status == DONE else 'queued'}")
+
+
+def display_recommendation_jobs():
+    """Display the recommendation jobs queued in this session, with their progress and results.
+    
+    While any job is queued or running, the list refreshes itself every JOB_REFRESH_SECONDS without
+    rerunning the rest of the page.
+    """
+    jobs = session_jobs()
+    if not jobs:
+        return
+
+    active = any(not job.finished for job in jobs)
+    st.fragment(run_every=JOB_REFRESH_SECONDS if active else None)(_show_recommendation_jobs)(active)
+
+
+def _show_recommendation_jobs(was_active):
+    """Render the session's recommendation jobs; once the last active job finishes, rerun to stop refreshing."""
+    jobs = session_jobs()
+    if was_active and all(job.finished for job in jobs):
+        st.rerun()
+
+    st.subheader("Retention Recommendations")
+    for job in jobs:
+        if job.status == QUEUED:
+            st.write(f"⏳ {job.employee_name}: queued")
+        elif job.status == FAILED:
+            st.error(f"{job.employee_name}: {job.error}")
+            if st.button("Retry", key=f"retry-{job.job_id}"):
+                queue_recommendation(job.employee_name, job.employee_snapshot)
+                st.rerun()
+        elif job.status == DONE:
+            with st.expander(f"{'⚠️' if job.missing_analyses else '✅'} {job.employee_name}"):
+                if job.missing_analyses:
+                    # Synthesized near the timeout without some analyses; a retry completes it
+                    st.warning("Generated without the " + ", ".join(job.missing_analyses)
+                               + " analysis, which did not finish in time.")
+                    if st.button("Retry", key=f"retry-{job.job_id}"):
+                        queue_recommendation(job.employee_name, job.employee_snapshot)
+                        st.rerun()
+                st.markdown(job.result)
+
+                # Format and clean up the recommendation text, then offer it as a PDF
+                pdf_data = recommendation_pdf(job.result.replace("**", ""))
+                download_pdf(pdf_data, filename=f"Retention Recommendation for {job.employee_name}.pdf")
+        else:
+            st.progress(job.progress, text=f"{job.employee_name}: {job.progress_text}")
+            with st.expander(f"{job.employee_name}: output so far"):
+                for label, text in job.partial.items():
+                    st.markdown(f"**{label.capitalize()}**")
+                    st.markdown(text)
+
+    if any(job.finished for job in jobs) and st.button("Clear Finished"):
+        clear_finished_jobs()
+        st.rerun()
+
+
+@st.cache_data(show_spinner=False)
+def recommendation_pdf(recommendation):
+    """Create the PDF of a recommendation once, rather than on every refresh of the job list.
+    
+    Returns:
+        bytes: The PDF file.
+    """
+    return create_pdf(recommendation)
+
+
+def display_batch_recommendations(df_at_risk):
+    """Queue retention recommendations for every at-risk employee in one batch.
+    
+    Args:
+        df_at_risk (pd.DataFrame): Employees above the attrition threshold, highest risk first.
         
-        # Generate and download the PDF
-        pdf_data = create_pdf(recommendation)
-        download_pdf(pdf_data, filename=f"Retention Recommendation for {employee_name}.pdf")
+    The batch runs on the background job queue, rate limited and sharing its running slots with single
+    recommendations, so the page stays responsive and the batch keeps running across reruns. Running the
+    batch again reuses cached and pending recommendations and only processes the remaining employees.
+    """
+    if df_at_risk.empty:
+        return
+
+    get_batch_button = st.button(f"Recommendations for All {len(df_at_risk)} At-Risk Employees 🪄")
+    if get_batch_button:
+        # Generate snapshots for all at-risk employees in one pass and queue the batch
+        queue_batch(df_at_risk, get_employee_snapshots(df_at_risk))
+
+    entries = session_batch()
+    if not entries:
+        return
+
+    active = any(not entry["job"].finished for entry in entries)
+    st.fragment(run_every=JOB_REFRESH_SECONDS if active else None)(_show_batch)(active)
+
+
+def _show_batch(was_active):
+    """Render the progress and results of the session's batch; once it finishes, rerun to stop refreshing."""
+    entries = session_batch()
+    jobs = [entry["job"] for entry in entries]
+    if was_active and all(job.finished for job in jobs):
+        st.rerun()
+
+    finished = sum(job.finished for job in jobs)
+    if finished < len(jobs):
+        st.progress(finished / len(jobs), text=f"Generating recommendations ({finished}/{len(jobs)})...")
+        return
+
+    done = [job for job in jobs if job.status == DONE]
+    failed = [entry["Full Name"] for entry in entries if entry["job"].status == FAILED]
+    partial = sum(bool(job.missing_analyses) for job in done)
+    cached = sum(job.from_cache for job in done)
+    st.success(
+        f"{len(done) - partial - cached} generated, {partial} without some analyses, "
+        f"{cached} from cache, {len(failed)} failed."
+    )
+    if failed:
+        st.warning("Run the batch again to retry: " + ", ".join(failed))
+    if partial:
+        st.warning("Run the batch again to complete the recommendations generated without some analyses.")
+
+    # Offer all recommendations of the batch as a single CSV download
+    st.download_button(
+        "Download Recommendations",
+        data=results_to_frame(batch_results(entries)).to_csv(index=False),
+        file_name="Retention Recommendations.csv",
+        mime="text/csv",
+    )
 
 
 def display_attrition_methodology(df_feature_importance):
@@ -175,5 +313,15 @@ def display_attrition_methodology(df_feature_importance):
     )
 
 
+@st.cache_data(show_spinner=False)
+def load_feature_importance():
+    """Load the feature importance scores of the attrition model once per process.
+    
+    Returns:
+        pd.DataFrame: Feature names with their importance scores.
+    """
+    return pd.read_csv("/project/data/feature_importance.csv")
+
+
 # Run the main app
 main()
@@ -3,27 +3,13 @@ import pandas as pd
 from fuzzywuzzy import process
 from streamlit_pdf_viewer import pdf_viewer
 import os
-from utils import upload_file, get_best_match, auto_map_columns, render_mapping_ui, save_mappings, show_column_mapping_interface, handle_csv_upload
+from utils import upload_file, get_best_match, auto_map_columns, render_mapping_ui, save_mappings, show_column_mapping_interface, handle_csv_upload, expected_columns_sets, refresh_document_index
 
 # Main App
 st.title("RetainAI: Data Uploads")
 st.session_state["demo_mode"] = st.toggle("Use sample data")  # Toggle to enable sample data mode
 st.header("CSV Uploads")
 
-# Define expected columns for each type of data upload
-# These are used to map user-uploaded CSV columns to the app's expected structure
-expected_columns_sets = {
-    "employee": [
-        "Employee ID", "Full Name", "Gender", "Age", "Tenure", "Role",
-        "Department", "Starting Salary", "Current Salary", "Location",
-        "Contract", "Years of Experience", "Average Monthly Working Hours",
-        "Months in Role", "Promotion History", "Last Performance Review Score"
-    ],
-    "benefits": ["Employee ID", "Category", "Enrollment Status"],
-    "reviews": ["Employee ID", "Fiscal Quarter", "Score", "Performance Review Summary"],
-    "survey": ["Employee ID", "Question", "Score", "Comment"]
-}
-
 # Call handle_csv_upload for each required dataset
 # Load CSV files for various data categories required by the app
 
@@ -74,5 +60,9 @@ for key, pdf in pdf_file_info.items():
                 file_path = os.path.join("/project/data/uploaded_pdf/", uploaded_pdf.name)
                 with open(file_path, "wb") as f:
                     f.write(uploaded_pdf.getbuffer())
+                from rag_index import save_doc_type  # Imported on upload only: it loads chromadb and llama_index
+                save_doc_type("/project/data/uploaded_pdf/", uploaded_pdf.name, key)  # Tag its chunks as industry or benefits
                 st.session_state[f"{key}_pdf"] = True  # Mark PDF as uploaded
+                with st.spinner("Indexing the PDF..."):
+                    refresh_document_index()  # Add the PDF to the live index used by all sessions
                 st.rerun()  # Refresh the app to show the uploaded PDF
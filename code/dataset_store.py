@@ -0,0 +1,161 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from ingestion import parse_csv
+
+
+# Directory holding every stored dataset as an uncompressed Arrow (Feather) file named by its handle
+STORE_DIR = "/project/data/scratch/datasets"
+
+# Bump whenever the parsing (e.g. COLUMN_DTYPES in ingestion.py) or compaction rules change, so datasets are
+# parsed and stored again
+STORE_VERSION = "2"
+
+# Text columns with few distinct values, stored as categoricals
+CATEGORICAL_COLUMNS = [
+    "Gender", "Role", "Department", "Location", "Contract",
+    "Category", "Enrollment Status", "Question", "Fiscal Quarter",
+]
+
+# Columns that join tables to each other keep their parsed dtype, so keys compare equal across tables
+KEY_COLUMNS = ["Employee ID"]
+
+# Tables with at least this many rows are memory-mapped instead of read into memory
+MMAP_MIN_ROWS = 100_000
+
+# Number of loaded datasets kept in memory; evicted datasets are loaded from disk again on demand
+MAX_LOADED_DATASETS = 16
+
+
+def compact(df):
+    """
+    Returns a compact copy of a DataFrame.
+
+    Low-cardinality text columns become categoricals and integer columns other than join keys are downcast
+    to the smallest integer type that holds their values. Float columns are kept as they are, so values
+    (and predictions) do not change.
+
+    Parameters:
+        df (DataFrame): Data as parsed from the CSV file.
+
+    Returns:
+        DataFrame: The compacted data.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS and df[col].dtype == object:
+            df[col] = df[col].astype("category")
+        elif col not in KEY_COLUMNS and pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+class DatasetStore:
+    """
+    Immutable, content-addressed store of uploaded datasets shared by all sessions in the process.
+
+    A dataset is identified by a handle derived from its file contents, so every session that loads the same
+    file shares one compact copy, and sessions keep only the handle in their state. DataFrames returned by the
+    store are shared and must not be modified in place.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, max_loaded=MAX_LOADED_DATASETS):
+        """
+        Parameters:
+            store_dir (str): Directory the datasets are stored in.
+            max_loaded (int): Number of loaded datasets kept in memory.
+        """
+        self.store_dir = store_dir
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._path_handles = {}
+        self._lock = threading.Lock()
+
+    def _path(self, handle):
+        return os.path.join(self.store_dir, f"{handle}.arrow")
+
+    def put_csv(self, source):
+        """
+        Adds a CSV file to the store, unless it is already stored.
+
+        Parameters:
+            source (UploadedFile or str): Streamlit upload or path of a CSV file.
+
+        Returns:
+            str: Handle of the dataset.
+        """
+        # Unchanged files on disk (e.g. the demo samples) are recognized without reading them again
+        if isinstance(source, str):
+            stat = os.stat(source)
+            path_key = (source, stat.st_mtime_ns, stat.st_size)
+            if path_key in self._path_handles:
+                return self._path_handles[path_key]
+            with open(source, "rb") as f:
+                data = f.read()
+        else:
+            data = source.getvalue()
+
+        handle = f"{hashlib.sha256(data).hexdigest()}-{STORE_VERSION}"
+        if not os.path.exists(self._path(handle)):
+            df = compact(parse_csv(data))
+
+            # Write atomically so concurrent sessions storing the same file never see a partial file
+            os.makedirs(self.store_dir, exist_ok=True)
+            tmp_path = f"{self._path(handle)}.{threading.get_ident()}.tmp"
+            # A single uncompressed record batch lets numeric columns be mapped without copying
+            df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed", chunksize=max(len(df), 1))
+            os.replace(tmp_path, self._path(handle))
+
+        if isinstance(source, str):
+            self._path_handles[path_key] = handle
+        return handle
+
+    def get(self, handle):
+        """
+        Returns a stored dataset.
+
+        Parameters:
+            handle (str or None): Handle returned by put_csv().
+
+        Returns:
+            DataFrame or None: The shared dataset, or None if handle is None.
+        """
+        if handle is None:
+            return None
+
+        with self._lock:
+            if handle in self._loaded:
+                self._loaded.move_to_end(handle)
+                return self._loaded[handle]
+
+        df = self._load(handle)
+
+        with self._lock:
+            df = self._loaded.setdefault(handle, df)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return df
+
+    def _load(self, handle):
+        """Reads a dataset from disk, memory-mapping large tables so numeric columns are backed by the page cache."""
+        import pyarrow as pa
+
+        # The mapped file stays open for as long as the DataFrame's zero-copy columns reference it;
+        # small tables are copied out so the mapping is released right away
+        table = pa.ipc.open_file(pa.memory_map(self._path(handle), "r")).read_all()
+        if table.num_rows >= MMAP_MIN_ROWS:
+            df = table.to_pandas(split_blocks=True)
+        else:
+            df = table.to_pandas()
+
+        # Arrow stores missing text as null; restore NaN as the CSV parser produces
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].replace({None: np.nan})
+        return df
+
+
+# Process-wide dataset store shared by all sessions
+dataset_store = DatasetStore()
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, List
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.embeddings.nvidia import NVIDIAEmbedding
+from http_pool import async_client_pool
+
+
+# SQLite database holding computed embeddings
+CACHE_PATH = "/project/data/scratch/embeddings.sqlite3"
+
+# Texts sent per embedding request when embedding cache misses (the NVIDIA endpoints accept at most 259)
+EMBED_BATCH_SIZE = int(os.environ.get("RETAIN_AI_EMBED_BATCH_SIZE", "128"))
+
+# Keys looked up per SQLite query, below SQLite's limit on query parameters
+LOOKUP_CHUNK_SIZE = 500
+
+
+def embedding_key(endpoint, model, truncate, input_type, text):
+    """
+    Builds the cache key of an embedding.
+
+    Parameters:
+        endpoint (str): URL of the embedding endpoint, so stand-in endpoints never share vectors with real ones.
+        model (str): Name of the embedding model.
+        truncate (str): Truncation mode ("NONE", "START" or "END").
+        input_type (str): "query" or "passage"; the model embeds them differently.
+        text (str): The embedded text.
+
+    Returns:
+        str: Hex digest identifying the embedding.
+    """
+    digest = hashlib.sha256()
+    for part in (endpoint, model, truncate, input_type, text):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of embedding vectors, stored as float32 blobs.
+
+    Every operation opens its own SQLite connection, so the cache can be shared by all Streamlit sessions
+    and threads in the process (and by other processes on the same machine). Hit and miss counts cover
+    lookups made by this process.
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        """
+        Parameters:
+            path (str): SQLite database file.
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._counts_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection to the cache database, committing and closing it when done."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        """
+        Looks up many embeddings at once.
+
+        Parameters:
+            keys (list): Keys built with embedding_key().
+
+        Returns:
+            dict: Embedding (list of floats) of every key that is cached.
+        """
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype="<f4").tolist()
+
+        with self._counts_lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, embeddings):
+        """
+        Stores many embeddings at once.
+
+        Parameters:
+            embeddings (dict): Embedding (list of floats) of each key.
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype="<f4").tobytes()) for key, vector in embeddings.items()],
+            )
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of stored embeddings, bytes of vector data stored, and this process's hits, misses
+                and hit rate (None before the first lookup).
+        """
+        with self._connect() as conn:
+            entries, stored_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        with self._counts_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "entries": entries,
+            "bytes": stored_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+        }
+
+    def metrics_lines(self):
+        """
+        Returns:
+            list: The cache statistics in the Prometheus text exposition format.
+        """
+        stats = self.stats()
+        return [
+            "# HELP retain_ai_embedding_cache_lookups_total Embedding cache lookups by result.",
+            "# TYPE retain_ai_embedding_cache_lookups_total counter",
+            f'retain_ai_embedding_cache_lookups_total{{result="hit"}} {stats["hits"]}',
+            f'retain_ai_embedding_cache_lookups_total{{result="miss"}} {stats["misses"]}',
+            "# HELP retain_ai_embedding_cache_entries Embeddings stored in the cache.",
+            "# TYPE retain_ai_embedding_cache_entries gauge",
+            f"retain_ai_embedding_cache_entries {stats['entries']}",
+            "# HELP retain_ai_embedding_cache_bytes Bytes of vector data stored in the cache.",
+            "# TYPE retain_ai_embedding_cache_bytes gauge",
+            f"retain_ai_embedding_cache_bytes {stats['bytes']}",
+        ]
+
+    def clear(self):
+        """Removes all cached embeddings."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM embeddings")
+
+
+class CachedNVIDIAEmbedding(NVIDIAEmbedding):
+    """
+    NVIDIAEmbedding that serves texts it has embedded before from an EmbeddingCache.
+
+    Batch embedding (used when indexes are built) drops cached and duplicate texts first and sends only the
+    remaining ones, in requests of embed_batch_size texts. Texts that are all cached make no request at all.
+    Async requests go through the shared connection pool of the running event loop.
+    """
+
+    _cache: Any = PrivateAttr()
+
+    def __init__(self, cache=None, embed_batch_size=EMBED_BATCH_SIZE, **kwargs):
+        """
+        Parameters:
+            cache (EmbeddingCache or None): Cache to use; defaults to one at CACHE_PATH.
+            embed_batch_size (int): Texts sent per embedding request.
+            **kwargs: Passed on to NVIDIAEmbedding (e.g. model, truncate, base_url).
+        """
+        super().__init__(embed_batch_size=embed_batch_size, **kwargs)
+        self._cache = cache if cache is not None else EmbeddingCache()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedNVIDIAEmbedding"
+
+    @property
+    def cache(self):
+        """EmbeddingCache: The cache embeddings are served from."""
+        return self._cache
+
+    def _keys(self, texts, input_type):
+        endpoint = str(self._client.base_url)
+        return [embedding_key(endpoint, self.model, self.truncate, input_type, text) for text in texts]
+
+    def _missing(self, texts, input_type):
+        """Returns the keys of the texts and the cached embeddings, and the distinct texts that are not cached."""
+        keys = self._keys(texts, input_type)
+        found = self._cache.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        return keys, found, missing
+
+    def _cached_single(self, text, input_type, embed):
+        keys, found, missing = self._missing([text], input_type)
+        if missing:
+            found[keys[0]] = embed(text)
+            self._cache.put_many({keys[0]: found[keys[0]]})
+        return found[keys[0]]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._cached_single(query, "query", super()._get_query_embedding)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._cached_single(text, "passage", super()._get_text_embedding)
+
+    async def _aembed(self, texts, input_type):
+        """Embeds texts through the shared connection pool of the running event loop."""
+        client = async_client_pool.openai_client(
+            api_key=self._aclient.api_key,
+            base_url=self._aclient.base_url,
+            max_retries=self._aclient.max_retries,
+            timeout=self._aclient.timeout,
+            default_headers=self._aclient._custom_headers,
+        )
+        response = await client.embeddings.create(
+            input=texts, model=self.model, extra_body={"input_type": input_type, "truncate": self.truncate}
+        )
+        return [d.embedding for d in response.data]
+
+    async def _acached_single(self, text, input_type):
+        """Async version of _cached_single(); the SQLite cache is read and written in a worker thread."""
+        keys, found, missing = await asyncio.to_thread(self._missing, [text], input_type)
+        if missing:
+            found[keys[0]] = (await self._aembed([text], input_type))[0]
+            await asyncio.to_thread(self._cache.put_many, {keys[0]: found[keys[0]]})
+        return found[keys[0]]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await self._acached_single(query, "query")
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._acached_single(text, "passage")
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(texts, "passage")
+
+    def get_text_embedding_batch(self, texts, show_progress=False, **kwargs):
+        """
+        Embeds many texts, requesting only the distinct texts that are not cached.
+
+        Parameters:
+            texts (list): Texts to embed.
+            show_progress (bool): Whether to show a progress bar for the requests.
+
+        Returns:
+            list: Embedding of each text, in order.
+        """
+        keys, found, missing = self._missing(texts, "passage")
+        if missing:
+            embeddings = super().get_text_embedding_batch(list(missing.values()), show_progress, **kwargs)
+            computed = dict(zip(missing, embeddings))
+            self._cache.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aget_text_embedding_batch(self, texts, show_progress=False):
+        """
+        Asynchronously embeds many texts, requesting only the distinct texts that are not cached.
+
+        Parameters:
+            texts (list): Texts to embed.
+            show_progress (bool): Whether to show a progress bar for the requests.
+
+        Returns:
+            list: Embedding of each text, in order.
+        """
+        keys, found, missing = await asyncio.to_thread(self._missing, texts, "passage")
+        if missing:
+            embeddings = await super().aget_text_embedding_batch(list(missing.values()), show_progress)
+            computed = dict(zip(missing, embeddings))
+            await asyncio.to_thread(self._cache.put_many, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
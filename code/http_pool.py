@@ -0,0 +1,85 @@
+import asyncio
+import os
+import threading
+import httpx
+from openai import AsyncOpenAI
+from llama_index.llms.nvidia import NVIDIA
+
+
+# Connections each event loop's pool keeps to the endpoints, i.e. the most requests in flight at once
+MAX_CONNECTIONS = int(os.environ.get("RETAIN_AI_MAX_CONNECTIONS", "64"))
+
+# Idle connections kept open for reuse
+MAX_KEEPALIVE_CONNECTIONS = 32
+
+
+class AsyncClientPool:
+    """
+    Shared HTTP connection pools of the async OpenAI-compatible clients, one per event loop.
+
+    An httpx.AsyncClient may only be used on the event loop it was created on, so every loop gets its own pool,
+    and all workflows and requests on that loop share its connections. In the app, all recommendations run on
+    the job queue's long-lived loop, so they share one pool. Pools are not dropped when their loop ends: code
+    that runs a short-lived loop (e.g. a load test run) must await aclose_loop_pool() before the loop ends, or
+    the pool and its open connections are kept until the process exits.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS):
+        """
+        Parameters:
+            max_connections (int): Connections per pool.
+            max_keepalive_connections (int): Idle connections kept open per pool.
+        """
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def openai_client(self, **kwargs):
+        """
+        Returns an AsyncOpenAI client for the running event loop, backed by the loop's connection pool.
+
+        Parameters:
+            **kwargs: AsyncOpenAI settings (e.g. api_key, base_url, max_retries, timeout); clients with the
+                same settings are reused.
+
+        Returns:
+            AsyncOpenAI: The client.
+        """
+        loop = asyncio.get_running_loop()
+        kwargs.pop("http_client", None)
+        key = tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+        with self._lock:
+            if loop not in self._pools:
+                self._pools[loop] = (httpx.AsyncClient(limits=self.limits), {})
+            http_client, clients = self._pools[loop]
+            if key not in clients:
+                clients[key] = AsyncOpenAI(http_client=http_client, **kwargs)
+            return clients[key]
+
+    async def aclose_loop_pool(self):
+        """Closes the running event loop's pool and its connections, if it has one, and forgets it."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.pop(loop, None)
+        if pool is not None:
+            await pool[0].aclose()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pools)
+
+
+# Process-wide pools shared by the LLM and the embedding model
+async_client_pool = AsyncClientPool()
+
+
+class PooledNVIDIA(NVIDIA):
+    """NVIDIA LLM whose async requests (astream_complete, asynthesize, ...) go through the shared connection pool."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PooledNVIDIA"
+
+    def _get_aclient(self):
+        return async_client_pool.openai_client(**self._get_credential_kwargs(is_async=True))
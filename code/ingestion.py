@@ -0,0 +1,152 @@
+import csv
+import io
+import pandas as pd
+
+
+# Number of leading bytes used to detect the delimiter
+SNIFF_BYTES = 64 * 1024
+
+# Delimiters recognized in uploaded files
+DELIMITERS = ",;\t|"
+
+# Declared dtypes of the expected columns of the four datasets. Columns whose values may be fractional
+# (salaries, hours, tenure, review scores) are left to inference so their values render exactly as in the file.
+COLUMN_DTYPES = {
+    "Full Name": "object",
+    "Gender": "object",
+    "Age": "int64",
+    "Role": "object",
+    "Department": "object",
+    "Location": "object",
+    "Contract": "object",
+    "Years of Experience": "int64",
+    "Months in Role": "int64",
+    "Promotion History": "int64",
+    "Category": "object",
+    "Enrollment Status": "bool",
+    "Fiscal Quarter": "object",
+    "Score": "int64",
+    "Performance Review Summary": "object",
+    "Question": "object",
+    "Comment": "object",
+}
+
+# Spellings of the values accepted in Boolean columns, compared case-insensitively. Missing values are False:
+# an employee without a recorded enrollment status is not enrolled.
+BOOL_VALUES = {
+    "true": True, "false": False,
+    "yes": True, "no": False,
+    "y": True, "n": False,
+    "enrolled": True, "not enrolled": False,
+    "1": True, "0": False,
+    "1.0": True, "0.0": False,
+    "": False,
+}
+
+
+def sniff_delimiter(prefix):
+    """
+    Detects the delimiter of a CSV file from its first bytes.
+
+    Parameters:
+        prefix (bytes or str): The beginning of the file.
+
+    Returns:
+        str: The detected delimiter, or a comma if none of DELIMITERS could be detected.
+    """
+    if isinstance(prefix, bytes):
+        prefix = prefix.decode("utf-8", errors="ignore")
+    try:
+        return csv.Sniffer().sniff(prefix, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def declared_dtypes(columns):
+    """
+    Returns the declared dtypes of the given columns.
+
+    Parameters:
+        columns (list): Column names of a file.
+
+    Returns:
+        dict: Declared dtype of every column that has one.
+    """
+    return {col: COLUMN_DTYPES[col] for col in columns if col in COLUMN_DTYPES}
+
+
+def to_bool(values):
+    """
+    Converts a column of Boolean values written as text (e.g. "True"/"False") to bool.
+
+    Unlike astype(bool), which is True for every non-empty string, each value must be one of BOOL_VALUES.
+    Missing and blank values are False.
+
+    Parameters:
+        values (Series): The column.
+
+    Returns:
+        Series: The column as bool.
+
+    Raises:
+        ValueError: If a value is not a Boolean value; the message names the column, the value and its row.
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values
+    flags = values.astype(object).fillna("").astype(str).str.strip().str.lower().map(BOOL_VALUES)
+    invalid = flags.isna()
+    if invalid.any():
+        position = int(invalid.to_numpy().argmax())
+        raise ValueError(
+            f"Column {values.name!r} must hold True/False values (e.g. True, yes or Enrolled), "
+            f"but row {position + 1} holds {values.iloc[position]!r}."
+        )
+    return flags.astype(bool)
+
+
+def apply_declared_dtypes(df):
+    """
+    Converts the expected columns of a DataFrame to their declared dtypes.
+
+    Files whose headers match the expected names get these dtypes when they are parsed; this applies them
+    to the other files once the user's column mapping has renamed their columns. Boolean columns are
+    converted with to_bool(); integer columns are converted only if all their values are whole numbers, so
+    columns with missing values keep their parsed dtype. Text columns are left as they are.
+
+    Parameters:
+        df (DataFrame): Data with the expected column names.
+
+    Returns:
+        DataFrame: The data with converted columns; df itself if no column needed converting.
+    """
+    converted = {}
+    for col, dtype in declared_dtypes(df.columns).items():
+        if dtype == "bool" and not pd.api.types.is_bool_dtype(df[col].dtype):
+            converted[col] = to_bool(df[col])
+        elif dtype == "int64" and not pd.api.types.is_integer_dtype(df[col].dtype):
+            values = pd.to_numeric(df[col], errors="coerce")
+            if values.notna().all() and (values % 1 == 0).all():
+                converted[col] = values.astype("int64")
+    return df.assign(**converted) if converted else df
+
+
+def parse_csv(data):
+    """
+    Parses CSV bytes with the C engine, detecting the delimiter from a small prefix.
+
+    Declared dtypes skip type inference for known columns. If a column's values do not fit its declared
+    dtype (e.g. missing ages, or "yes"/"no" enrollment status), the file is parsed again with inferred dtypes
+    and the columns that can be are converted afterwards.
+
+    Parameters:
+        data (bytes): Contents of the CSV file.
+
+    Returns:
+        DataFrame: The parsed data.
+    """
+    delimiter = sniff_delimiter(data[:SNIFF_BYTES])
+    header = pd.read_csv(io.BytesIO(data[:SNIFF_BYTES]), sep=delimiter, nrows=0).columns
+    try:
+        return pd.read_csv(io.BytesIO(data), sep=delimiter, dtype=declared_dtypes(header))
+    except (ValueError, TypeError):
+        return apply_declared_dtypes(pd.read_csv(io.BytesIO(data), sep=delimiter))
@@ -0,0 +1,262 @@
+"""
+Concurrent load test of retention recommendations and chat.
+
+Simulates managers using the app at the same time: each one repeatedly either generates a retention
+recommendation for an employee (a full RetentionFlow run) or asks the chat a question about the team.
+Reports the p50/p95/p99 latency and throughput of both, and the time-to-first-token of every LLM step.
+
+By default the LLM and embedding endpoints are replaced by the in-process stand-in from local_nim.py, so
+results reflect the app's own overhead and concurrency rather than the API Catalog's. Pass --base-url to test
+against a real endpoint instead (e.g. a self-hosted NIM), or --api-catalog to use the NVIDIA API Catalog.
+
+Example:
+    python load_test.py --managers 20 --requests-per-manager 5 --ttft 0.5 --tokens-per-second 30
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks import SyntheticData
+from local_nim import add_config_arguments, config_from_args, start_server
+from utils import BASE_URL_ENV
+
+
+# Questions the simulated managers ask the chat
+CHAT_QUESTIONS = [
+    "Which employees in Sales are at risk of leaving?",
+    "Who raised concerns about long working hours in the engagement survey?",
+    "Which software engineers have not been promoted in the last two years?",
+    "Summarize the latest performance reviews of the IT department.",
+    "Who is not enrolled in the retirement plan?",
+]
+
+# Same prompt as the chat page
+CHAT_TEMPLATE = (
+    "We have provided context information below. \n"
+    "---------------------\n"
+    "{context_str}"
+    "\n---------------------\n"
+    "Given this information, please answer the question: {query_str}\n"
+)
+
+# Latency percentiles reported per scenario
+PERCENTILES = [50, 95, 99]
+
+# Seconds a recommendation may take before the workflow times out, as on the dashboard
+WORKFLOW_TIMEOUT = 120
+
+# Worker threads per simulated manager: a recommendation runs up to four analyses at once
+THREADS_PER_MANAGER = 5
+
+
+class LoadTestApp:
+    """The app components a simulated manager uses, set up once and shared like the app's process-wide caches."""
+
+    def __init__(self, data, workflow_timeout=WORKFLOW_TIMEOUT):
+        """
+        Parameters:
+            data (SyntheticData): Team the managers look at.
+            workflow_timeout (float): Seconds a recommendation may take before it fails with a timeout.
+        """
+        # Imported here, once the endpoint is configured
+        from llama_index.core import PromptTemplate
+        from snapshots import get_snapshot_engine
+        from team_index import get_team_index
+        from utils import SAMPLE_PDF_DIR, get_chat_engine, get_document_library, get_embed_model
+        from workflow import RetentionFlow
+
+        self.flow_class = RetentionFlow
+        self.workflow_timeout = workflow_timeout
+        self.employees = data.employees
+        self.engine = get_snapshot_engine(data.reviews, data.benefits, data.survey)
+        self.snapshots = self.engine.employee_snapshots(self.employees)
+        self.team_index = get_team_index(self.employees, self.engine, data.reviews, embed_model=get_embed_model())
+        self.chat_engine = get_chat_engine()
+        # Recommendations retrieve from the sample document library. Its index is built now, so the first
+        # recommendation does not pay for it, and passed to every run: outside `streamlit run` there is no
+        # session state to select the library by demo mode
+        self.document_index = get_document_library(SAMPLE_PDF_DIR).current()
+        self.chat_template = PromptTemplate(CHAT_TEMPLATE)
+
+    async def recommendation(self, rng):
+        """Generates a retention recommendation for a random employee."""
+        snapshot = self.snapshots.iloc[rng.randrange(len(self.snapshots))]
+        flow = self.flow_class(timeout=self.workflow_timeout, stream_output=False, document_index=self.document_index)
+        return await flow.run(employee_snapshot=snapshot)
+
+    async def chat(self, rng):
+        """Asks a random question about the team and reads the streamed answer, as the chat page does."""
+        from streaming import StreamMetrics, timed_stream
+
+        question = rng.choice(CHAT_QUESTIONS)
+
+        def _run():
+            team_context = "\n".join(self.team_index.retrieve(question))
+            messages = self.chat_template.format_messages(context_str=team_context, query_str=question)
+            response = self.chat_engine.stream_chat(messages)
+            return "".join(timed_stream((chunk.delta for chunk in response), StreamMetrics("chat")))
+
+        return await asyncio.to_thread(_run)
+
+
+async def simulate_manager(app, manager_id, n_requests, chat_share, think_time, seed, results):
+    """
+    Simulates one manager making requests one after another.
+
+    Parameters:
+        app (LoadTestApp): Shared app components.
+        manager_id (int): Index of the manager, used to seed its choices.
+        n_requests (int): Number of requests the manager makes.
+        chat_share (float): Fraction of requests that are chat questions rather than recommendations.
+        think_time (float): Mean seconds the manager pauses between requests.
+        seed (int): Seed of the run.
+        results (list): Receives (scenario, seconds, error) for every request.
+    """
+    rng = random.Random(seed * 100_003 + manager_id)
+    for _ in range(n_requests):
+        scenario = "chat" if rng.random() < chat_share else "recommendation"
+        start = time.perf_counter()
+        error = None
+        try:
+            await getattr(app, scenario)(rng)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        results.append((scenario, time.perf_counter() - start, error))
+
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+def summarize(results, wall_seconds):
+    """
+    Computes the latency percentiles and throughput of every scenario.
+
+    Parameters:
+        results (list): (scenario, seconds, error) of every request.
+        wall_seconds (float): Duration of the whole run.
+
+    Returns:
+        dict: For each scenario, its request and error counts, latency percentiles of the successful
+            requests, and throughput in successful requests per second.
+    """
+    summary = {}
+    for scenario in sorted({scenario for scenario, _, _ in results}):
+        latencies = [seconds for s, seconds, error in results if s == scenario and error is None]
+        errors = [error for s, _, error in results if s == scenario and error is not None]
+        summary[scenario] = {
+            "requests": len(latencies) + len(errors),
+            "errors": len(errors),
+            **{f"p{p}": float(np.percentile(latencies, p)) if latencies else None for p in PERCENTILES},
+            "throughput": len(latencies) / wall_seconds,
+            "first_error": errors[0] if errors else None,
+        }
+    return summary
+
+
+async def run_load_test(app, managers, n_requests, chat_share, think_time, seed):
+    """
+    Runs all simulated managers concurrently, then closes the run's connection pool.
+
+    Returns:
+        tuple: (results, wall_seconds) with (scenario, seconds, error) for every request.
+    """
+    from http_pool import async_client_pool
+
+    # The default executor is sized for a single user; give every manager's worker threads room to run
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=managers * THREADS_PER_MANAGER))
+
+    results = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            simulate_manager(app, i, n_requests, chat_share, think_time, seed, results) for i in range(managers)
+        ))
+        wall_seconds = time.perf_counter() - start
+    finally:
+        await async_client_pool.aclose_loop_pool()
+    return results, wall_seconds
+
+
+def _format_seconds(value):
+    return f"{value:.3f}" if value is not None else "-"
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Load test retention recommendations and chat with concurrent managers.")
+    parser.add_argument("--managers", type=int, default=10, help="Concurrent simulated managers (default: 10)")
+    parser.add_argument("--requests-per-manager", type=int, default=5, help="Requests each manager makes (default: 5)")
+    parser.add_argument("--chat-share", type=float, default=0.5,
+                        help="Fraction of requests that are chat questions (default: 0.5)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Mean seconds managers pause between requests (default: 0)")
+    parser.add_argument("--employees", type=int, default=500, help="Employees in the synthetic team (default: 500)")
+    parser.add_argument("--workflow-timeout", type=float, default=WORKFLOW_TIMEOUT,
+                        help=f"Seconds a recommendation may take before it times out (default: {WORKFLOW_TIMEOUT})")
+    endpoint = parser.add_mutually_exclusive_group()
+    endpoint.add_argument("--base-url", help="Test against this OpenAI-compatible endpoint instead of the stand-in")
+    endpoint.add_argument("--api-catalog", action="store_true", help="Test against the NVIDIA API Catalog")
+    parser.add_argument("--step-logs", action="store_true", help="Print the JSON log line of every workflow step")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # One log line per workflow step would drown out the report
+    if not args.step_logs:
+        logging.getLogger("retain_ai.steps").setLevel(logging.WARNING)
+
+    # Point the app at the endpoint under test before any client is created
+    nim_config = None
+    if args.base_url:
+        os.environ[BASE_URL_ENV] = args.base_url
+    elif not args.api_catalog:
+        # Errors are only injected once setup (e.g. embedding the indexes) is done
+        nim_config = config_from_args(args)
+        nim_config.error_rate = nim_config.rate_limit_rate = 0.0
+        server = start_server(nim_config, port=0)
+        os.environ[BASE_URL_ENV] = f"http://127.0.0.1:{server.server_port}/v1"
+
+    print(f"Setting up {args.employees} employees against {os.environ.get(BASE_URL_ENV, 'the API Catalog')}...")
+    app = LoadTestApp(SyntheticData(args.employees, seed=args.seed), args.workflow_timeout)
+    if nim_config is not None:
+        nim_config.error_rate, nim_config.rate_limit_rate = args.error_rate, args.rate_limit_rate
+
+    print(f"Running {args.managers} managers x {args.requests_per_manager} requests...")
+    results, wall_seconds = asyncio.run(run_load_test(
+        app, args.managers, args.requests_per_manager, args.chat_share, args.think_time, args.seed
+    ))
+
+    from streaming import metrics_log
+    from telemetry import metrics_registry
+
+    print(f"\nFinished in {wall_seconds:.1f}s")
+    print(f"{'scenario':<18}{'requests':>10}{'errors':>8}" + "".join(f"{f'p{p} s':>10}" for p in PERCENTILES)
+          + f"{'req/s':>10}")
+    summary = summarize(results, wall_seconds)
+    for scenario, stats in summary.items():
+        print(f"{scenario:<18}{stats['requests']:>10}{stats['errors']:>8}"
+              + "".join(f"{_format_seconds(stats[f'p{p}']):>10}" for p in PERCENTILES)
+              + f"{stats['throughput']:>10.2f}")
+
+    print(f"\n{'LLM step':<22}{'requests':>10}{'median TTFT s':>16}{'median tok/s':>14}")
+    for label, stats in metrics_log.summary().items():
+        rate = stats["median_tokens_per_second"]
+        print(f"{label:<22}{stats['requests']:>10}{_format_seconds(stats['median_time_to_first_token']):>16}"
+              + f"{(f'{rate:.1f}' if rate is not None else '-'):>14}")
+
+    print(f"\n{'employee context':<22}{'snapshot tokens':>16}{'sent tokens':>14}{'saved':>8}")
+    for step, stats in metrics_registry.context_savings().items():
+        print(f"{step:<22}{stats['snapshot_tokens']:>16}{stats['context_tokens']:>14}{stats['saved']:>8.0%}")
+
+    for scenario, stats in summary.items():
+        if stats["first_error"]:
+            print(f"\nFirst {scenario} error: {stats['first_error']}")
+    return 1 if any(stats["errors"] for stats in summary.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
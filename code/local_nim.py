@@ -0,0 +1,298 @@
+"""
+Local stand-in for the NVIDIA API Catalog LLM and embedding endpoints.
+
+Serves the OpenAI-compatible routes the NVIDIA and NVIDIAEmbedding clients use (/v1/models, /v1/chat/completions,
+/v1/completions and /v1/embeddings) with configurable latency, token rate and error injection. Outputs are
+deterministic: the same prompt always gets the same response and the same text always gets the same embedding,
+so runs can be compared with each other.
+
+Start the server, then point the app at it with the NVIDIA_BASE_URL environment variable:
+    python local_nim.py --port 8000 --ttft 0.4 --tokens-per-second 40
+    NVIDIA_BASE_URL=http://localhost:8000/v1 streamlit run app.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+
+# Dimension of the NV-Embed-QA embeddings
+EMBEDDING_DIM = 1024
+
+# Words the deterministic responses are built from
+VOCABULARY = (
+    "the employee compensation benchmark salary growth performance review engagement survey benefits "
+    "enrollment retention recommendation rationale workload balance recognition promotion career "
+    "development manager team feedback consider offering adjust improve support flexible hours training"
+).split()
+
+
+class NIMConfig:
+    """Behaviour of the stand-in server."""
+
+    def __init__(self, ttft=0.3, ttft_jitter=0.1, tokens_per_second=50.0, response_tokens=200,
+                 embedding_latency=0.05, error_rate=0.0, rate_limit_rate=0.0, seed=0):
+        """
+        Parameters:
+            ttft (float): Mean seconds before the first token of a completion.
+            ttft_jitter (float): Maximum random deviation from ttft, in seconds.
+            tokens_per_second (float): Rate at which completion tokens are streamed.
+            response_tokens (int): Tokens per completion, capped by the request's max_tokens.
+            embedding_latency (float): Seconds per embedding request.
+            error_rate (float): Fraction of requests answered with HTTP 500.
+            rate_limit_rate (float): Fraction of requests answered with HTTP 429.
+            seed (int): Seed for latency jitter and error injection.
+        """
+        self.ttft = ttft
+        self.ttft_jitter = ttft_jitter
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.embedding_latency = embedding_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def random(self):
+        """Returns a random number in [0, 1) from the seeded generator, safe to call from any thread."""
+        with self._lock:
+            return self._rng.random()
+
+
+def _seed_for(text):
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def generate_tokens(prompt, n_tokens):
+    """
+    Generates a deterministic response for a prompt.
+
+    Parameters:
+        prompt (str): The full prompt text.
+        n_tokens (int): Number of tokens (words) to generate.
+
+    Returns:
+        list: Response tokens, each with its leading space.
+    """
+    rng = random.Random(_seed_for(prompt))
+    return [(" " if i else "") + rng.choice(VOCABULARY) for i in range(n_tokens)]
+
+
+def embed(text, dim=EMBEDDING_DIM):
+    """
+    Computes a deterministic embedding for a text.
+
+    Each word contributes a fixed pseudo-random vector, so texts sharing words are similar, which keeps
+    retrieval behaving plausibly.
+
+    Parameters:
+        text (str): Text to embed.
+        dim (int): Embedding dimension.
+
+    Returns:
+        ndarray: Unit-length float32 embedding.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        vector += np.random.default_rng(_seed_for(word)).standard_normal(dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class NIMHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the OpenAI-compatible routes."""
+
+    protocol_version = "HTTP/1.1"
+    config = NIMConfig()
+    model_ids = ["meta/llama-3.1-70b-instruct", "NV-Embed-QA"]
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_error(self):
+        """Answers the request with an injected error, if one is drawn. Returns True if it did."""
+        draw = self.config.random()
+        if draw < self.config.error_rate:
+            self._send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            return True
+        if draw < self.config.error_rate + self.config.rate_limit_rate:
+            self._send_json(429, {"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}})
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {
+                "object": "list",
+                "data": [{"id": model_id, "object": "model", "owned_by": "local"} for model_id in self.model_ids],
+            })
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown route {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        route = self.path.rstrip("/")
+
+        if self._inject_error():
+            return
+        if route == "/v1/chat/completions":
+            prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+            self._complete(request, prompt, chat=True)
+        elif route == "/v1/completions":
+            self._complete(request, str(request.get("prompt", "")), chat=False)
+        elif route == "/v1/embeddings":
+            self._embeddings(request)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown route {self.path}"}})
+
+    def _complete(self, request, prompt, chat):
+        config = self.config
+        n_tokens = min(config.response_tokens, request.get("max_tokens") or config.response_tokens)
+        tokens = generate_tokens(prompt, n_tokens)
+        completion_id = f"cmpl-{uuid.uuid4().hex}"
+        model = request.get("model", self.model_ids[0])
+        usage = {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens),
+                 "total_tokens": len(prompt.split()) + len(tokens)}
+
+        # Wait for the first token, with jitter
+        time.sleep(max(0.0, config.ttft + (2 * config.random() - 1) * config.ttft_jitter))
+        token_interval = 1.0 / config.tokens_per_second if config.tokens_per_second else 0.0
+
+        if not request.get("stream"):
+            time.sleep(token_interval * max(len(tokens) - 1, 0))
+            text = "".join(tokens)
+            choice = ({"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                      if chat else {"index": 0, "text": text, "finish_reason": "stop"})
+            self._send_json(200, {"id": completion_id, "object": "chat.completion" if chat else "text_completion",
+                                  "created": int(time.time()), "model": model, "choices": [choice], "usage": usage})
+            return
+
+        # Stream the tokens as server-sent events at the configured rate
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        for i, token in enumerate(tokens + [None]):
+            if i:
+                time.sleep(token_interval)
+            finish_reason = "stop" if token is None else None
+            if chat:
+                delta = {"role": "assistant", "content": token} if i == 0 else ({"content": token} if token else {})
+                choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            else:
+                choice = {"index": 0, "text": token or "", "finish_reason": finish_reason}
+            chunk = {"id": completion_id, "object": "chat.completion.chunk" if chat else "text_completion",
+                     "created": int(time.time()), "model": model, "choices": [choice]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _embeddings(self, request):
+        inputs = request.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        time.sleep(self.config.embedding_latency)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = embed(str(text))
+            if request.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        n_tokens = sum(len(str(text).split()) for text in inputs)
+        self._send_json(200, {"object": "list", "data": data, "model": request.get("model", "NV-Embed-QA"),
+                              "usage": {"prompt_tokens": n_tokens, "total_tokens": n_tokens}})
+
+
+class NIMServer(ThreadingHTTPServer):
+    """Threaded HTTP server that tolerates clients dropping their connections."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients close kept-alive connections at will, e.g. after an error response they retry elsewhere
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_server(config, host="127.0.0.1", port=8000):
+    """
+    Starts the stand-in server in a background thread.
+
+    Parameters:
+        config (NIMConfig): Behaviour of the server.
+        host (str): Interface to listen on.
+        port (int): Port to listen on; 0 picks a free port.
+
+    Returns:
+        NIMServer: The running server; its base URL is http://host:server.server_port/v1.
+    """
+    handler = type("ConfiguredNIMHandler", (NIMHandler,), {"config": config})
+    server = NIMServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    """Adds the NIMConfig options to an argument parser."""
+    parser.add_argument("--ttft", type=float, default=0.3, help="Mean seconds to first token (default: 0.3)")
+    parser.add_argument("--ttft-jitter", type=float, default=0.1, help="Max deviation from --ttft (default: 0.1)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Streaming rate (default: 50)")
+    parser.add_argument("--response-tokens", type=int, default=200, help="Tokens per completion (default: 200)")
+    parser.add_argument("--embedding-latency", type=float, default=0.05,
+                        help="Seconds per embedding request (default: 0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses (default: 0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of HTTP 429 responses (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and error injection (default: 0)")
+
+
+def config_from_args(args):
+    """Builds a NIMConfig from parsed add_config_arguments() options."""
+    return NIMConfig(args.ttft, args.ttft_jitter, args.tokens_per_second, args.response_tokens,
+                     args.embedding_latency, args.error_rate, args.rate_limit_rate, args.seed)
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the NVIDIA LLM and embedding endpoints.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000)")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = start_server(config_from_args(args), args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_port}/v1 (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
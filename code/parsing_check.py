@@ -0,0 +1,101 @@
+"""
+Regression check of how uploaded CSV files are parsed.
+
+Parses small benefits enrollment files written in the forms the app accepts (expected headers, custom headers
+renamed by a column mapping, and text values that need the fallback parser) and checks that the enrollment
+status comes out as bool and renders correctly in the employee snapshot. A status parsed as text would render
+every benefit as "Enrolled". Missing statuses count as not enrolled, and a file with a status that is not a
+True/False value must be rejected with a ValueError. The run fails if any case does not match.
+
+Example:
+    python parsing_check.py
+"""
+import sys
+import pandas as pd
+from ingestion import parse_csv
+from snapshots import SnapshotEngine
+from utils import rename_and_filter_columns
+
+
+# Benefits section every case must render for employee 1
+EXPECTED_BENEFITS = "- Health: Enrolled\n- Dental: Not Enrolled\n"
+
+# Mapping of the custom headers of the "custom headers" case to the expected names
+CUSTOM_MAPPING = {"Emp": "Employee ID", "Benefit": "Category", "Enrolled": "Enrollment Status"}
+
+# File contents of every case, and whether it uses the custom headers
+CASES = {
+    "expected headers": (b"Employee ID,Category,Enrollment Status\n1,Health,True\n1,Dental,False\n", False),
+    "custom headers": (b"Emp,Benefit,Enrolled\n1,Health,True\n1,Dental,False\n", True),
+    "semicolons, yes/no": (b"Employee ID;Category;Enrollment Status\n1;Health;yes\n1;Dental;no\n", False),
+    "Enrolled, blank": (b"Employee ID,Category,Enrollment Status\n1,Health,Enrolled\n1,Dental,\n", False),
+    "custom headers, blank": (b"Emp,Benefit,Enrolled\n1,Health,Y\n1,Dental,\n", True),
+}
+
+# File contents of the cases that must be rejected, and whether they use the custom headers
+REJECTED_CASES = {
+    "unknown status": (b"Employee ID,Category,Enrollment Status\n1,Health,maybe\n1,Dental,no\n", False),
+    "custom headers, unknown status": (b"Emp,Benefit,Enrolled\n1,Health,maybe\n1,Dental,no\n", True),
+}
+
+
+def check_case(data, mapped):
+    """
+    Parses one benefits file and renders its benefits section.
+
+    Parameters:
+        data (bytes): Contents of the CSV file.
+        mapped (bool): Whether the file uses CUSTOM_MAPPING's headers.
+
+    Returns:
+        list: Descriptions of what did not match; empty if the case passed.
+    """
+    df = parse_csv(data)
+    if mapped:
+        df = rename_and_filter_columns(df, CUSTOM_MAPPING)
+
+    problems = []
+    if not pd.api.types.is_bool_dtype(df["Enrollment Status"].dtype):
+        problems.append(f"Enrollment Status parsed as {df['Enrollment Status'].dtype}, not bool")
+    rendered = SnapshotEngine(benefits_df=df).sections["benefits"].get(1)
+    if rendered != EXPECTED_BENEFITS:
+        problems.append(f"benefits rendered as {rendered!r}")
+    return problems
+
+
+def check_rejected(data, mapped):
+    """
+    Parses one benefits file that must be rejected.
+
+    Parameters:
+        data (bytes): Contents of the CSV file.
+        mapped (bool): Whether the file uses CUSTOM_MAPPING's headers.
+
+    Returns:
+        list: Descriptions of what did not match; empty if the file was rejected.
+    """
+    try:
+        df = parse_csv(data)
+        if mapped:
+            rename_and_filter_columns(df, CUSTOM_MAPPING)
+    except ValueError:
+        return []
+    return ["file was accepted"]
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    failed = 0
+    cases = [(name, check_case, case) for name, case in CASES.items()]
+    cases += [(name, check_rejected, case) for name, case in REJECTED_CASES.items()]
+    for name, check, (data, mapped) in cases:
+        problems = check(data, mapped)
+        print(f"{name:<32}{'FAIL' if problems else 'ok'}")
+        for problem in problems:
+            print(f"    {problem}")
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,528 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+import chromadb
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from retrieval_cache import RetrievalCache
+
+
+# Root directory under which each document library keeps the manifest of its persisted index
+INDEX_ROOT = "/project/data/scratch/chroma"
+
+# Chroma database holding one collection of chunks per document library
+CHROMA_DIR = os.path.join(INDEX_ROOT, "db")
+
+# File recording which source files (by content hash) are in the persisted index
+MANIFEST_FILE = "manifest.json"
+
+# File recording the files that were removed or changed but whose chunks are kept for older index versions
+RETIRED_FILE = "retired.json"
+
+# Hidden file in a document directory recording the type of each document, by file name. The types are the
+# keys of the PDF uploads on the Data Upload page ("industry", "benefits").
+DOC_TYPES_FILE = ".doc_types.json"
+
+# Types of the sample documents shipped with the project, by library and file name. They are kept here rather
+# than in a DOC_TYPES_FILE because the data directory is stored in Git LFS.
+BUNDLED_DOC_TYPES = {
+    "sample_pdf": {
+        "B2B_SaaS_Sales_HR_Trends.pdf": "industry",
+        "NCorp_Employee_Benefits.pdf": "benefits",
+    },
+}
+
+# Type of documents without a recorded type; searches restricted to some types include them
+DEFAULT_DOC_TYPE = "general"
+
+# Content hash no chunk has, filtered on by versions without files so their searches return nothing
+NO_CONTENT_HASH = ""
+
+# Chunk size, in tokens, of the text chunks documents are split into
+CHUNK_SIZE = 256
+
+# Processes parsing and chunking new files in parallel
+PARSE_WORKERS = int(os.environ.get("RETAIN_AI_PARSE_WORKERS", min(os.cpu_count() or 1, 4)))
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """
+    Computes the SHA-256 hash of a file's contents.
+
+    Parameters:
+        file_path (str): Path of the file to hash.
+        block_size (int): Number of bytes read per iteration.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_documents(doc_dir):
+    """
+    Lists the documents in a directory keyed by content hash.
+
+    Hidden files are skipped, matching SimpleDirectoryReader's defaults. Files with identical
+    content collapse to a single entry, so a duplicated or renamed PDF is never embedded twice.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+
+    Returns:
+        dict: Mapping of content hash to file path.
+    """
+    documents = {}
+    if not os.path.isdir(doc_dir):
+        return documents
+
+    for name in sorted(os.listdir(doc_dir)):
+        path = os.path.join(doc_dir, name)
+        if name.startswith(".") or not os.path.isfile(path):
+            continue
+        documents.setdefault(file_hash(path), path)
+    return documents
+
+
+def get_persist_dir(doc_dir):
+    """
+    Returns the directory where the index for a document library is persisted.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+
+    Returns:
+        str: Persist directory, one per document library (e.g. sample_pdf, uploaded_pdf).
+    """
+    return os.path.join(INDEX_ROOT, os.path.basename(os.path.normpath(doc_dir)))
+
+
+def load_manifest(persist_dir, file_name=MANIFEST_FILE):
+    """
+    Loads the manifest of indexed files for a persisted index.
+
+    Parameters:
+        persist_dir (str): Directory the index is persisted in.
+        file_name (str): MANIFEST_FILE for the current files, RETIRED_FILE for the retired ones.
+
+    Returns:
+        dict: Mapping of content hash to {"file_name": str, "doc_ids": list}, empty if nothing is persisted.
+    """
+    manifest_path = os.path.join(persist_dir, file_name)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def get_index_version(doc_dir):
+    """
+    Returns a version identifier for the persisted index of a document library.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+
+    Returns:
+        str: Hex digest of the indexed files' content hashes; changes whenever a file is added, changed or removed.
+    """
+    return version_of(load_manifest(get_persist_dir(doc_dir)))
+
+
+def version_of(content_hashes):
+    """
+    Returns the index version of a set of files.
+
+    Parameters:
+        content_hashes (iterable): Content hashes of the indexed files.
+
+    Returns:
+        str: Hex digest of the sorted content hashes.
+    """
+    return hashlib.sha256("\n".join(sorted(content_hashes)).encode()).hexdigest()
+
+
+def save_manifest(persist_dir, manifest, file_name=MANIFEST_FILE):
+    """
+    Atomically writes the manifest of indexed files next to the persisted index.
+
+    Parameters:
+        persist_dir (str): Directory the index is persisted in.
+        manifest (dict): Mapping of content hash to indexed file details.
+        file_name (str): MANIFEST_FILE for the current files, RETIRED_FILE for the retired ones.
+    """
+    manifest_path = os.path.join(persist_dir, file_name)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def load_doc_types(doc_dir):
+    """
+    Loads the recorded types of the documents in a directory, starting from its BUNDLED_DOC_TYPES.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+
+    Returns:
+        dict: Mapping of file name to document type, empty if no types are recorded.
+    """
+    doc_types = dict(BUNDLED_DOC_TYPES.get(os.path.basename(os.path.normpath(doc_dir)), {}))
+    doc_types_path = os.path.join(doc_dir, DOC_TYPES_FILE)
+    if os.path.exists(doc_types_path):
+        with open(doc_types_path) as f:
+            doc_types.update(json.load(f))
+    return doc_types
+
+
+def save_doc_type(doc_dir, file_name, doc_type):
+    """
+    Atomically records the type of a document, before the document is indexed.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+        file_name (str): Name of the document file.
+        doc_type (str): Type of the document (e.g. "industry", "benefits").
+    """
+    doc_types_path = os.path.join(doc_dir, DOC_TYPES_FILE)
+    doc_types = {}
+    if os.path.exists(doc_types_path):
+        with open(doc_types_path) as f:
+            doc_types = json.load(f)
+    doc_types[file_name] = doc_type
+    tmp_path = doc_types_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(doc_types, f, indent=2)
+    os.replace(tmp_path, doc_types_path)
+
+
+def load_documents(file_path, content_hash, doc_type=DEFAULT_DOC_TYPE):
+    """
+    Reads a single file into documents whose IDs are derived from its content hash.
+
+    The documents are tagged with the content hash and document type, which searches filter on. The tags are
+    left out of the text that is embedded and sent to the LLM.
+
+    Parameters:
+        file_path (str): Path of the file to read.
+        content_hash (str): SHA-256 hash of the file contents.
+        doc_type (str): Type of the document.
+
+    Returns:
+        list: Documents (one per PDF page) with stable, content-addressed IDs.
+    """
+    documents = SimpleDirectoryReader(input_files=[file_path]).load_data()
+    for i, document in enumerate(documents):
+        document.id_ = f"{content_hash}-{i}"
+        document.metadata.update(content_hash=content_hash, doc_type=doc_type)
+        document.excluded_embed_metadata_keys.extend(["content_hash", "doc_type"])
+        document.excluded_llm_metadata_keys.extend(["content_hash", "doc_type"])
+    return documents
+
+
+def parse_file(file_path, content_hash, doc_type=DEFAULT_DOC_TYPE, chunk_size=CHUNK_SIZE):
+    """
+    Reads a single file and splits it into the text chunks that are embedded into the index.
+
+    Runs in the parsing worker processes, so it only uses its arguments and no llama_index Settings.
+
+    Parameters:
+        file_path (str): Path of the file to read.
+        content_hash (str): SHA-256 hash of the file contents.
+        doc_type (str): Type of the document.
+        chunk_size (int): Chunk size in tokens.
+
+    Returns:
+        tuple: IDs of the file's documents, and the chunks (TextNode) of all of them.
+    """
+    documents = load_documents(file_path, content_hash, doc_type)
+    nodes = SentenceSplitter(chunk_size=chunk_size).get_nodes_from_documents(documents)
+    return [document.id_ for document in documents], nodes
+
+
+def parse_files(files, doc_types=None, chunk_size=CHUNK_SIZE, max_workers=PARSE_WORKERS):
+    """
+    Parses and chunks many files, spread over a pool of worker processes.
+
+    A single file, or a single worker, is parsed in this process without starting a pool.
+
+    Parameters:
+        files (dict): Mapping of content hash to file path.
+        doc_types (dict or None): Mapping of content hash to document type; other files get DEFAULT_DOC_TYPE.
+        chunk_size (int): Chunk size in tokens.
+        max_workers (int): Maximum number of worker processes.
+
+    Returns:
+        dict: Mapping of content hash to the (document IDs, chunks) returned by parse_file().
+    """
+    doc_types = doc_types or {}
+    workers = min(max_workers, len(files))
+    if workers <= 1:
+        return {h: parse_file(path, h, doc_types.get(h, DEFAULT_DOC_TYPE), chunk_size) for h, path in files.items()}
+
+    # Spawn fresh workers: forking a process that runs Streamlit's threads can deadlock the children
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            h: pool.submit(parse_file, path, h, doc_types.get(h, DEFAULT_DOC_TYPE), chunk_size)
+            for h, path in files.items()
+        }
+        return {h: future.result() for h, future in futures.items()}
+
+
+def get_chroma_collection(doc_dir):
+    """
+    Opens the persistent Chroma collection holding the chunks of a document library.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+
+    Returns:
+        Collection: Collection named after the library (e.g. sample_pdf, uploaded_pdf), searched by cosine similarity.
+    """
+    client = chromadb.PersistentClient(path=CHROMA_DIR, settings=chromadb.Settings(anonymized_telemetry=False))
+    return client.get_or_create_collection(
+        os.path.basename(os.path.normpath(doc_dir)), metadata={"hnsw:space": "cosine"}
+    )
+
+
+def purge_retired(index, retired, in_use=()):
+    """
+    Deletes the chunks of retired files that no live index version searches any more.
+
+    Parameters:
+        index (VectorStoreIndex): The document index.
+        retired (dict): Mapping of content hash to the details of a retired file; purged files are removed.
+        in_use (set): Content hashes of the files of the index versions still in use.
+
+    Returns:
+        bool: Whether any file was purged.
+    """
+    purged = [h for h in retired if h not in in_use]
+    for content_hash in purged:
+        for doc_id in retired.pop(content_hash)["doc_ids"]:
+            index.delete_ref_doc(doc_id)
+    return bool(purged)
+
+
+def get_vector_index(doc_dir, in_use=()):
+    """
+    Loads the persisted vector index for a document library and brings it up to date.
+
+    The chunks are stored in a persistent Chroma collection, tagged with their file's content hash and
+    document type (from DOC_TYPES_FILE). Unchanged files are served straight from the collection without
+    any embedding calls. Only files whose content hash is new are parsed and chunked (across a process
+    pool) and embedded. Files that were removed or changed are retired: their chunks stay in the collection
+    while an index version in use still searches them, and are deleted by a later update once none does.
+    The embedding model is taken from llama_index Settings.
+
+    Parameters:
+        doc_dir (str): Directory containing the source documents.
+        in_use (set): Content hashes of the files of the index versions still in use.
+
+    Returns:
+        VectorStoreIndex: Index covering the files currently in doc_dir, plus retired files still in use.
+    """
+    persist_dir = get_persist_dir(doc_dir)
+    manifest = load_manifest(persist_dir)
+    retired = load_manifest(persist_dir, RETIRED_FILE)
+
+    # Open the persisted collection; if it was deleted, index every file again
+    collection = get_chroma_collection(doc_dir)
+    if collection.count() == 0:
+        manifest, retired = {}, {}
+    index = VectorStoreIndex.from_vector_store(ChromaVectorStore(chroma_collection=collection))
+
+    current = scan_documents(doc_dir)
+    doc_types = load_doc_types(doc_dir)
+    removed = [h for h in manifest if h not in current]
+
+    # Restore retired files that are back, e.g. a reverted change, whose chunks are still in the collection
+    restored = [h for h in current if h not in manifest and h in retired]
+    for content_hash in restored:
+        manifest[content_hash] = retired.pop(content_hash)
+    added = [h for h in current if h not in manifest]
+
+    # Retire files that were removed or whose content changed, and delete those no version in use searches
+    for content_hash in removed:
+        retired[content_hash] = manifest.pop(content_hash)
+    purged = purge_retired(index, retired, in_use)
+
+    # Drop chunks of new files left behind by an interrupted update, so they are not stored twice
+    if added:
+        collection.delete(where={"content_hash": {"$in": added}})
+
+    # Parse new or changed files in parallel, then embed all their chunks together in batches
+    added_types = {h: doc_types.get(os.path.basename(current[h]), DEFAULT_DOC_TYPE) for h in added}
+    parsed = parse_files({h: current[h] for h in added}, added_types)
+    index.insert_nodes([node for _, nodes in parsed.values() for node in nodes])
+    for content_hash, (doc_ids, _) in parsed.items():
+        manifest[content_hash] = {
+            "file_name": os.path.basename(current[content_hash]),
+            "doc_type": added_types[content_hash],
+            "doc_ids": doc_ids,
+        }
+
+    # Keep file names current for renamed files with unchanged content
+    renamed = False
+    for content_hash, path in current.items():
+        if manifest[content_hash]["file_name"] != os.path.basename(path):
+            manifest[content_hash]["file_name"] = os.path.basename(path)
+            renamed = True
+
+    # Persist only when something changed so a warm start stays read-only
+    if removed or restored or added or renamed or purged \
+            or not os.path.exists(os.path.join(persist_dir, MANIFEST_FILE)):
+        os.makedirs(persist_dir, exist_ok=True)
+        save_manifest(persist_dir, manifest)
+        save_manifest(persist_dir, retired, RETIRED_FILE)
+
+    return index
+
+
+class DocumentVersion:
+    """
+    One version of a document library's index, with the query engine and retrieval cache built on it.
+
+    All versions share the library's Chroma collection, but every search of a version is restricted to the
+    files it was built from. A query or workflow run that holds on to a version therefore sees the same
+    documents from start to finish, even while a newer version adds files to the collection or removes them:
+    the chunks of removed or changed files are only deleted once no version in use searches them.
+    """
+
+    def __init__(self, index, build_query_engine, content_hashes):
+        """
+        Parameters:
+            index (VectorStoreIndex): The document index.
+            build_query_engine (callable): Builds the query engine from the index and the version's MetadataFilters.
+            content_hashes (iterable): Content hashes of the files in this version.
+        """
+        self.index = index
+        self.content_hashes = sorted(content_hashes)
+        self.version = version_of(self.content_hashes)
+        self.query_engine = build_query_engine(index, self.filters())
+        self.retrieval_cache = RetrievalCache()
+
+    def filters(self, doc_types=None):
+        """
+        Returns the metadata filters restricting a search to this version's files.
+
+        Parameters:
+            doc_types (list or None): Document types to search; documents without a type are always included.
+
+        Returns:
+            MetadataFilters: The filters. A version without files matches no chunk, since the collection may
+                still hold the chunks of retired files.
+        """
+        if self.content_hashes:
+            filters = [MetadataFilter(key="content_hash", operator=FilterOperator.IN, value=self.content_hashes)]
+        else:
+            filters = [MetadataFilter(key="content_hash", operator=FilterOperator.EQ, value=NO_CONTENT_HASH)]
+        if doc_types:
+            filters.append(
+                MetadataFilter(key="doc_type", operator=FilterOperator.IN, value=[*doc_types, DEFAULT_DOC_TYPE])
+            )
+        return MetadataFilters(filters=filters)
+
+    def retrieve(self, query_bundle, doc_types=None):
+        """
+        Searches this version's documents, optionally only those of some types.
+
+        Parameters:
+            query_bundle (QueryBundle): The query, with its embedding if already computed.
+            doc_types (list or None): Document types to search (e.g. ["benefits"]); None searches all documents.
+
+        Returns:
+            list: The retrieved nodes (NodeWithScore), as many as the query engine retrieves; none if the
+                version has no files.
+        """
+        if not self.content_hashes:
+            return []
+        if not doc_types:
+            return self.query_engine.retrieve(query_bundle)
+
+        retriever = self.index.as_retriever(
+            similarity_top_k=self.query_engine.retriever.similarity_top_k, filters=self.filters(doc_types)
+        )
+        return retriever.retrieve(query_bundle)
+
+    async def aretrieve(self, query_bundle, doc_types=None):
+        """
+        Async version of retrieve(). The Chroma client is synchronous, so the search runs in a worker thread
+        rather than on the event loop; it is local and short, unlike the LLM and embedding requests.
+
+        Parameters:
+            query_bundle (QueryBundle): The query, with its embedding already computed.
+            doc_types (list or None): Document types to search; None searches all documents.
+
+        Returns:
+            list: The retrieved nodes (NodeWithScore).
+        """
+        return await asyncio.to_thread(self.retrieve, query_bundle, doc_types)
+
+
+class DocumentLibrary:
+    """
+    Live, process-wide index of a document directory that picks up new files without a restart.
+
+    refresh() builds the next version next to the one in use: it upserts new or changed files into the
+    persisted index and retires deleted ones, then publishes the result with a single reference swap.
+    Sessions get the new version on their next call to current(); runs already holding a previous version
+    finish on it. The library tracks its versions with weak references, so the chunks of retired files are
+    kept for as long as any version still referenced somewhere searches them.
+    """
+
+    def __init__(self, doc_dir, build_query_engine):
+        """
+        Parameters:
+            doc_dir (str): Directory containing the source documents.
+            build_query_engine (callable): Builds the query engine of a version from its VectorStoreIndex
+                and MetadataFilters.
+        """
+        self.doc_dir = doc_dir
+        self.build_query_engine = build_query_engine
+        self._current = None
+        self._versions = weakref.WeakSet()
+        self._refresh_lock = threading.Lock()
+
+    def current(self):
+        """
+        Returns the version in use, building the first one if needed.
+
+        Returns:
+            DocumentVersion: The latest published version.
+        """
+        current = self._current
+        if current is None:
+            current = self.refresh()
+        return current
+
+    def refresh(self):
+        """
+        Brings the index up to date with the document directory and publishes the new version.
+
+        Refreshes are serialized; when no file was added, changed or removed, the version in use is kept.
+
+        Returns:
+            DocumentVersion: The latest published version.
+        """
+        with self._refresh_lock:
+            if self._current is not None and self._current.version == version_of(scan_documents(self.doc_dir)):
+                return self._current
+
+            in_use = {h for version in list(self._versions) for h in version.content_hashes}
+            index = get_vector_index(self.doc_dir, in_use)
+            content_hashes = load_manifest(get_persist_dir(self.doc_dir))
+            self._current = DocumentVersion(index, self.build_query_engine, content_hashes)
+            self._versions.add(self._current)
+            return self._current
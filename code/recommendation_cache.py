@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+# SQLite database holding generated retention recommendations
+CACHE_PATH = "/project/data/scratch/recommendations.sqlite3"
+
+# Default eviction policy: keep at most this many recommendations, each for at most this long
+MAX_ENTRIES = 1000
+TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def recommendation_key(employee_snapshot, prompt_version, model_name, index_version):
+    """
+    Builds the cache key for a recommendation.
+
+    A recommendation is reused only if the employee's data, the workflow prompts, the LLM and the
+    document index are all unchanged.
+
+    Parameters:
+        employee_snapshot (EmployeeSnapshot or str): The employee snapshot the workflow is run on.
+        prompt_version (str): Version of the RetentionFlow prompts.
+        model_name (str): Name of the LLM generating the recommendation.
+        index_version (str): Version of the document index used for retrieval.
+
+    Returns:
+        str: Hex digest identifying the recommendation.
+    """
+    digest = hashlib.sha256()
+    for part in (employee_snapshot, prompt_version, model_name, index_version):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RecommendationCache:
+    """
+    On-disk cache of generated retention recommendations with LRU and TTL eviction.
+
+    Every operation opens its own SQLite connection, so the cache can be shared by all Streamlit sessions
+    and threads in the process (and by other processes on the same machine).
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        """
+        Parameters:
+            path (str): SQLite database file.
+            max_entries (int): Maximum number of recommendations kept; least recently used are evicted first.
+            ttl_seconds (float): Age after which a recommendation is no longer served.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    key TEXT PRIMARY KEY,
+                    recommendation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS recommendations_last_accessed ON recommendations (last_accessed)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection to the cache database, committing and closing it when done."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """
+        Returns a cached recommendation and marks it as recently used.
+
+        Parameters:
+            key (str): Key built with recommendation_key().
+
+        Returns:
+            str or None: The recommendation, or None if it is not cached or has expired.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT recommendation FROM recommendations WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE recommendations SET last_accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, recommendation):
+        """
+        Stores a recommendation and evicts expired and least recently used entries.
+
+        Parameters:
+            key (str): Key built with recommendation_key().
+            recommendation (str): The generated recommendation.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO recommendations (key, recommendation, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, recommendation, now, now),
+            )
+            conn.execute("DELETE FROM recommendations WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM recommendations WHERE key NOT IN "
+                "(SELECT key FROM recommendations ORDER BY last_accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, key=None):
+        """
+        Removes one recommendation, or all of them.
+
+        Parameters:
+            key (str or None): Key to remove; None clears the whole cache.
+        """
+        with self._connect() as conn:
+            if key is None:
+                conn.execute("DELETE FROM recommendations")
+            else:
+                conn.execute("DELETE FROM recommendations WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
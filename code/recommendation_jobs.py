@@ -0,0 +1,338 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import streamlit as st
+from batch_recommendations import REQUESTS_PER_MINUTE, RateLimiter
+from recommendation_cache import recommendation_key
+from utils import LLM_MODEL, get_document_index, get_recommendation_cache, get_step_checkpoints
+
+
+# Recommendation workflows the background executor runs at once; later jobs wait in the queue
+MAX_RUNNING_JOBS = int(os.environ.get("RETAIN_AI_MAX_RUNNING_JOBS", "4"))
+
+# Seconds a recommendation may take before the workflow times out
+WORKFLOW_TIMEOUT = 120
+
+# Finished jobs the executor keeps for lookup by ID; the oldest are dropped first
+MAX_FINISHED_JOBS = 500
+
+# Session state keys of the jobs the session has queued one by one, and of its latest batch
+SESSION_JOBS_KEY = "recommendation_jobs"
+SESSION_BATCH_KEY = "recommendation_batch"
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class RecommendationJob:
+    """
+    A retention recommendation queued for one employee.
+
+    The executor thread updates the job's status, progress and partial analyses while its workflow runs,
+    and the page reads them on every rerun. Each update replaces the attribute rather than changing it in
+    place, so the page never sees a half-written value.
+    """
+
+    def __init__(self, employee_name, employee_snapshot, cache_key):
+        """
+        Parameters:
+            employee_name (str): Name shown for the job.
+            employee_snapshot (EmployeeSnapshot or str): Snapshot the workflow is run with.
+            cache_key (str): Recommendation cache key of the employee's recommendation.
+        """
+        self.job_id = uuid.uuid4().hex[:12]
+        self.employee_name = employee_name
+        self.employee_snapshot = employee_snapshot
+        self.cache_key = cache_key
+        self.status = QUEUED
+        self.progress = 0
+        self.progress_text = "Queued"
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.from_cache = False
+        self.missing_analyses = []
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        """bool: Whether the job is done or failed."""
+        return self.status in (DONE, FAILED)
+
+    def set_progress(self, percent, text):
+        """Progress callback of the job's workflow."""
+        self.progress, self.progress_text = percent, text
+
+    def set_partial(self, label, text):
+        """Partial-output callback of the job's workflow: keeps the text of each analysis so far."""
+        self.partial = {**self.partial, label: text}
+
+    def finish(self, result, from_cache=False, missing_analyses=()):
+        """Marks the job as done with its recommendation and the analyses it had to do without, if any."""
+        self.result = result
+        self.from_cache = from_cache
+        self.missing_analyses = list(missing_analyses)
+        self.progress, self.progress_text = 100, "Done"
+        self.finished_at = time.time()
+        self.status = DONE
+
+    def fail(self, error):
+        """Marks the job as failed with the error that stopped its workflow."""
+        self.error = f"{type(error).__name__}: {error}"
+        self.finished_at = time.time()
+        self.status = FAILED
+
+
+class RecommendationJobQueue:
+    """
+    Process-wide background executor of recommendation jobs.
+
+    Jobs run as RetentionFlow workflows on one event loop in a daemon thread, so they keep running when the
+    Streamlit script run that queued them ends or is rerun, and the workflows of all sessions share the
+    loop's connection pool. At most max_running workflows run at once; the other jobs wait in the order they
+    were queued. The LLM requests of rate-limited jobs (batches) share one rate limiter.
+    """
+
+    def __init__(self, max_running=MAX_RUNNING_JOBS, workflow_timeout=WORKFLOW_TIMEOUT,
+                 max_finished=MAX_FINISHED_JOBS, requests_per_minute=REQUESTS_PER_MINUTE):
+        """
+        Parameters:
+            max_running (int): Workflows run at once.
+            workflow_timeout (float): Seconds a workflow may take before it fails with a timeout.
+            max_finished (int): Finished jobs kept for lookup by ID.
+            requests_per_minute (float): LLM requests rate-limited jobs start per minute, all together.
+        """
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.max_running = max_running
+        self.workflow_timeout = workflow_timeout
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._semaphore = None
+
+    def _get_loop(self):
+        """Returns the executor's event loop, starting its thread on first use. Called with the lock held."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._semaphore = asyncio.Semaphore(self.max_running)
+            threading.Thread(target=self._loop.run_forever, name="recommendation-jobs", daemon=True).start()
+        return self._loop
+
+    def _prune(self):
+        """Drops the oldest finished jobs beyond max_finished. Called with the lock held."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def submit(self, employee_name, employee_snapshot, cache_key, document_index, cache, checkpoints=None,
+               rate_limited=False):
+        """
+        Queues a recommendation, unless one for the same cache key is already queued or running.
+
+        Parameters:
+            employee_name (str): Name shown for the job.
+            employee_snapshot (EmployeeSnapshot or str): Snapshot the workflow is run with.
+            cache_key (str): Recommendation cache key the result is stored under.
+            document_index (DocumentVersion): Document index version the workflow retrieves from.
+            cache (RecommendationCache): Cache the result is added to.
+            checkpoints (StepCheckpointStore or None): Store the workflow checkpoints its analyses to.
+            rate_limited (bool): Whether the job's LLM requests go through the queue's rate limiter.
+
+        Returns:
+            RecommendationJob: The new job, or the pending job for the same cache key.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.cache_key == cache_key and not job.finished:
+                    return job
+
+            job = RecommendationJob(employee_name, employee_snapshot, cache_key)
+            self._jobs[job.job_id] = job
+            self._prune()
+            loop = self._get_loop()
+
+        rate_limiter = self.rate_limiter if rate_limited else None
+        asyncio.run_coroutine_threadsafe(self._run(job, document_index, cache, checkpoints, rate_limiter), loop)
+        return job
+
+    def add_finished(self, employee_name, employee_snapshot, cache_key, result):
+        """
+        Records a recommendation that is already available (e.g. from the cache) as a finished job.
+
+        Returns:
+            RecommendationJob: The finished job.
+        """
+        job = RecommendationJob(employee_name, employee_snapshot, cache_key)
+        job.finish(result, from_cache=True)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id):
+        """
+        Returns a job by its ID.
+
+        Parameters:
+            job_id (str): ID of the job.
+
+        Returns:
+            RecommendationJob or None: The job, or None if it is unknown or was dropped.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+    async def _run(self, job, document_index, cache, checkpoints, rate_limiter):
+        """
+        Runs a job's workflow once a slot is free and stores its outcome on the job. Only complete
+        recommendations are cached; one synthesized without some analyses is regenerated by a retry, which
+        resumes the checkpointed analyses. Any error fails the job, so it never stays running.
+        """
+        try:
+            from workflow import RetentionFlow
+
+            async with self._semaphore:
+                job.status = RUNNING
+                job.set_progress(0, "Analyzing employee data...")
+                flow = RetentionFlow(timeout=self.workflow_timeout, stream_output=False,
+                                     document_index=document_index, checkpoints=checkpoints,
+                                     rate_limiter=rate_limiter, progress_callback=job.set_progress,
+                                     partial_callback=job.set_partial)
+                result = await flow.run(employee_snapshot=job.employee_snapshot)
+
+            if not flow.missing_analyses:
+                await asyncio.to_thread(cache.put, job.cache_key, result)
+        except Exception as e:
+            job.fail(e)
+            return
+        job.finish(result, missing_analyses=flow.missing_analyses)
+
+
+# Process-wide executor shared by all sessions
+job_queue = RecommendationJobQueue()
+
+
+def _queue_job(employee_name, employee_snapshot, rate_limited=False):
+    """
+    Queues a retention recommendation for an employee, or returns a finished job if it is already cached.
+    Must be called from the Streamlit script, which resolves the session's document index.
+
+    Returns:
+        RecommendationJob: The job.
+    """
+    # The workflow loads llama_index, so it is imported only when a recommendation is requested
+    from workflow import PROMPT_VERSION
+
+    document_index = get_document_index()
+    cache = get_recommendation_cache()
+    cache_key = recommendation_key(employee_snapshot, PROMPT_VERSION, LLM_MODEL, document_index.version)
+
+    recommendation = cache.get(cache_key)
+    if recommendation is not None:
+        return job_queue.add_finished(employee_name, employee_snapshot, cache_key, recommendation)
+    return job_queue.submit(employee_name, employee_snapshot, cache_key, document_index, cache,
+                            get_step_checkpoints(), rate_limited=rate_limited)
+
+
+def queue_recommendation(employee_name, employee_snapshot):
+    """
+    Queues a retention recommendation for an employee and adds the job to the session's jobs.
+
+    A recommendation already in the recommendation cache is added as a finished job right away. Must be called
+    from the Streamlit script, which resolves the session's document index.
+
+    Parameters:
+        employee_name (str): Name of the employee.
+        employee_snapshot (EmployeeSnapshot or str): Snapshot of the employee.
+
+    Returns:
+        RecommendationJob: The job.
+    """
+    job = _queue_job(employee_name, employee_snapshot)
+    st.session_state.setdefault(SESSION_JOBS_KEY, {})[job.job_id] = job
+    return job
+
+
+def queue_batch(df, snapshots):
+    """
+    Queues recommendations for many employees as the session's batch, replacing its previous batch.
+
+    Batch jobs are rate limited and share the queue's running slots with single recommendations. Cached
+    recommendations finish right away and pending ones are reused, so queuing an interrupted or partly
+    failed batch again only runs the employees that are missing, resuming their checkpointed analyses.
+
+    Parameters:
+        df (DataFrame): Employees, with "Employee ID", "Full Name" and "Attrition Probability" columns.
+        snapshots (Series): EmployeeSnapshot of each employee, aligned with the DataFrame's index.
+
+    Returns:
+        list: Batch entries, each with the employee's ID, name and attrition probability and the "job".
+    """
+    entries = []
+    for index, employee in df.iterrows():
+        entries.append({
+            "Employee ID": str(employee["Employee ID"]),
+            "Full Name": employee["Full Name"],
+            "Attrition Probability": float(employee["Attrition Probability"]),
+            "job": _queue_job(employee["Full Name"], snapshots.loc[index], rate_limited=True),
+        })
+    st.session_state[SESSION_BATCH_KEY] = entries
+    return entries
+
+
+def session_batch():
+    """
+    Returns the entries of the session's latest batch, as returned by queue_batch().
+
+    Returns:
+        list: The batch entries; empty if the session has not queued a batch.
+    """
+    return st.session_state.get(SESSION_BATCH_KEY, [])
+
+
+def batch_results(entries):
+    """
+    Converts the finished recommendations of a batch into result records for results_to_frame().
+
+    Parameters:
+        entries (list): Batch entries returned by queue_batch().
+
+    Returns:
+        list: One record per employee whose recommendation is done.
+    """
+    return [
+        {**{k: v for k, v in entry.items() if k != "job"},
+         "Recommendation": entry["job"].result, "cache_key": entry["job"].cache_key}
+        for entry in entries if entry["job"].status == DONE
+    ]
+
+
+def session_jobs():
+    """
+    Returns the jobs the session has queued, newest first.
+
+    The jobs are kept in session state, so they and their results survive reruns of the page.
+
+    Returns:
+        list: The session's RecommendationJob objects.
+    """
+    jobs = st.session_state.get(SESSION_JOBS_KEY, {})
+    return sorted(jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+
+def clear_finished_jobs():
+    """Removes the finished jobs from the session's jobs."""
+    jobs = st.session_state.get(SESSION_JOBS_KEY, {})
+    st.session_state[SESSION_JOBS_KEY] = {job_id: job for job_id, job in jobs.items() if not job.finished}
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+
+
+# Number of retrieval queries whose results are kept in memory
+MAX_CACHED_QUERIES = 256
+
+
+class RetrievalCache:
+    """
+    In-memory LRU cache of document index search results, keyed by retrieval query.
+
+    The workflow steps retrieve with fixed, purpose-built queries, so after the first recommendation every
+    step's context comes from the cache without embedding the query or searching the index. A cache belongs
+    to one document index and must be cleared whenever that index changes. Cached node lists are shared and
+    must not be modified.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_QUERIES):
+        """
+        Parameters:
+            max_entries (int): Number of queries whose results are kept.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        """
+        Returns the cached results of a query.
+
+        Parameters:
+            query (str): Retrieval query.
+
+        Returns:
+            list or None: The retrieved nodes (NodeWithScore), or None if the query is not cached.
+        """
+        with self._lock:
+            nodes = self._entries.get(query)
+            if nodes is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return nodes
+
+    def put(self, query, nodes):
+        """
+        Caches the results of a query, evicting the least recently used query if the cache is full.
+
+        Parameters:
+            query (str): Retrieval query.
+            nodes (list): The retrieved nodes (NodeWithScore).
+        """
+        with self._lock:
+            self._entries[query] = nodes
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes all cached results, e.g. after the document index changed."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,272 @@
+"""
+Headless bulk scorer for employee attrition.
+
+Streams a CSV or Parquet export in chunks, scores the chunks across a process pool with the saved
+attrition pipeline, and writes the results incrementally, so memory stays bounded for exports of any size.
+
+Example:
+    python score_employees.py hris_export.parquet scores.csv --mapping mappings.json --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import pandas as pd
+from scoring import MODEL_PATH, load_attrition_model
+from ingestion import COLUMN_DTYPES, SNIFF_BYTES, sniff_delimiter
+from utils import auto_map_columns, expected_columns_sets, rename_and_filter_columns
+
+
+# Nullable dtypes the declared integer, Boolean and text columns are read and written with, so a chunk with
+# missing values gets the same dtype as the other chunks
+NULLABLE_DTYPES = {"int64": "Int64", "bool": "boolean", "object": "string"}
+
+# Column mappings applied to every chunk in a worker process, set by the pool initializer
+_column_mappings = None
+
+
+def input_dtypes(columns, column_mappings=None):
+    """
+    Returns the dtypes the columns of an input file are read with.
+
+    Columns mapped to (or named like) an expected column get its declared dtype in nullable form, so every
+    chunk is parsed the same way; text columns are read as object, as the app's parser does.
+
+    Parameters:
+        columns (list): Column names of the input file.
+        column_mappings (dict or None): Mapping of input column names to expected column names.
+
+    Returns:
+        dict: Dtype of every input column with a declared dtype.
+    """
+    column_mappings = column_mappings or {}
+    dtypes = {}
+    for col in columns:
+        declared = COLUMN_DTYPES.get(column_mappings.get(col, col))
+        if declared is not None:
+            dtypes[col] = "object" if declared == "object" else NULLABLE_DTYPES[declared]
+    return dtypes
+
+
+def output_dtypes(df):
+    """
+    Returns the fixed dtypes results are written with, derived from the first scored chunk.
+
+    Declared columns get their nullable dtype, other integer columns Int64, other numeric columns float64
+    and the remaining ones string, so chunks whose inferred dtypes differ (e.g. an integer column with a
+    missing value) share one schema.
+
+    Parameters:
+        df (DataFrame): The first scored chunk.
+
+    Returns:
+        dict: Dtype of every column.
+    """
+    dtypes = {}
+    for col in df.columns:
+        if col in COLUMN_DTYPES:
+            dtypes[col] = NULLABLE_DTYPES[COLUMN_DTYPES[col]]
+        elif pd.api.types.is_bool_dtype(df[col].dtype):
+            dtypes[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(df[col].dtype):
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_numeric_dtype(df[col].dtype):
+            dtypes[col] = "float64"
+        else:
+            dtypes[col] = "string"
+    return dtypes
+
+
+def read_chunks(input_path, chunksize, column_mappings=None):
+    """
+    Streams an input file as DataFrame chunks, reading CSV columns with their declared dtypes.
+
+    Parameters:
+        input_path (str): Path of a CSV or Parquet file.
+        chunksize (int): Number of rows per chunk.
+        column_mappings (dict or None): Mapping of input column names to expected column names, used to find
+            the declared dtype of renamed columns.
+
+    Yields:
+        DataFrame: The next chunk of rows.
+    """
+    if input_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        # Detect the delimiter from a small prefix, then parse with the fast C engine
+        with open(input_path, "rb") as f:
+            delimiter = sniff_delimiter(f.read(SNIFF_BYTES))
+        header = pd.read_csv(input_path, sep=delimiter, nrows=0).columns
+        yield from pd.read_csv(input_path, sep=delimiter, chunksize=chunksize,
+                               dtype=input_dtypes(header, column_mappings))
+
+
+class ResultWriter:
+    """
+    Appends scored chunks to a CSV or Parquet output file as they arrive.
+
+    Parquet files have one schema for all chunks, so every chunk is cast to the dtypes of output_dtypes()
+    for the first one before it is written.
+    """
+
+    def __init__(self, output_path):
+        """
+        Parameters:
+            output_path (str): Path of the CSV or Parquet file to write.
+        """
+        self.output_path = output_path
+        self._parquet_writer = None
+        self._dtypes = None
+        self._header_written = False
+
+    def write(self, df):
+        """
+        Appends a chunk of results to the output file.
+
+        Parameters:
+            df (DataFrame): Scored rows.
+        """
+        if self.output_path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._dtypes is None:
+                self._dtypes = output_dtypes(df)
+            table = pa.Table.from_pandas(df.astype(self._dtypes), preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.output_path, mode="a" if self._header_written else "w",
+                      header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        """Finalizes the output file."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _init_worker(column_mappings, model_path):
+    """
+    Loads the attrition pipeline once per worker process and stores the column mappings.
+
+    Parameters:
+        column_mappings (dict or None): Mapping of input column names to expected column names.
+        model_path (str): Path of the saved joblib pipeline.
+    """
+    global _column_mappings
+    _column_mappings = column_mappings
+    load_attrition_model(model_path)
+
+
+def score_chunk(chunk, column_mappings=None, model_path=MODEL_PATH, keep_columns=False):
+    """
+    Maps and scores one chunk of employee rows.
+
+    Parameters:
+        chunk (DataFrame): Raw rows from the input file.
+        column_mappings (dict or None): Mapping of input column names to expected column names.
+        model_path (str): Path of the saved joblib pipeline.
+        keep_columns (bool): Whether to return all mapped columns or only Employee ID and the probability.
+
+    Returns:
+        DataFrame: Scored rows with an "Attrition Probability" column.
+    """
+    df = rename_and_filter_columns(chunk, column_mappings) if column_mappings else chunk
+    probabilities = load_attrition_model(model_path).predict_proba(df)[:, 1]
+
+    if keep_columns:
+        return df.assign(**{"Attrition Probability": probabilities})
+    result = df[["Employee ID"]].copy() if "Employee ID" in df.columns else pd.DataFrame(index=df.index)
+    result["Attrition Probability"] = probabilities
+    return result
+
+
+def _score_in_worker(chunk, model_path, keep_columns):
+    """Scores a chunk in a pool worker using the mappings set by the initializer."""
+    return score_chunk(chunk, _column_mappings, model_path, keep_columns)
+
+
+def score_file(input_path, output_path, column_mappings=None, chunksize=100_000, workers=None,
+               model_path=MODEL_PATH, keep_columns=False):
+    """
+    Scores an employee export chunk by chunk across a process pool and writes results in input order.
+
+    At most two chunks per worker are in flight at any time, which bounds memory use regardless of input size.
+
+    Parameters:
+        input_path (str): Path of a CSV or Parquet file with employee data.
+        output_path (str): Path of the CSV or Parquet file to write.
+        column_mappings (dict or None): Mapping of input column names to expected column names.
+        chunksize (int): Number of rows per chunk.
+        workers (int or None): Number of worker processes; defaults to the number of CPUs.
+        model_path (str): Path of the saved joblib pipeline.
+        keep_columns (bool): Whether to write all mapped columns or only Employee ID and the probability.
+
+    Returns:
+        dict: Number of rows scored, elapsed seconds and rows per second.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(output_path)
+    rows = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(column_mappings, model_path)) as pool:
+        pending = deque()
+        for chunk in read_chunks(input_path, chunksize, column_mappings):
+            pending.append(pool.submit(_score_in_worker, chunk, model_path, keep_columns))
+
+            # Write finished chunks in order once enough work is queued to keep every worker busy
+            while len(pending) >= 2 * workers:
+                result = pending.popleft().result()
+                writer.write(result)
+                rows += len(result)
+
+        while pending:
+            result = pending.popleft().result()
+            writer.write(result)
+            rows += len(result)
+
+    writer.close()
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed else 0.0}
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Score employee attrition risk for a CSV or Parquet export.")
+    parser.add_argument("input", help="CSV or Parquet file with employee data")
+    parser.add_argument("output", help="CSV or Parquet file to write the scores to")
+    parser.add_argument("--mapping", help="JSON file mapping input column names to expected column names")
+    parser.add_argument("--auto-map", action="store_true",
+                        help="Map input columns to expected columns with fuzzy matching")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk (default: 100000)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--model", default=MODEL_PATH, help="Path of the saved attrition pipeline")
+    parser.add_argument("--keep-columns", action="store_true",
+                        help="Write all mapped columns instead of only Employee ID and the probability")
+    args = parser.parse_args(argv)
+
+    column_mappings = None
+    if args.mapping:
+        with open(args.mapping) as f:
+            column_mappings = json.load(f)
+    elif args.auto_map:
+        header = next(read_chunks(args.input, 1)).columns
+        column_mappings = auto_map_columns(header, expected_columns_sets["employee"])
+
+    stats = score_file(args.input, args.output, column_mappings, args.chunksize, args.workers,
+                       args.model, args.keep_columns)
+    print(f"Scored {stats['rows']} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from joblib import load
+from snapshots import data_version
+from compiled_model import CompiledAttritionModel
+from telemetry import metrics_registry
+
+
+# Location of the trained attrition pipeline (feature engineering, preprocessing and RandomForest)
+MODEL_PATH = "/project/models/attrition_model_pipeline.joblib"
+
+# Location of the array-backed export of the pipeline (see compiled_model.py), used for small batches
+COMPILED_MODEL_PATH = "/project/models/attrition_model_compiled.npz"
+
+# Largest batch scored with the compiled model; its per-call overhead is far lower than the pipeline's,
+# but the pipeline's Cython tree traversal wins on large batches. Both give identical probabilities.
+COMPILED_BATCH_LIMIT = 256
+
+
+@lru_cache(maxsize=None)
+def load_attrition_model(model_path=MODEL_PATH):
+    """
+    Loads the trained attrition pipeline once per process.
+
+    Parameters:
+        model_path (str): Path of the saved joblib pipeline.
+
+    Returns:
+        Pipeline: The fitted scikit-learn pipeline.
+    """
+    return load(model_path)
+
+
+@lru_cache(maxsize=None)
+def load_compiled_model(compiled_model_path=COMPILED_MODEL_PATH, model_path=MODEL_PATH):
+    """
+    Loads the compiled attrition model once per process, if an up-to-date export exists.
+
+    Parameters:
+        compiled_model_path (str): Path of the .npz archive written by compiled_model.py.
+        model_path (str): Path of the saved joblib pipeline the export was made from.
+
+    Returns:
+        CompiledAttritionModel or None: The compiled model, or None if there is no export or it is
+            older than the pipeline.
+    """
+    if not os.path.exists(compiled_model_path):
+        return None
+    if os.path.exists(model_path) and os.path.getmtime(compiled_model_path) < os.path.getmtime(model_path):
+        return None
+    return CompiledAttritionModel.load(compiled_model_path)
+
+
+class PredictionCache:
+    """
+    LRU cache of attrition probabilities keyed by a content hash of the employee DataFrame.
+
+    Hit and miss counters are kept so the cache's effectiveness can be checked; they are exported on the
+    metrics endpoint.
+    """
+
+    def __init__(self, max_entries=16):
+        """
+        Parameters:
+            max_entries (int): Number of distinct DataFrames whose predictions are kept.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def predict(self, model, df):
+        """
+        Returns the attrition probability for every row, running the model only for unseen data.
+
+        Parameters:
+            model (Pipeline): Fitted attrition pipeline.
+            df (DataFrame): Mapped employee data.
+
+        Returns:
+            ndarray: Probability of attrition for each row of df.
+        """
+        key = data_version(df)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        predictions = model.predict_proba(df)[:, 1]
+        predictions.setflags(write=False)
+
+        with self._lock:
+            self._entries[key] = predictions
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return predictions
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Number of hits, misses, cached entries and the hit rate.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def metrics_lines(self):
+        """
+        Returns:
+            list: The cache statistics in the Prometheus text exposition format.
+        """
+        stats = self.stats()
+        return [
+            "# HELP retain_ai_prediction_cache_lookups_total Prediction cache lookups by result.",
+            "# TYPE retain_ai_prediction_cache_lookups_total counter",
+            f'retain_ai_prediction_cache_lookups_total{{result="hit"}} {stats["hits"]}',
+            f'retain_ai_prediction_cache_lookups_total{{result="miss"}} {stats["misses"]}',
+            "# HELP retain_ai_prediction_cache_entries DataFrames whose predictions are cached.",
+            "# TYPE retain_ai_prediction_cache_entries gauge",
+            f"retain_ai_prediction_cache_entries {stats['entries']}",
+        ]
+
+    def clear(self):
+        """Drops all cached predictions and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Process-wide prediction cache shared by all sessions
+prediction_cache = PredictionCache()
+metrics_registry.set_collector("prediction_cache", prediction_cache.metrics_lines)
+
+
+def predict_attrition(df, model_path=MODEL_PATH):
+    """
+    Predicts attrition probabilities with the cached model and prediction cache.
+
+    Small batches use the compiled model when it has been exported; everything else uses the pipeline.
+
+    Parameters:
+        df (DataFrame): Mapped employee data.
+        model_path (str): Path of the saved joblib pipeline.
+
+    Returns:
+        ndarray: Probability of attrition for each row of df.
+    """
+    model = load_compiled_model(model_path=model_path) if len(df) <= COMPILED_BATCH_LIMIT else None
+    if model is None:
+        model = load_attrition_model(model_path)
+    return prediction_cache.predict(model, df)
@@ -0,0 +1,395 @@
+import threading
+from collections import OrderedDict
+from string import Formatter
+import hashlib
+import numpy as np
+import pandas as pd
+from telemetry import count_tokens
+from ingestion import to_bool
+
+
+# Template for the basic employee details, filled from the employee data columns
+EMPLOYEE_DETAILS_TEMPLATE = """
+    The employee {Full Name} is a {Role}
+    in the {Department} department.
+
+    Below is more information about the employee:
+    - Tenure: {Tenure} year(s)
+    - Age: {Age}
+    - Years of Experience: {Years of Experience}
+    - Starting Salary: {Starting Salary}
+    - Current Salary: {Current Salary}
+    - Average Monthly Working Hours: {Average Monthly Working Hours}
+    - Last Performance Review Score: {Last Performance Review Score}
+    - Number of Promotions: {Promotion History}
+    - Months in Role: {Months in Role}
+    - Location: {Location}
+    - Contract: {Contract}
+    """
+
+# Per-table snapshot sections: header, template for each row, and text used when the table is not loaded
+SECTION_TEMPLATES = {
+    "reviews": {
+        "header": "Previous Performance Reviews of the employee:\n",
+        "row": """
+            - Fiscal Quarter: {Fiscal Quarter}
+            - Score: {Score}
+            - Summary: {Performance Review Summary}
+            """,
+        "missing": "No performance review data available for the selected employee.",
+    },
+    "benefits": {
+        "header": "Benefits Enrollment of the employee:\n",
+        "row": "- {Category}: {Status}\n",
+        "missing": "No benefits enrollment data available for the selected employee.",
+    },
+    "survey": {
+        "header": "Engagement Survey Responses of the employee:\n",
+        "row": "- {Question}: Score = {Score}, Comment = \"{Comment}\"\n",
+        "missing": "No engagement survey data available for the selected employee.",
+    },
+}
+
+# Number of snapshot engines (one per data version) kept in the process-wide cache
+MAX_CACHED_ENGINES = 8
+
+# Number of rendered employee tables kept per engine
+MAX_CACHED_RENDERS = 4
+
+# Number of single-employee snapshots kept per engine
+MAX_CACHED_SNAPSHOTS = 1024
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def data_version(*dfs):
+    """
+    Computes a content fingerprint for a set of DataFrames.
+
+    Parameters:
+        *dfs (DataFrame or None): DataFrames to fingerprint; None marks a table that is not loaded.
+
+    Returns:
+        str: Hex digest that changes whenever any of the DataFrames' contents or columns change.
+    """
+    digest = hashlib.sha1()
+    for df in dfs:
+        if df is None:
+            digest.update(b"<none>")
+            continue
+        digest.update(repr(list(df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Shortens a text to a token budget, keeping whole lines from the start.
+
+    Parameters:
+        text (str): Text to shorten.
+        max_tokens (int): Maximum number of tokens to keep.
+
+    Returns:
+        str: The text if it fits the budget; otherwise its leading lines that fit, followed by a note of how
+            many lines were left out.
+    """
+    lines = text.splitlines(keepends=True)
+    kept, used = [], 0
+    for line in lines:
+        n_tokens = count_tokens(line)
+        if used + n_tokens > max_tokens:
+            break
+        kept.append(line)
+        used += n_tokens
+
+    omitted = len(lines) - len(kept)
+    if omitted:
+        kept.append(f"\n[{omitted} more lines left out for length]\n")
+    return "".join(kept)
+
+
+class EmployeeSnapshot:
+    """
+    Snapshot of a single employee, kept as separate sections so each analysis can be given only what it needs.
+
+    str() gives the complete snapshot text, so it can be used wherever a text snapshot is expected.
+    """
+
+    def __init__(self, sections):
+        """
+        Parameters:
+            sections (dict): Text of each section ("details", "reviews", "benefits", "survey"), in snapshot order.
+        """
+        self.sections = sections
+        self._token_count = None
+
+    def __str__(self):
+        return "\n".join(self.sections.values())
+
+    @property
+    def token_count(self):
+        """int: Tokens of the complete snapshot text."""
+        if self._token_count is None:
+            self._token_count = count_tokens(str(self))
+        return self._token_count
+
+    def context(self, section_names, max_tokens):
+        """
+        Joins the given sections within a token budget.
+
+        Sections are added in the given order, and a section that does not fit in what is left of the budget
+        is shortened, so list the sections that must be complete (e.g. "details") first.
+
+        Parameters:
+            section_names (list): Names of the sections to include.
+            max_tokens (int): Token budget of the joined sections.
+
+        Returns:
+            str: The sections, separated by newlines.
+        """
+        parts = []
+        remaining = max_tokens
+        for name in section_names:
+            text = self.sections[name]
+            n_tokens = count_tokens(text)
+            if n_tokens > remaining:
+                text = truncate_to_tokens(text, remaining)
+                n_tokens = count_tokens(text)
+            parts.append(text)
+            remaining = max(remaining - n_tokens, 0)
+        return "\n".join(parts)
+
+
+def render_template(template, df):
+    """
+    Fills a str.format-style template for every row of a DataFrame in one vectorized pass.
+
+    Values are rendered with str(), matching what an f-string produces for a single row.
+
+    Parameters:
+        template (str): Template with column names as placeholders, e.g. "- {Category}: {Status}".
+        df (DataFrame): Rows to render; must contain every column named in the template.
+
+    Returns:
+        Series: Rendered text for each row, aligned with df's index.
+    """
+    rendered = pd.Series("", index=df.index, dtype=object)
+    for literal, field, _, _ in Formatter().parse(template):
+        rendered = rendered + literal
+        if field is not None:
+            rendered = rendered + df[field].astype(str)
+    return rendered
+
+
+class SnapshotEngine:
+    """
+    Renders employee snapshots from pre-indexed performance review, benefits and survey tables.
+
+    Each side table is grouped by Employee ID once when the engine is built, so looking up an employee's
+    sections is a dictionary access instead of a boolean scan. Rendered snapshots for an employee table, and
+    the snapshots of single employees, are cached until their data changes.
+    """
+
+    def __init__(self, reviews_df=None, benefits_df=None, survey_df=None, version=None):
+        """
+        Parameters:
+            reviews_df (DataFrame or None): Performance reviews, or None if not loaded.
+            benefits_df (DataFrame or None): Benefits enrollment, or None if not loaded.
+            survey_df (DataFrame or None): Engagement survey responses, or None if not loaded.
+            version (str or None): Version of the side tables, e.g. built from their dataset handles; None
+                fingerprints their contents.
+        """
+        self.version = version if version is not None else data_version(reviews_df, benefits_df, survey_df)
+
+        if benefits_df is not None:
+            # Derive the enrollment status label once for the whole table
+            status = np.where(to_bool(benefits_df["Enrollment Status"]), "Enrolled", "Not Enrolled")
+            benefits_df = benefits_df.assign(Status=status)
+
+        tables = {"reviews": reviews_df, "benefits": benefits_df, "survey": survey_df}
+        self.sections = {name: self._group_section(name, df) for name, df in tables.items()}
+        self._rendered = {}
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _group_section(name, df):
+        """
+        Renders every row of a side table and joins the rows per employee.
+
+        Parameters:
+            name (str): Section name, a key of SECTION_TEMPLATES.
+            df (DataFrame or None): The side table.
+
+        Returns:
+            dict or None: Mapping of Employee ID to the rendered rows, or None if the table is not loaded.
+        """
+        if df is None:
+            return None
+        if df.empty:
+            return {}
+        rows = render_template(SECTION_TEMPLATES[name]["row"], df).to_numpy()
+
+        # Stable-sort rows by employee so each employee's rows are contiguous and keep their original order
+        codes, employee_ids = pd.factorize(df["Employee ID"], use_na_sentinel=False)
+        order = np.argsort(codes, kind="stable")
+        rows, codes = rows[order].tolist(), codes[order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        ends = np.concatenate((bounds, [len(rows)])).tolist()
+
+        return {
+            employee_ids[code]: "".join(rows[start:end])
+            for code, start, end in zip(codes[starts].tolist(), starts, ends)
+        }
+
+    def section_text(self, name, employee_id):
+        """
+        Returns one snapshot section for a single employee.
+
+        Parameters:
+            name (str): Section name, a key of SECTION_TEMPLATES.
+            employee_id: The employee's ID.
+
+        Returns:
+            str: The section header followed by the employee's rows, or the "no data" text.
+        """
+        section = self.sections[name]
+        if section is None:
+            return SECTION_TEMPLATES[name]["missing"]
+        return SECTION_TEMPLATES[name]["header"] + section.get(employee_id, "")
+
+    def snapshot(self, selected_row_df):
+        """
+        Returns the snapshot for a single employee, rendering it only the first time the employee's data is seen.
+
+        Parameters:
+            selected_row_df (DataFrame): A one-row DataFrame with the selected employee's data.
+
+        Returns:
+            EmployeeSnapshot: The employee's snapshot sections.
+        """
+        key = data_version(selected_row_df.reset_index(drop=True))
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                return snapshot
+
+        snapshot = self.employee_snapshots(selected_row_df).iloc[0]
+        with self._lock:
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > MAX_CACHED_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def employee_snapshots(self, employees_df):
+        """
+        Renders the sectioned snapshots of many employees in one vectorized pass.
+
+        Parameters:
+            employees_df (DataFrame): Employee data with the columns used by EMPLOYEE_DETAILS_TEMPLATE.
+
+        Returns:
+            Series: EmployeeSnapshot of each employee, aligned with employees_df's index.
+        """
+        sections = self.render_sections(employees_df)
+        return pd.Series(
+            [EmployeeSnapshot(row) for row in sections.to_dict("records")], index=employees_df.index, dtype=object
+        )
+
+    def render_sections(self, employees_df):
+        """
+        Renders each snapshot section separately for many employees in one vectorized pass.
+
+        Parameters:
+            employees_df (DataFrame): Employee data with the columns used by EMPLOYEE_DETAILS_TEMPLATE.
+
+        Returns:
+            DataFrame: One column per section ("details", "reviews", "benefits", "survey"), aligned with
+                employees_df's index.
+        """
+        employee_ids = employees_df["Employee ID"].tolist()
+        sections = {"details": render_template(EMPLOYEE_DETAILS_TEMPLATE, employees_df)}
+        for name, section in self.sections.items():
+            if section is None:
+                sections[name] = pd.Series(SECTION_TEMPLATES[name]["missing"], index=employees_df.index)
+            else:
+                # Look up each employee in the dict; Series.map would first copy the whole dict into a Series
+                rows = pd.Series([section.get(i, "") for i in employee_ids], index=employees_df.index, dtype=object)
+                sections[name] = SECTION_TEMPLATES[name]["header"] + rows
+        return pd.DataFrame(sections, index=employees_df.index)
+
+    def _render(self, employees_df):
+        """
+        Renders snapshots for the given employees without consulting the cache.
+
+        Parameters:
+            employees_df (DataFrame): Employee data with the columns used by EMPLOYEE_DETAILS_TEMPLATE.
+
+        Returns:
+            Series: Snapshot text for each employee, aligned with employees_df's index.
+        """
+        sections = self.render_sections(employees_df)
+        snapshots = sections["details"]
+        for name in self.sections:
+            snapshots = snapshots + "\n" + sections[name]
+        return snapshots
+
+    def render(self, employees_df):
+        """
+        Renders snapshots for many employees in one vectorized pass.
+
+        Results are cached per employee table contents, so repeated calls on unchanged data are free.
+
+        Parameters:
+            employees_df (DataFrame): Employee data with the columns used by EMPLOYEE_DETAILS_TEMPLATE.
+
+        Returns:
+            Series: Snapshot text for each employee, aligned with employees_df's index.
+        """
+        version = data_version(employees_df)
+        with self._lock:
+            rendered = self._rendered.get(version)
+        if rendered is None:
+            rendered = self._render(employees_df)
+            with self._lock:
+                # Keep only the latest few employee tables to bound memory
+                if len(self._rendered) >= MAX_CACHED_RENDERS:
+                    self._rendered.pop(next(iter(self._rendered)))
+                self._rendered[version] = rendered
+        return rendered
+
+
+def get_snapshot_engine(reviews_df=None, benefits_df=None, survey_df=None, version=None):
+    """
+    Returns the snapshot engine for the given side tables, building it only when their contents change.
+
+    Engines are cached process-wide by data version, so sessions looking at the same data share one.
+
+    Parameters:
+        reviews_df (DataFrame or None): Performance reviews, or None if not loaded.
+        benefits_df (DataFrame or None): Benefits enrollment, or None if not loaded.
+        survey_df (DataFrame or None): Engagement survey responses, or None if not loaded.
+        version (str or None): Version of the side tables that changes whenever their contents do, such as
+            their dataset store handles; None fingerprints their contents, which hashes every row.
+
+    Returns:
+        SnapshotEngine: Engine indexed on the current data version.
+    """
+    if version is None:
+        version = data_version(reviews_df, benefits_df, survey_df)
+    with _engines_lock:
+        engine = _engines.get(version)
+        if engine is not None:
+            _engines.move_to_end(version)
+            return engine
+
+    engine = SnapshotEngine(reviews_df, benefits_df, survey_df, version=version)
+    with _engines_lock:
+        _engines[version] = engine
+        while len(_engines) > MAX_CACHED_ENGINES:
+            _engines.popitem(last=False)
+    return engine
@@ -0,0 +1,91 @@
+"""
+Startup timing report of the app pages.
+
+Opens every page in a fresh Python process with Streamlit's AppTest, as on a cold start, and reports how long
+the page took to render for the first time, including the imports it triggers. The run fails when a page that
+must open quickly (Data Upload and FAQ by default) takes longer than the allowed time.
+
+Example:
+    python startup_check.py
+    python startup_check.py --max-seconds 0.8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+# Directory of the app pages
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pages reported on, and the ones that must open within the allowed time
+PAGES = ["data_upload.py", "faq.py", "dashboard.py", "chat.py"]
+FAST_PAGES = ["data_upload.py", "faq.py"]
+
+# Seconds a fast page may take to render on a cold start
+DEFAULT_MAX_SECONDS = 1.0
+
+# Renders a page in the child process and prints its timings as JSON. AppTest is imported before the clock
+# starts, since the Streamlit server has it loaded already.
+CHILD_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+started_at = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+at.run()
+print(json.dumps({"seconds": time.perf_counter() - started_at, "errors": [e.message for e in at.exception]}))
+"""
+
+
+def time_page(page, timeout=120):
+    """
+    Renders a page once in a fresh Python process.
+
+    Parameters:
+        page (str): File name of the page, relative to APP_DIR.
+        timeout (float): Seconds the render may take.
+
+    Returns:
+        dict: Seconds of the first render, and the messages of any exceptions the page raised.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, page, str(timeout)],
+        cwd=APP_DIR, capture_output=True, text=True, timeout=timeout + 60,
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        return {"seconds": None, "errors": [completed.stderr.strip().splitlines()[-1] if completed.stderr else "failed"]}
+    return json.loads(lines[-1])
+
+
+def main(argv=None):
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Report the cold-start render time of every app page.")
+    parser.add_argument("--pages", nargs="+", choices=PAGES, default=PAGES, help="Pages to report on (default: all)")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS,
+                        help="Fail if Data Upload or FAQ takes longer than this to render (default: 1.0)")
+    args = parser.parse_args(argv)
+
+    too_slow = []
+    print(f"{'page':<20}{'first render s':>16}")
+    for page in args.pages:
+        result = time_page(page)
+        seconds = result["seconds"]
+        flag = ""
+        if page in FAST_PAGES and (seconds is None or seconds > args.max_seconds):
+            too_slow.append(page)
+            flag = "  SLOW"
+        shown = "-" if seconds is None else f"{seconds:.3f}"
+        print(f"{page:<20}{shown:>16}{flag}")
+        for error in result["errors"]:
+            print(f"    error: {error}")
+
+    if too_slow:
+        print(f"{len(too_slow)} page(s) took longer than {args.max_seconds}s to open: " + ", ".join(too_slow))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+
+# SQLite database holding the outputs of finished workflow steps
+CHECKPOINT_PATH = "/project/data/scratch/step_checkpoints.sqlite3"
+
+# Default eviction policy: checkpoints older than this are no longer resumed from and are deleted
+TTL_SECONDS = 24 * 60 * 60
+
+
+class StepCheckpointStore:
+    """
+    On-disk checkpoints of the RetentionFlow steps, so that a failed or timed-out recommendation can be retried
+    without redoing the steps that already finished.
+
+    Outputs are keyed by run key and step. The run key is the recommendation cache key, which hashes the
+    employee snapshot together with the prompt version, LLM and document index version, so outputs are only
+    resumed for the same inputs. Like RecommendationCache, every operation opens its own SQLite connection,
+    so the store can be shared by all sessions and threads in the process.
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH, ttl_seconds=TTL_SECONDS):
+        """
+        Parameters:
+            path (str): SQLite database file.
+            ttl_seconds (float): Age after which a checkpoint is no longer used.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS step_checkpoints (
+                    run_key TEXT NOT NULL,
+                    step TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_key, step)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection to the checkpoint database, committing and closing it when done."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, run_key, step):
+        """
+        Returns the checkpointed output of a step.
+
+        Parameters:
+            run_key (str): Key of the run, built with recommendation_key().
+            step (str): Name of the step.
+
+        Returns:
+            str or None: The step's output, or None if it has no checkpoint or the checkpoint has expired.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT output FROM step_checkpoints WHERE run_key = ? AND step = ? AND created_at >= ?",
+                (run_key, step, time.time() - self.ttl_seconds),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, run_key, step, output):
+        """
+        Checkpoints the output of a finished step and deletes expired checkpoints.
+
+        Parameters:
+            run_key (str): Key of the run, built with recommendation_key().
+            step (str): Name of the step.
+            output (str): The step's output.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO step_checkpoints (run_key, step, output, created_at) VALUES (?, ?, ?, ?)",
+                (run_key, step, output, now),
+            )
+            conn.execute("DELETE FROM step_checkpoints WHERE created_at < ?", (now - self.ttl_seconds,))
+
+    def clear(self, run_key=None):
+        """
+        Removes the checkpoints of one run, or all of them.
+
+        Parameters:
+            run_key (str or None): Key of the run; None clears the whole store.
+        """
+        with self._connect() as conn:
+            if run_key is None:
+                conn.execute("DELETE FROM step_checkpoints")
+            else:
+                conn.execute("DELETE FROM step_checkpoints WHERE run_key = ?", (run_key,))
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM step_checkpoints").fetchone()[0]
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque
+from statistics import median
+
+
+# Number of most recent LLM requests whose streaming metrics are kept in memory
+MAX_RECORDED_REQUESTS = 1000
+
+
+class StreamMetrics:
+    """
+    Latency metrics of a single streamed LLM request.
+
+    Tokens are counted as streamed chunks; the NVIDIA endpoints send one token per chunk.
+    """
+
+    def __init__(self, label):
+        """
+        Create the metrics right before sending the request, so time-to-first-token includes retrieval and network time.
+
+        Parameters:
+            label (str): Name of the request type (e.g. "chat", "compensation").
+        """
+        self.label = label
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.tokens = 0
+
+    def record_token(self):
+        """Records the arrival of a streamed chunk."""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self):
+        """Records the end of the stream."""
+        self.finished_at = time.perf_counter()
+
+    @property
+    def time_to_first_token(self):
+        """float or None: Seconds from sending the request until the first token arrived."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self):
+        """float or None: Generation rate after the first token."""
+        if self.first_token_at is None or self.finished_at is None or self.tokens < 2:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return (self.tokens - 1) / elapsed if elapsed > 0 else None
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The metrics as plain values.
+        """
+        return {
+            "label": self.label,
+            "time_to_first_token": self.time_to_first_token,
+            "tokens_per_second": self.tokens_per_second,
+            "tokens": self.tokens,
+            "total_seconds": self.finished_at - self.started_at if self.finished_at is not None else None,
+        }
+
+
+class MetricsLog:
+    """Thread-safe record of the most recent streamed requests."""
+
+    def __init__(self, max_entries=MAX_RECORDED_REQUESTS):
+        """
+        Parameters:
+            max_entries (int): Number of most recent requests kept.
+        """
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        """
+        Adds the metrics of a finished request.
+
+        Parameters:
+            metrics (StreamMetrics): Metrics of the finished request.
+        """
+        with self._lock:
+            self._entries.append(metrics.to_dict())
+
+    def entries(self):
+        """
+        Returns:
+            list: Metrics of the recorded requests, oldest first.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def summary(self):
+        """
+        Summarizes the recorded requests per label.
+
+        Returns:
+            dict: For each label, the request count and median time-to-first-token and tokens per second.
+        """
+        by_label = {}
+        for entry in self.entries():
+            by_label.setdefault(entry["label"], []).append(entry)
+
+        summary = {}
+        for label, entries in by_label.items():
+            ttfts = [e["time_to_first_token"] for e in entries if e["time_to_first_token"] is not None]
+            rates = [e["tokens_per_second"] for e in entries if e["tokens_per_second"] is not None]
+            summary[label] = {
+                "requests": len(entries),
+                "median_time_to_first_token": median(ttfts) if ttfts else None,
+                "median_tokens_per_second": median(rates) if rates else None,
+            }
+        return summary
+
+
+# Process-wide record of streamed requests shared by all sessions
+metrics_log = MetricsLog()
+
+
+def timed_stream(chunks, metrics, log=metrics_log):
+    """
+    Passes streamed chunks through while recording their timing.
+
+    The metrics are added to the log when the stream ends, also if it is abandoned or fails midway.
+
+    Parameters:
+        chunks (iterable): Streamed text chunks (e.g. a response_gen).
+        metrics (StreamMetrics): Metrics of the request, created when it was sent.
+        log (MetricsLog): Log the finished metrics are added to.
+
+    Yields:
+        str: The chunks, unchanged.
+    """
+    try:
+        for chunk in chunks:
+            if chunk:
+                metrics.record_token()
+            yield chunk
+    finally:
+        metrics.finish()
+        log.record(metrics)
+
+
+async def atimed_stream(chunks, metrics, log=metrics_log):
+    """
+    Passes chunks of an async stream through while recording their timing, like timed_stream().
+
+    Parameters:
+        chunks (async iterable): Streamed text chunks (e.g. an async_response_gen()).
+        metrics (StreamMetrics): Metrics of the request, created when it was sent.
+        log (MetricsLog): Log the finished metrics are added to.
+
+    Yields:
+        str: The chunks, unchanged.
+    """
+    try:
+        async for chunk in chunks:
+            if chunk:
+                metrics.record_token()
+            yield chunk
+    finally:
+        metrics.finish()
+        log.record(metrics)
+
+
+def format_metrics(metrics):
+    """
+    Formats the metrics of a finished request for display.
+
+    Parameters:
+        metrics (StreamMetrics): Metrics of the finished request.
+
+    Returns:
+        str: E.g. "First token after 0.84s · 38.2 tokens/s".
+    """
+    parts = []
+    if metrics.time_to_first_token is not None:
+        parts.append(f"First token after {metrics.time_to_first_token:.2f}s")
+    if metrics.tokens_per_second is not None:
+        parts.append(f"{metrics.tokens_per_second:.1f} tokens/s")
+    return " · ".join(parts)
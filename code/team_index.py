@@ -0,0 +1,197 @@
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
+from snapshots import data_version
+
+
+# Snapshot sections indexed as separate chunks, so a question can match e.g. only survey comments
+INDEXED_SECTIONS = ["details", "reviews", "benefits", "survey"]
+
+# Employee columns stored as chunk metadata and matched against the question for filtering
+FILTER_COLUMNS = ["Department", "Role"]
+
+# Number of team indexes (one per data version) kept in the process-wide cache
+MAX_CACHED_INDEXES = 2
+
+# Future of the team index of each data version; the lock only guards the dict, not the builds
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class TeamIndex:
+    """
+    Vector index over per-employee snapshot chunks, used to retrieve only the employees relevant to a question.
+
+    Every chunk carries the employee's ID, name, department, role and reviewed fiscal quarters as metadata.
+    Retrieval returns full snapshots of the best-matching employees, so the prompt size depends on the
+    number of retrieved employees rather than on the team size.
+    """
+
+    def __init__(self, employees_df, engine, reviews_df=None, embed_model=None):
+        """
+        Parameters:
+            employees_df (DataFrame): Employee data with the columns used by the snapshot engine.
+            engine (SnapshotEngine): Engine used to render the snapshot sections.
+            reviews_df (DataFrame or None): Performance reviews, used for fiscal quarter metadata.
+            embed_model (BaseEmbedding or None): Embedding model; defaults to llama_index Settings.
+        """
+        self.snapshots = dict(zip(employees_df["Employee ID"].astype(str), engine.render(employees_df)))
+        self.filter_values = {
+            column: sorted(employees_df[column].dropna().astype(str).unique(), key=len, reverse=True)
+            for column in FILTER_COLUMNS
+        }
+
+        # Collect the fiscal quarters each employee was reviewed in
+        quarters = {}
+        if reviews_df is not None:
+            quarters = (
+                reviews_df.astype({"Fiscal Quarter": str})
+                .groupby("Employee ID")["Fiscal Quarter"]
+                .agg(", ".join)
+                .to_dict()
+            )
+        self.quarters = sorted(
+            {q for value in quarters.values() for q in value.split(", ")}, key=len, reverse=True
+        )
+
+        nodes = self._build_nodes(employees_df, engine.render_sections(employees_df), quarters)
+        self.index = VectorStoreIndex(nodes, embed_model=embed_model)
+
+    @staticmethod
+    def _build_nodes(employees_df, sections, quarters):
+        """
+        Builds one text node per employee and snapshot section.
+
+        Parameters:
+            employees_df (DataFrame): Employee data.
+            sections (DataFrame): Rendered snapshot sections, aligned with employees_df.
+            quarters (dict): Mapping of Employee ID to comma-separated reviewed fiscal quarters.
+
+        Returns:
+            list: TextNode objects with employee metadata.
+        """
+        columns = ["Employee ID", "Full Name"] + FILTER_COLUMNS
+        records = employees_df[columns].astype({c: str for c in columns[1:]}).to_dict("records")
+
+        nodes = []
+        for record, row in zip(records, sections.to_dict("records")):
+            employee_id = record["Employee ID"]
+            metadata = {
+                "Employee ID": str(employee_id),
+                "Full Name": record["Full Name"],
+                "Department": record["Department"],
+                "Role": record["Role"],
+                "Fiscal Quarters": quarters.get(employee_id, ""),
+            }
+            header = f"{record['Full Name']} ({record['Role']}, {record['Department']})\n"
+            for section in INDEXED_SECTIONS:
+                nodes.append(TextNode(
+                    id_=f"{employee_id}-{section}",
+                    text=header + row[section],
+                    metadata={**metadata, "Section": section},
+                    excluded_embed_metadata_keys=list(metadata) + ["Section"],
+                    excluded_llm_metadata_keys=list(metadata) + ["Section"],
+                ))
+        return nodes
+
+    def _filters_for(self, question):
+        """
+        Builds metadata filters from department, role and quarter values mentioned in the question.
+
+        Parameters:
+            question (str): The user's question.
+
+        Returns:
+            MetadataFilters or None: Filters narrowing retrieval to the mentioned values, if any.
+        """
+        text = question.lower()
+
+        def is_mentioned(value):
+            return value and re.search(rf"\b{re.escape(value.lower())}\b", text) is not None
+
+        filters = []
+        for column, values in self.filter_values.items():
+            mentioned = [value for value in values if is_mentioned(value)]
+            if mentioned:
+                filters.append(MetadataFilter(key=column, value=mentioned, operator=FilterOperator.IN))
+
+        mentioned_quarters = [q for q in self.quarters if is_mentioned(q)]
+        if len(mentioned_quarters) == 1:
+            filters.append(MetadataFilter(
+                key="Fiscal Quarters", value=mentioned_quarters[0], operator=FilterOperator.TEXT_MATCH
+            ))
+
+        return MetadataFilters(filters=filters) if filters else None
+
+    def retrieve(self, question, similarity_top_k=20, max_employees=10):
+        """
+        Retrieves the snapshots of the employees most relevant to a question.
+
+        Parameters:
+            question (str): The user's question.
+            similarity_top_k (int): Number of snapshot chunks to retrieve.
+            max_employees (int): Maximum number of employees returned.
+
+        Returns:
+            list: Full snapshots of the matching employees, best match first.
+        """
+        filters = self._filters_for(question)
+        nodes = self.index.as_retriever(similarity_top_k=similarity_top_k, filters=filters).retrieve(question)
+
+        # Fall back to an unfiltered search if the filters excluded everything
+        if not nodes and filters is not None:
+            nodes = self.index.as_retriever(similarity_top_k=similarity_top_k).retrieve(question)
+
+        employee_ids = []
+        for node in nodes:
+            employee_id = node.node.metadata["Employee ID"]
+            if employee_id not in employee_ids:
+                employee_ids.append(employee_id)
+
+        return [self.snapshots[employee_id] for employee_id in employee_ids[:max_employees]]
+
+
+def get_team_index(employees_df, engine, reviews_df=None, embed_model=None):
+    """
+    Returns the team index for the given data, building (and embedding) it only when the data changes.
+
+    Indexes are cached process-wide by content fingerprint, so reruns and sessions on the same data share one.
+    The first caller for a version builds the index without holding the cache lock, so requests for other
+    versions are not held up; concurrent callers for the same version wait for that build. A failed build
+    is not cached, so the next call tries again.
+
+    Parameters:
+        employees_df (DataFrame): Employee data.
+        engine (SnapshotEngine): Engine used to render the snapshot sections.
+        reviews_df (DataFrame or None): Performance reviews, used for fiscal quarter metadata.
+        embed_model (BaseEmbedding or None): Embedding model; defaults to llama_index Settings.
+
+    Returns:
+        TeamIndex: Index over the team's snapshot chunks.
+    """
+    version = data_version(employees_df, reviews_df) + engine.version
+    with _indexes_lock:
+        future = _indexes.get(version)
+        building = future is None
+        if building:
+            future = Future()
+            _indexes[version] = future
+            while len(_indexes) > MAX_CACHED_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(version)
+
+    if building:
+        try:
+            future.set_result(TeamIndex(employees_df, engine, reviews_df, embed_model))
+        except BaseException as e:
+            with _indexes_lock:
+                if _indexes.get(version) is future:
+                    del _indexes[version]
+            future.set_exception(e)
+            raise
+    return future.result()
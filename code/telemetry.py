@@ -0,0 +1,450 @@
+"""
+Per-step instrumentation of RetentionFlow.
+
+Every workflow step records its embedding, retrieval, time-to-first-token and total time and its prompt and
+completion tokens; analysis steps also record how many tokens of the employee snapshot they sent compared to
+the whole snapshot. Each finished step is written as one JSON line to the "retain_ai.steps" logger and added to
+a process-wide registry, which is served in the Prometheus text format on /metrics so the slow stage can be
+found and regressions spotted in production. The durations of the app's startup phases (imports, background
+warm-up and first render of each page) are logged and served the same way.
+
+Example:
+    curl http://localhost:9464/metrics
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Port of the metrics endpoint
+METRICS_PORT = int(os.environ.get("RETAIN_AI_METRICS_PORT", "9464"))
+
+# Upper bounds (seconds) of the duration histogram buckets; a recommendation must finish within 120 seconds
+DURATION_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120]
+
+# Upper bounds of the token count histogram buckets
+TOKEN_BUCKETS = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+# Structured step logs, one JSON object per line
+logger = logging.getLogger("retain_ai.steps")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def count_tokens(text):
+    """
+    Counts the tokens of a text with llama_index's default tokenizer.
+
+    The NVIDIA endpoints do not report usage for streamed responses, so prompt sizes are counted locally.
+
+    Parameters:
+        text (str): Text to count.
+
+    Returns:
+        int: Number of tokens.
+    """
+    from llama_index.core.utils import get_tokenizer
+
+    return len(get_tokenizer()(text))
+
+
+class StepMetrics:
+    """Timings and token counts of a single workflow step."""
+
+    def __init__(self, step, run_id):
+        """
+        Create the metrics when the step starts its work.
+
+        Parameters:
+            step (str): Name of the workflow step (e.g. "analyse_comp").
+            run_id (str): ID of the workflow run the step belongs to.
+        """
+        self.step = step
+        self.run_id = run_id
+        self.started_at = time.perf_counter()
+        self.embedding_seconds = 0.0
+        self.retrieval_seconds = 0.0
+        self.retrieval_cached = False
+        self.time_to_first_token = None
+        self.total_seconds = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.snapshot_tokens = None
+        self.context_tokens = None
+        self.error = None
+
+    @contextmanager
+    def timed(self, field):
+        """
+        Adds the duration of the enclosed block to a timing field.
+
+        Parameters:
+            field (str): "embedding_seconds" or "retrieval_seconds".
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, field, getattr(self, field) + time.perf_counter() - start)
+
+    def add_stream(self, stream_metrics):
+        """
+        Takes the completion tokens and time-to-first-token from the step's streamed LLM response.
+
+        Parameters:
+            stream_metrics (StreamMetrics): Metrics of the finished stream, created when the step started.
+        """
+        self.completion_tokens += stream_metrics.tokens
+        if self.time_to_first_token is None:
+            self.time_to_first_token = stream_metrics.time_to_first_token
+
+    def finish(self, error=None):
+        """
+        Records the end of the step.
+
+        Parameters:
+            error (BaseException or None): The exception the step failed with, if any.
+        """
+        self.total_seconds = time.perf_counter() - self.started_at
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The metrics as plain values.
+        """
+        return {
+            "step": self.step,
+            "run_id": self.run_id,
+            "embedding_seconds": self.embedding_seconds,
+            "retrieval_seconds": self.retrieval_seconds,
+            "retrieval_cached": self.retrieval_cached,
+            "time_to_first_token": self.time_to_first_token,
+            "total_seconds": self.total_seconds,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "snapshot_tokens": self.snapshot_tokens,
+            "context_tokens": self.context_tokens,
+            "error": self.error,
+        }
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per label value."""
+
+    def __init__(self, buckets):
+        """
+        Parameters:
+            buckets (list): Increasing upper bounds of the buckets; +Inf is added.
+        """
+        self.buckets = list(buckets) + [float("inf")]
+        self.series = {}
+
+    def observe(self, label, value):
+        """Adds an observation to the series of a label value."""
+        counts, total = self.series.get(label, ([0] * len(self.buckets), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.series[label] = (counts, total + value)
+
+    def render(self, name, label_name):
+        """
+        Returns:
+            list: Exposition lines of all series.
+        """
+        lines = []
+        for label, (counts, total) in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {total}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {counts[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-safe aggregate of the step metrics of all workflow runs in the process."""
+
+    # Histogram name, help text, buckets and StepMetrics field of every per-step histogram
+    STEP_HISTOGRAMS = [
+        ("retain_ai_step_seconds", "Total time of a workflow step.", DURATION_BUCKETS, "total_seconds"),
+        ("retain_ai_step_embedding_seconds", "Time spent embedding the retrieval query.", DURATION_BUCKETS,
+         "embedding_seconds"),
+        ("retain_ai_step_retrieval_seconds", "Time spent searching the document index.", DURATION_BUCKETS,
+         "retrieval_seconds"),
+        ("retain_ai_step_time_to_first_token_seconds", "Time from the start of a step to its first LLM token.",
+         DURATION_BUCKETS, "time_to_first_token"),
+        ("retain_ai_step_prompt_tokens", "Prompt tokens sent by a step, including retrieved context.",
+         TOKEN_BUCKETS, "prompt_tokens"),
+        ("retain_ai_step_completion_tokens", "Completion tokens received by a step.", TOKEN_BUCKETS,
+         "completion_tokens"),
+    ]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._step_histograms = {name: Histogram(buckets) for name, _, buckets, _ in self.STEP_HISTOGRAMS}
+        self._step_errors = {}
+        self._retrieval_cache_hits = {}
+        self._snapshot_tokens = {}
+        self._context_tokens = {}
+        self._run_histogram = Histogram(DURATION_BUCKETS)
+        self._collectors = {}
+
+    def set_collector(self, name, collect):
+        """
+        Adds (or replaces) a source of extra metrics rendered with the step metrics.
+
+        Parameters:
+            name (str): Name of the source, e.g. "embedding_cache".
+            collect (callable): Returns a list of lines in the Prometheus text exposition format.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def record_step(self, metrics):
+        """
+        Adds the metrics of a finished step.
+
+        Parameters:
+            metrics (StepMetrics): Metrics of the finished step.
+        """
+        with self._lock:
+            if metrics.error is not None:
+                self._step_errors[metrics.step] = self._step_errors.get(metrics.step, 0) + 1
+                return
+            for name, _, _, field in self.STEP_HISTOGRAMS:
+                value = getattr(metrics, field)
+                if value is not None:
+                    self._step_histograms[name].observe(metrics.step, value)
+            if metrics.retrieval_cached:
+                self._retrieval_cache_hits[metrics.step] = self._retrieval_cache_hits.get(metrics.step, 0) + 1
+            if metrics.snapshot_tokens is not None:
+                self._snapshot_tokens[metrics.step] = self._snapshot_tokens.get(metrics.step, 0) + metrics.snapshot_tokens
+                self._context_tokens[metrics.step] = self._context_tokens.get(metrics.step, 0) + metrics.context_tokens
+
+    def record_run(self, seconds, outcome):
+        """
+        Adds the duration of a finished workflow run.
+
+        Parameters:
+            seconds (float): Duration of the run.
+            outcome (str): "ok", "error" or "timeout".
+        """
+        with self._lock:
+            self._run_histogram.observe(outcome, seconds)
+
+    def context_savings(self):
+        """
+        Summarizes the employee context sent by each analysis step against sending the whole snapshot.
+
+        Returns:
+            dict: For each step, the total snapshot and context tokens and the fraction of tokens saved.
+        """
+        with self._lock:
+            return {
+                step: {
+                    "snapshot_tokens": snapshot_tokens,
+                    "context_tokens": self._context_tokens[step],
+                    "saved": 1 - self._context_tokens[step] / snapshot_tokens if snapshot_tokens else 0.0,
+                }
+                for step, snapshot_tokens in sorted(self._snapshot_tokens.items())
+            }
+
+    def render(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = []
+            for name, help_text, _, _ in self.STEP_HISTOGRAMS:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                lines += self._step_histograms[name].render(name, "step")
+
+            lines += ["# HELP retain_ai_step_errors_total Workflow steps that failed.",
+                      "# TYPE retain_ai_step_errors_total counter"]
+            lines += [f'retain_ai_step_errors_total{{step="{step}"}} {count}'
+                      for step, count in sorted(self._step_errors.items())]
+
+            for name, help_text, totals in [
+                ("retain_ai_step_retrieval_cache_hits_total", "Steps whose retrieval was served from the cache.",
+                 self._retrieval_cache_hits),
+                ("retain_ai_step_snapshot_tokens_total", "Tokens of the whole employee snapshots given to a step.",
+                 self._snapshot_tokens),
+                ("retain_ai_step_context_tokens_total", "Tokens of the snapshot sections a step actually sent.",
+                 self._context_tokens),
+            ]:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                lines += [f'{name}{{step="{step}"}} {count}' for step, count in sorted(totals.items())]
+
+            lines += ["# HELP retain_ai_workflow_seconds Total time of a RetentionFlow run.",
+                      "# TYPE retain_ai_workflow_seconds histogram"]
+            lines += self._run_histogram.render("retain_ai_workflow_seconds", "outcome")
+            collectors = list(self._collectors.values())
+
+        # Collectors may do I/O, so they run outside the lock
+        for collect in collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry shared by all sessions
+metrics_registry = MetricsRegistry()
+
+
+def record_step(metrics, registry=metrics_registry):
+    """
+    Logs the metrics of a finished step as a JSON line and adds them to the registry.
+
+    Parameters:
+        metrics (StepMetrics): Metrics of the finished step.
+        registry (MetricsRegistry): Registry the metrics are added to.
+    """
+    logger.info(json.dumps({"event": "workflow_step", **metrics.to_dict()}))
+    registry.record_step(metrics)
+
+
+def record_run(run_id, seconds, outcome, registry=metrics_registry):
+    """
+    Logs the duration of a finished workflow run as a JSON line and adds it to the registry.
+
+    Parameters:
+        run_id (str): ID of the workflow run.
+        seconds (float): Duration of the run.
+        outcome (str): "ok", "error" or "timeout".
+        registry (MetricsRegistry): Registry the duration is added to.
+    """
+    logger.info(json.dumps({"event": "workflow_run", "run_id": run_id, "total_seconds": seconds, "outcome": outcome}))
+    registry.record_run(seconds, outcome)
+
+
+class StartupReport:
+    """
+    Durations of the app's startup phases, each recorded once per process.
+
+    Every phase is logged as a JSON line when it is first recorded; later recordings of the same phase (e.g.
+    renders after the first) are ignored.
+    """
+
+    def __init__(self):
+        self._seconds = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds, error=None):
+        """
+        Records the duration of a phase, unless it was recorded before.
+
+        Parameters:
+            phase (str): Name of the phase (e.g. "first render: FAQ").
+            seconds (float): Duration of the phase.
+            error (BaseException or None): Exception the phase failed with.
+
+        Returns:
+            bool: Whether the phase was recorded.
+        """
+        with self._lock:
+            if phase in self._seconds:
+                return False
+            self._seconds[phase] = seconds
+        logger.info(json.dumps({
+            "event": "startup", "phase": phase, "seconds": seconds,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        }))
+        return True
+
+    @contextmanager
+    def timed(self, phase):
+        """
+        Records the duration of a block as a phase, also if the block fails.
+
+        Parameters:
+            phase (str): Name of the phase.
+        """
+        started_at = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.record(phase, time.perf_counter() - started_at, error)
+
+    def phases(self):
+        """
+        Returns:
+            dict: Duration of every recorded phase, in the order they were recorded.
+        """
+        with self._lock:
+            return dict(self._seconds)
+
+    def metrics_lines(self):
+        """
+        Returns:
+            list: The phase durations in the Prometheus text exposition format.
+        """
+        lines = ["# HELP retain_ai_startup_seconds Duration of an app startup phase.",
+                 "# TYPE retain_ai_startup_seconds gauge"]
+        for phase, seconds in self.phases().items():
+            label = phase.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'retain_ai_startup_seconds{{phase="{label}"}} {seconds}')
+        return lines
+
+
+startup_report = StartupReport()
+metrics_registry.set_collector("startup", startup_report.metrics_lines)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry on /metrics."""
+
+    registry = metrics_registry
+
+    def log_message(self, format, *args):
+        # Scrapes are frequent; keep the console for the step logs
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0", registry=metrics_registry):
+    """
+    Serves the metrics endpoint from a background thread.
+
+    Parameters:
+        port (int): Port to listen on; 0 picks a free port.
+        host (str): Interface to listen on.
+        registry (MetricsRegistry): Registry to serve.
+
+    Returns:
+        ThreadingHTTPServer or None: The running server, or None if the port is already in use
+            (e.g. by another app process).
+    """
+    handler = type("ConfiguredMetricsHandler", (MetricsHandler,), {"registry": registry})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logger.warning(json.dumps({"event": "metrics_server_unavailable", "port": port, "error": str(e)}))
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
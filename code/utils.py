@@ -1,15 +1,61 @@
 import pandas as pd
-from llama_index.core import SimpleDirectoryReader, Settings, VectorStoreIndex
-from llama_index.embeddings.nvidia import NVIDIAEmbedding
-from llama_index.llms.nvidia import NVIDIA
-from llama_index.core.node_parser import SentenceSplitter
-from llama_index.core import Settings
+import importlib
 import os
+import threading
 import streamlit as st
 import base64
-from fpdf import FPDF
-from fuzzywuzzy import process
-from streamlit_pdf_viewer import pdf_viewer
+from recommendation_cache import RecommendationCache
+from step_checkpoints import StepCheckpointStore
+from snapshots import get_snapshot_engine
+from dataset_store import dataset_store
+from ingestion import apply_declared_dtypes
+from telemetry import start_metrics_server, metrics_registry, startup_report
+
+# Every page imports this module, so heavy dependencies (llama_index and the NVIDIA connectors, chromadb,
+# scipy, fpdf, fuzzywuzzy) are imported inside the functions that use them. Pages that do not need them,
+# such as Data Upload and FAQ, then open without loading them.
+
+
+# NVIDIA API Catalog model used for recommendations and chat
+LLM_MODEL = "meta/llama-3.1-70b-instruct"
+
+# Environment variable naming an OpenAI-compatible endpoint that replaces the API Catalog, e.g. a self-hosted
+# NIM or local_nim.py (http://localhost:8000/v1)
+BASE_URL_ENV = "NVIDIA_BASE_URL"
+
+# Define expected columns for each type of data upload
+# These are used to map user-uploaded CSV columns to the app's expected structure
+expected_columns_sets = {
+    "employee": [
+        "Employee ID", "Full Name", "Gender", "Age", "Tenure", "Role",
+        "Department", "Starting Salary", "Current Salary", "Location",
+        "Contract", "Years of Experience", "Average Monthly Working Hours",
+        "Months in Role", "Promotion History", "Last Performance Review Score"
+    ],
+    "benefits": ["Employee ID", "Category", "Enrollment Status"],
+    "reviews": ["Employee ID", "Fiscal Quarter", "Score", "Performance Review Summary"],
+    "survey": ["Employee ID", "Question", "Score", "Comment"]
+}
+
+# PDF libraries used in demo mode and otherwise
+SAMPLE_PDF_DIR = "/project/data/sample_pdf"
+UPLOADED_PDF_DIR = "/project/data/uploaded_pdf"
+
+# Live document index of each PDF library, shared by all sessions of the process
+_document_libraries = {}
+_document_libraries_lock = threading.Lock()
+
+
+def endpoint_kwargs():
+    """
+    Returns the keyword arguments pointing the NVIDIA clients at the endpoint named by BASE_URL_ENV, if it is set.
+
+    Returns:
+        dict: {"base_url": <endpoint>}, or an empty dict to use the API Catalog.
+    """
+    base_url = os.environ.get(BASE_URL_ENV)
+    return {"base_url": base_url} if base_url else {}
+
 
 def rename_and_filter_columns(df, column_mappings):
     """
@@ -29,10 +75,45 @@ def rename_and_filter_columns(df, column_mappings):
     # Rename columns in the DataFrame using the filtered dictionary
     df = df.rename(columns=filtered_mappings)
     
-    # Return DataFrame with only the mapped columns
-    return df[filtered_mappings.values()]
+    # Keep only the mapped columns and give them the dtypes files with the expected headers are parsed with
+    return apply_declared_dtypes(df[filtered_mappings.values()])
     
 
+def get_session_df(dataset_name):
+    """
+    Returns a dataset loaded in the current session from the process-wide dataset store.
+
+    Sessions keep only a handle to each dataset, so all sessions that load the same file share one copy.
+    The returned DataFrame is shared and must not be modified in place.
+
+    Parameters:
+        dataset_name (str): Lowercase dataset name, e.g. "employee data" or "performance reviews".
+
+    Returns:
+        DataFrame or None: The dataset, or None if it has not been loaded in this session.
+    """
+    return dataset_store.get(st.session_state.get(f"{dataset_name}_handle"))
+
+
+def get_session_snapshot_engine():
+    """
+    Returns the snapshot engine for the performance review, benefits and survey data in the current session.
+
+    The engine groups each side table by Employee ID once per data version and is shared across reruns
+    and sessions until the underlying DataFrames change. The dataset store handles are content-addressed,
+    so they serve as the data version and the tables are not hashed again on every rerun.
+
+    Returns:
+        SnapshotEngine: Engine used to render employee snapshots.
+    """
+    dataset_names = ["performance reviews", "benefits enrollment", "engagement survey"]
+    handles = [st.session_state.get(f"{name}_handle") for name in dataset_names]
+    return get_snapshot_engine(
+        *(get_session_df(name) for name in dataset_names),
+        version="datasets:" + "|".join(str(handle) for handle in handles),
+    )
+
+
 def get_employee_snapshot(selected_row_df):
     """
     Generates a detailed employee snapshot by composing information from multiple data sources, including
@@ -42,118 +123,200 @@ def get_employee_snapshot(selected_row_df):
         selected_row_df (DataFrame): A DataFrame containing information about the selected employee.
     
     Returns:
-        str: A formatted string summarizing the employee's details, including role, department, 
-             tenure, salary history, performance reviews, benefits enrollment, and engagement survey responses.
+        EmployeeSnapshot: The employee's details, including role, department, tenure and salary history, and their
+             performance reviews, benefits enrollment and engagement survey responses as separate sections;
+             str() gives the complete snapshot text. Snapshots are cached per employee by the snapshot engine.
     """
-    
-    # Compose basic details about the employee using provided DataFrame columns.
-    employee_details = f"""
-    The employee {selected_row_df['Full Name'].values[0]} is a {selected_row_df['Role'].values[0]} 
-    in the {selected_row_df['Department'].values[0]} department.
-    
-    Below is more information about the employee:
-    - Tenure: {selected_row_df['Tenure'].values[0]} year(s)
-    - Age: {selected_row_df['Age'].values[0]}
-    - Years of Experience: {selected_row_df['Years of Experience'].values[0]}
-    - Starting Salary: {selected_row_df['Starting Salary'].values[0]}
-    - Current Salary: {selected_row_df['Current Salary'].values[0]}
-    - Average Monthly Working Hours: {selected_row_df['Average Monthly Working Hours'].values[0]}
-    - Last Performance Review Score: {selected_row_df['Last Performance Review Score'].values[0]}
-    - Number of Promotions: {selected_row_df['Promotion History'].values[0]}
-    - Months in Role: {selected_row_df['Months in Role'].values[0]}
-    - Location: {selected_row_df['Location'].values[0]}
-    - Contract: {selected_row_df['Contract'].values[0]}
-    """
-
-    # Gather performance review details if available
-    if "performance reviews_df" in st.session_state:
-        df_performance = st.session_state["performance reviews_df"]
-        df_performance = df_performance[df_performance['Employee ID'] == selected_row_df['Employee ID'].values[0]]
-        
-        performance_review = "Previous Performance Reviews of the employee:\n"
-        
-        # Append each performance review to the string
-        for _, row in df_performance.iterrows():
-            performance_review += f"""
-            - Fiscal Quarter: {row['Fiscal Quarter']}
-            - Score: {row['Score']}
-            - Summary: {row['Performance Review Summary']}
-            """
-    else:
-        performance_review = "No performance review data available for the selected employee."
-
-    # Gather benefits enrollment details if available
-    if "benefits enrollment_df" in st.session_state:
-        df_benefits = st.session_state["benefits enrollment_df"]
-        df_benefits = df_benefits[df_benefits['Employee ID'] == selected_row_df['Employee ID'].values[0]]
-        
-        benefits_enrollment = "Benefits Enrollment of the employee:\n"
-        
-        # List each benefit category and enrollment status
-        for _, row in df_benefits.iterrows():
-            category = row["Category"]
-            status = "Enrolled" if row["Enrollment Status"] else "Not Enrolled"
-            benefits_enrollment += f"- {category}: {status}\n"
-    else:
-        benefits_enrollment = "No benefits enrollment data available for the selected employee."
-
-    # Gather engagement survey responses if available
-    if "engagement survey_df" in st.session_state:
-        df_engagement = st.session_state["engagement survey_df"]
-        df_engagement = df_engagement[df_engagement['Employee ID'] == selected_row_df['Employee ID'].values[0]]
-        
-        engagement_survey = "Engagement Survey Responses of the employee:\n"
-        
-        # Append each survey question, score, and comment
-        for _, row in df_engagement.iterrows():
-            question = row["Question"]
-            score = row["Score"]
-            comment = row["Comment"]
-            engagement_survey += f"- {question}: Score = {score}, Comment = \"{comment}\"\n"
-    else:
-        engagement_survey = "No engagement survey data available for the selected employee."
+    return get_session_snapshot_engine().snapshot(selected_row_df)
 
-    # Combine all sections into a single formatted string
-    employee_snapshot = employee_details + "\n" + performance_review + "\n" + benefits_enrollment + "\n" + engagement_survey
-    
-    return employee_snapshot
+
+def get_employee_snapshots(df):
+    """
+    Generates snapshots for many employees in one vectorized pass.
+
+    Parameters:
+        df (DataFrame): A DataFrame containing information about the employees.
+
+    Returns:
+        Series: EmployeeSnapshot of each employee, aligned with the DataFrame's index.
+    """
+    return get_session_snapshot_engine().employee_snapshots(df)
 
 
 @st.cache_resource(show_spinner=False)
-def get_query_engine():
+def get_embed_model():
     """
-    Initializes and returns a query engine for retrieval-augmented generation (RAG) using uploaded or sample PDF documents.
-    Sets up document embeddings and the query engine with an NVIDIA language model.
-    
+    Initializes and returns the NVIDIA embedding model shared by the document and team indexes.
+    Texts embedded before are served from the on-disk embedding cache, whose statistics are exported
+    with the workflow metrics.
+
     Returns:
-        QueryEngine: A query engine configured with embeddings and large language model (LLM) for document-based queries.
+        CachedNVIDIAEmbedding: Embedding model for question-answering retrieval.
+    """
+    from embedding_cache import CachedNVIDIAEmbedding
+
+    embed_model = CachedNVIDIAEmbedding(model="NV-Embed-QA", truncate="END", **endpoint_kwargs())
+    metrics_registry.set_collector("embedding_cache", embed_model.cache.metrics_lines)
+    return embed_model
+
+
+def get_team_context(df, question, max_employees=10):
+    """
+    Retrieves the snapshots of the employees most relevant to a chat question.
+
+    The team index over per-employee snapshot chunks is built once per data version, so the context
+    passed to the LLM stays the same size however many employees are loaded.
+
+    Parameters:
+        df (DataFrame): Employee data for the whole team.
+        question (str): The user's question.
+        max_employees (int): Maximum number of employee snapshots to include.
+
+    Returns:
+        str: Snapshots of the relevant employees, separated by newlines.
     """
-    # Configure text splitter settings for chunking text into manageable pieces
-    Settings.text_splitter = SentenceSplitter(chunk_size=256)
+    from team_index import get_team_index
+
+    team_index = get_team_index(
+        df,
+        get_session_snapshot_engine(),
+        reviews_df=get_session_df("performance reviews"),
+        embed_model=get_embed_model(),
+    )
+    return "\n".join(team_index.retrieve(question, max_employees=max_employees))
+
 
+def get_doc_dir():
+    """
+    Returns the PDF document library used for retrieval: the sample PDFs in demo mode, uploaded PDFs otherwise.
+
+    Returns:
+        str: Path of the document directory.
+    """
     # Set demo mode to false if not explicitly provided
     if 'demo_mode' not in st.session_state:
         st.session_state['demo_mode'] = False
 
-    # Load documents from sample or uploaded files based on demo mode setting
     if st.session_state['demo_mode']:
-        documents = SimpleDirectoryReader("/project/data/sample_pdf").load_data()
-    else:
-        documents = SimpleDirectoryReader("/project/data/uploaded_pdf").load_data()
+        return SAMPLE_PDF_DIR
+    return UPLOADED_PDF_DIR
 
-    # Load embedding model for question-answering capabilities
-    Settings.embed_model = NVIDIAEmbedding(model="NV-Embed-QA", truncate="END")
 
-    # Create a document index for similarity-based retrieval
-    index = VectorStoreIndex.from_documents(documents)
-    
-    # Configure the large language model (LLM) for generating responses
-    Settings.llm = NVIDIA(model="meta/llama-3.1-70b-instruct", max_tokens=1024)
-    
-    # Initialize the query engine with top-K similarity search and streaming enabled
-    query_engine = index.as_query_engine(similarity_top_k=5, streaming=True)
+def get_document_index_version():
+    """
+    Returns the version of the document index in use by the current session.
 
-    return query_engine
+    Returns:
+        str: Identifier that changes whenever a PDF in the library is added, changed or removed.
+    """
+    return get_document_index().version
+
+
+@st.cache_resource(show_spinner=False)
+def get_recommendation_cache():
+    """
+    Returns the process-wide, on-disk cache of generated retention recommendations.
+
+    Returns:
+        RecommendationCache: SQLite-backed cache with LRU and TTL eviction.
+    """
+    return RecommendationCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_step_checkpoints():
+    """
+    Returns the process-wide, on-disk checkpoints of the recommendation workflow steps.
+
+    Returns:
+        StepCheckpointStore: SQLite-backed store of finished step outputs.
+    """
+    return StepCheckpointStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_server():
+    """
+    Starts the workflow metrics endpoint once per process, so every session's runs are exported together.
+
+    Returns:
+        ThreadingHTTPServer or None: The metrics server, or None if its port is already in use.
+    """
+    return start_metrics_server()
+
+
+def get_document_library(doc_dir):
+    """
+    Initializes the live document index of a PDF library, shared by all sessions of the process.
+    The document index is persisted on disk and updated incrementally, so only new or changed PDFs are embedded.
+    Sets up the query engines with an NVIDIA language model.
+
+    The libraries are kept in a module-level registry rather than st.cache_resource, so that refreshes are
+    also shared outside the Streamlit runtime (e.g. by the load tester).
+
+    Parameters:
+        doc_dir (str): Directory containing the PDF documents.
+
+    Returns:
+        DocumentLibrary: Library whose current() version serves retrieval-augmented generation (RAG) queries.
+    """
+    with _document_libraries_lock:
+        if doc_dir in _document_libraries:
+            return _document_libraries[doc_dir]
+
+        from llama_index.core import Settings
+        from llama_index.core.node_parser import SentenceSplitter
+        from http_pool import PooledNVIDIA
+        from rag_index import CHUNK_SIZE, DocumentLibrary
+
+        # Configure text splitter settings for chunking text into manageable pieces
+        Settings.text_splitter = SentenceSplitter(chunk_size=CHUNK_SIZE)
+
+        # Load embedding model for question-answering capabilities
+        Settings.embed_model = get_embed_model()
+
+        # Configure the large language model (LLM) for generating responses; its async requests share the
+        # connection pool of their event loop
+        Settings.llm = PooledNVIDIA(model=LLM_MODEL, max_tokens=1024, **endpoint_kwargs())
+
+        # Initialize the query engine of every index version with top-K similarity search and streaming enabled
+        library = DocumentLibrary(
+            doc_dir, lambda index, filters: index.as_query_engine(similarity_top_k=5, streaming=True, filters=filters)
+        )
+        _document_libraries[doc_dir] = library
+        return library
+
+
+def get_document_index():
+    """
+    Returns the current version of the document index for the sample or uploaded PDFs, based on demo mode.
+    The first call builds the index; later calls return the latest version published by refresh_document_index().
+
+    Returns:
+        DocumentVersion: The document index with its query engine and retrieval cache.
+    """
+    return get_document_library(get_doc_dir()).current()
+
+
+def refresh_document_index():
+    """
+    Upserts PDFs added to the document library since the last refresh into the live index.
+    Every session switches to the new version on its next query.
+
+    Returns:
+        DocumentVersion: The updated document index.
+    """
+    return get_document_library(get_doc_dir()).refresh()
+
+
+def get_query_engine():
+    """
+    Returns a query engine for retrieval-augmented generation (RAG) using uploaded or sample PDF documents.
+
+    Returns:
+        QueryEngine: A query engine configured with embeddings and large language model (LLM) for document-based queries.
+    """
+    return get_document_index().query_engine
 
 
 @st.cache_resource(show_spinner=False)
@@ -164,11 +327,46 @@ def get_chat_engine():
     Returns:
         NVIDIA: A pre-configured LLM instance for chat responses.
     """
+    from llama_index.llms.nvidia import NVIDIA
+
     # Create an LLM instance with a stable temperature setting for more controlled responses
-    llm = NVIDIA(model="meta/llama-3.1-70b-instruct", temperature=0, streaming=True)
+    llm = NVIDIA(model=LLM_MODEL, temperature=0, streaming=True, **endpoint_kwargs())
     return llm
 
 
+def warm_up():
+    """
+    Loads the LLM dependencies and builds the chat engine and both document indexes ahead of the first request,
+    timing each stage in the startup report. A stage that fails (e.g. without an API key) is logged and skipped;
+    the page that needs it retries on first use.
+    """
+    stages = [
+        ("warm-up: import workflow", lambda: importlib.import_module("workflow")),
+        ("warm-up: chat engine", get_chat_engine),
+        ("warm-up: uploaded document index", lambda: get_document_library(UPLOADED_PDF_DIR).current()),
+        ("warm-up: sample document index", lambda: get_document_library(SAMPLE_PDF_DIR).current()),
+    ]
+    for phase, stage in stages:
+        try:
+            with startup_report.timed(phase):
+                stage()
+        except Exception:
+            pass
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """
+    Runs warm_up() in a background thread, once per process, so pages render without waiting for it.
+
+    Returns:
+        Thread: The warm-up thread.
+    """
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
 def create_pdf(text):
     """
     Creates a PDF document from the provided text.
@@ -180,6 +378,8 @@ def create_pdf(text):
         bytes: PDF file data in bytes for download or further processing.
     """
     # Initialize PDF with auto page break and set font
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -271,6 +471,8 @@ def get_best_match(col_name, expected_columns, used_mappings, threshold=80):
     Returns:
         str: Best match or "No mapping available" if no match found.
     """
+    from fuzzywuzzy import process
+
     match = process.extractOne(col_name, expected_columns)
     if match and match[1] >= threshold and match[0] not in used_mappings:
         return match[0]
@@ -280,6 +482,9 @@ def get_best_match(col_name, expected_columns, used_mappings, threshold=80):
 def auto_map_columns(df_columns, expected_columns, threshold=80):
     """
     Automatically map DataFrame columns to expected columns using fuzzy matching.
+
+    The assignment is solved globally over all column pairs, so each expected column goes to the uploaded
+    column that matches it best overall, and results are memoized across reruns.
     
     Args:
         df_columns (list): List of DataFrame column names.
@@ -289,16 +494,9 @@ def auto_map_columns(df_columns, expected_columns, threshold=80):
     Returns:
         dict: Mapping of DataFrame columns to expected columns.
     """
-    mappings = {}
-    used_mappings = []
-    
-    for col in df_columns:
-        mapped_col = get_best_match(col, expected_columns, used_mappings, threshold)
-        mappings[col] = mapped_col
-        if mapped_col != "No mapping available":
-            used_mappings.append(mapped_col)
+    from column_mapping import solve_mapping
 
-    return mappings
+    return solve_mapping(list(df_columns), list(expected_columns), threshold)
 
 
 def render_mapping_ui(df_columns, mappings, expected_columns):
@@ -333,7 +531,7 @@ def render_mapping_ui(df_columns, mappings, expected_columns):
     return manual_mappings
 
 
-def save_mappings(manual_mappings, mappings, session_key):
+def save_mappings(manual_mappings, mappings, session_key, expected_columns=None, df=None):
     """
     Save final mappings to session state and check for uniqueness.
     
@@ -341,6 +539,10 @@ def save_mappings(manual_mappings, mappings, session_key):
         manual_mappings (dict): User-selected mappings.
         mappings (dict): Auto-generated mappings.
         session_key (str): Session state key for storing mappings.
+        expected_columns (list): List of expected column names; if given, the mappings are also saved
+            as the profile for this file layout.
+        df (DataFrame): Uploaded data; if given, the mappings are only saved if its mapped columns can be
+            converted to their declared types.
     """
     final_mappings = {col: manual_mappings.get(col, mappings[col]) for col in mappings}
     reverse_mappings = {}
@@ -354,8 +556,33 @@ def save_mappings(manual_mappings, mappings, session_key):
     
     if duplicate_mappings:
         st.warning(f"Warning: The following columns have multiple mappings: {duplicate_mappings}")
+    elif df is not None and not mapped_values_valid(df, final_mappings):
+        return
     else:
         st.session_state[session_key] = final_mappings
+        if expected_columns is not None:
+            from column_mapping import save_profile
+            save_profile(list(mappings), expected_columns, final_mappings)
+
+
+def mapped_values_valid(df, column_mappings):
+    """
+    Checks that the columns of an uploaded file can be converted to their declared types once mapped, and shows
+    the problem otherwise (e.g. an enrollment status that is not a True/False value).
+
+    Args:
+        df (DataFrame): Uploaded data as a DataFrame.
+        column_mappings (dict): Mapping of the file's column names to the expected names.
+
+    Returns:
+        bool: Whether the mapped data is valid.
+    """
+    try:
+        rename_and_filter_columns(df, column_mappings)
+    except ValueError as e:
+        st.error(f"The file cannot be used with this field mapping: {e}")
+        return False
+    return True
 
 
 @st.dialog(title="Field Mapping Preview", width="large")
@@ -373,8 +600,9 @@ def show_column_mapping_interface(df, expected_columns, session_key):
     manual_mappings = render_mapping_ui(df_columns, mappings, expected_columns)
     
     if st.button("Save"):
-        save_mappings(manual_mappings, mappings, session_key)
-        st.rerun()
+        save_mappings(manual_mappings, mappings, session_key, expected_columns, df)
+        if session_key in st.session_state:
+            st.rerun()
     
     if session_key in st.session_state:
         st.success('Saved Successfully')
@@ -405,16 +633,32 @@ def handle_csv_upload(csv_name, expected_columns, session_key, sample_file_path)
     if st.session_state.get("demo_mode"):
         # Load and display sample data if demo mode is active
         with st.expander("Expand to see the data"):
-            df = pd.read_csv(sample_file_path, sep=None, engine="python")  # Load sample CSV file
-            st.session_state[f"{csv_name.lower()}_df"] = df  # Save DataFrame in session state
-            st.dataframe(df, hide_index=True)  # Display data table in the app
+            handle = dataset_store.put_csv(sample_file_path)  # Load sample CSV file into the shared dataset store
+            st.session_state[f"{csv_name.lower()}_handle"] = handle  # Save only the dataset handle in session state
+            st.dataframe(dataset_store.get(handle), hide_index=True)  # Display data table in the app
     else:
         # Allow user to upload a CSV file for the specific category
         with st.expander("Expand to upload"):
             uploaded_file = upload_file(f"Choose CSV file with {csv_name.lower()} data")
             if uploaded_file and session_key not in st.session_state:
-                # Load uploaded CSV file and save it in session state
-                df = pd.read_csv(uploaded_file, sep=None, engine="python")
-                st.session_state[f"{csv_name.lower()}_df"] = df
-                # Show interface to map columns to match expected structure
-                show_column_mapping_interface(df, expected_columns, session_key)
+                # Load uploaded CSV file into the shared dataset store; a file whose values do not fit the declared
+                # column types is rejected without keeping its handle
+                try:
+                    handle = dataset_store.put_csv(uploaded_file)
+                except ValueError as e:
+                    st.error(f"Could not read {uploaded_file.name}: {e}")
+                    return
+                df = dataset_store.get(handle)
+                # Reuse the confirmed mapping of a previously seen file layout, otherwise ask the user to map columns
+                from column_mapping import load_profile
+                saved_mappings = load_profile(list(df.columns), expected_columns)
+                if saved_mappings is not None and not mapped_values_valid(df, saved_mappings):
+                    return
+                # Save only the dataset handle in session state
+                st.session_state[f"{csv_name.lower()}_handle"] = handle
+                if saved_mappings is not None:
+                    st.session_state[session_key] = saved_mappings
+                    st.toast(f"Applied the saved field mapping for this {csv_name.lower()} file layout")
+                    st.rerun()
+                else:
+                    show_column_mapping_interface(df, expected_columns, session_key)
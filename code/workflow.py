@@ -4,7 +4,11 @@ from llama_index.llms.nvidia import NVIDIA
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core import Settings
 import os
+import time
+import uuid
 import asyncio
+from contextlib import contextmanager
+from typing import Optional, Union
 from llama_index.core.workflow import (
     Event,
     StartEvent,
@@ -13,8 +17,51 @@ from llama_index.core.workflow import (
     Context,
     step,
 )
+from llama_index.core.schema import QueryBundle
+from llama_index.core.workflow.errors import WorkflowTimeoutError
 import streamlit as st
-from utils import get_query_engine
+from utils import LLM_MODEL, get_document_index
+from recommendation_cache import recommendation_key
+from streaming import StreamMetrics, atimed_stream, format_metrics
+from telemetry import StepMetrics, count_tokens, record_step, record_run
+from snapshots import EmployeeSnapshot
+
+
+# Version of the workflow prompts; bump it whenever a prompt changes so cached recommendations are regenerated
+PROMPT_VERSION = "3"
+
+# Minimum seconds between partial-output updates of a streaming analysis step
+PARTIAL_UPDATE_INTERVAL = 0.1
+
+# Seconds before the workflow timeout at which synthesis starts from the analyses finished so far, leaving it
+# time to complete instead of the whole run failing with a timeout
+SYNTHESIS_RESERVE_SECONDS = 30
+
+# Snapshot sections each analysis step is given, most important first, and the token budget for them;
+# review and survey text beyond the budget is left out
+STEP_CONTEXT = {
+    "compensation": (["details"], 400),
+    "performance reviews": (["details", "reviews"], 1500),
+    "benefits": (["details", "benefits"], 600),
+    "survey": (["details", "survey"], 1500),
+}
+
+# Short retrieval query each analysis step searches the document library with. The queries do not depend on
+# the employee, so their results are cached and shared by all recommendations. Synthesis only combines the
+# analyses and does not retrieve.
+STEP_RETRIEVAL_QUERIES = {
+    "compensation": "Industry salary benchmarks and typical salary growth by role",
+    "performance reviews": "Industry trends in performance management, career development and attrition",
+    "benefits": "Employee benefits policies and industry benchmarks for benefits enrollment",
+    "survey": "Industry trends in employee engagement, work-life balance and retention",
+}
+
+# Document types (the PDF upload keys) searched by the steps that need only one kind of document; the other
+# steps search all documents. Documents without a type are always searched.
+STEP_DOC_TYPES = {
+    "compensation": ["industry"],
+    "benefits": ["benefits"],
+}
 
 
 # Define the events for the workflow
@@ -38,15 +85,294 @@ class SurveyEvent(Event):
     response: str
 
 
+class DeadlineEvent(Event):
+    """Event sent when synthesis must start to finish before the workflow timeout."""
+
+
 # Define the workflow for employee retention analysis
 class RetentionFlow(Workflow):
     """
     Workflow class to analyze various aspects (compensation, performance reviews, benefits, surveys) of an employee's data 
     and provide retention recommendations based on aggregated analysis.
+
+    The four analysis steps all consume the StartEvent and run concurrently; synthesize_responses
+    joins their events and starts as soon as the last analysis arrives.
+
+    The employee snapshot is passed to run() as employee_snapshot, and progress is reported through an
+    optional callback, so the workflow can also run outside the Streamlit script (e.g. in batch mode).
+
+    Each run uses the document index version that is current when it starts, so a PDF upload during a
+    run takes effect from the next run on.
+
+    With a checkpoint store, every finished analysis is checkpointed under the employee's recommendation key,
+    and a later run for the same inputs (e.g. a retry after a failure or timeout) resumes those analyses
+    instead of running them again. If analyses are still running SYNTHESIS_RESERVE_SECONDS before the
+    timeout, synthesis starts from the ones that have finished; missing_analyses then names the others.
     """
     
-    # Initialize query engine for LLM-based analysis
-    query_engine = get_query_engine()
+    # Analysis events that must all arrive before synthesis can start, and the labels their steps report under
+    analysis_events = [CompEvent, ReviewsEvent, BenefitsEvent, SurveyEvent]
+    analysis_labels = ["compensation", "performance reviews", "benefits", "survey"]
+
+    # Context data key each analysis is stored under
+    analysis_keys = {
+        "compensation": "comp_analysis",
+        "performance reviews": "reviews_analysis",
+        "benefits": "benefits_analysis",
+        "survey": "survey_analysis",
+    }
+
+    # Workflow step that makes the LLM request of each label, as reported in the step metrics
+    step_names = {
+        "compensation": "analyse_comp",
+        "performance reviews": "analyse_reviews",
+        "benefits": "analyse_benefits",
+        "survey": "analyse_survey",
+        "synthesis": "synthesize_responses",
+    }
+
+    def __init__(self, *args, progress_callback=None, partial_callback=None, stream_output=True, rate_limiter=None,
+                 document_index=None, checkpoints=None, **kwargs):
+        """
+        Parameters:
+            progress_callback (callable or None): Called with (percent, text) as the analyses finish; percent 100 means done.
+            partial_callback (callable or None): Called on the event loop with (label, text so far) while an analysis streams.
+            stream_output (bool): Whether to stream the final recommendation into the Streamlit page.
+            rate_limiter (RateLimiter or None): Limiter awaited before every LLM request.
+            document_index (DocumentVersion or None): Document index version to run on; None uses the session's
+                current version at the start of each run, which needs a Streamlit script run.
+            checkpoints (StepCheckpointStore or None): Store the analyses are checkpointed to and resumed from;
+                None disables checkpointing.
+            *args, **kwargs: Passed on to Workflow (e.g. timeout, verbose).
+        """
+        super().__init__(*args, **kwargs)
+        self.progress_callback = progress_callback
+        self.partial_callback = partial_callback
+        self.stream_output = stream_output
+        self.rate_limiter = rate_limiter
+        self.pinned_document_index = document_index
+        self.checkpoints = checkpoints
+        self.checkpoint_key = None
+        self.resumed_analyses = []
+        self.missing_analyses = []
+        self.run_id = None
+        self.document_index = None
+        self._context_tokens = {}
+
+    def run(self, *args, **kwargs):
+        """
+        Starts a run under a new run ID on the pinned or current document index, recording the run's total time and
+        outcome when it ends.
+
+        Returns:
+            WorkflowHandler: Future of the run's result, as returned by Workflow.run().
+        """
+        self.run_id = run_id = uuid.uuid4().hex
+        self.document_index = (
+            self.pinned_document_index if self.pinned_document_index is not None else get_document_index()
+        )
+        self._context_tokens = {}
+        self.resumed_analyses = []
+        self.missing_analyses = []
+        started_at = time.perf_counter()
+
+        # Checkpoints are keyed like the recommendation, so they are only resumed for the same inputs
+        if self.checkpoints is not None:
+            self.checkpoint_key = recommendation_key(
+                kwargs.get("employee_snapshot"), PROMPT_VERSION, LLM_MODEL, self.document_index.version
+            )
+
+        def _record(handler):
+            if handler.cancelled():
+                outcome = "cancelled"
+            elif handler.exception() is None:
+                outcome = "ok"
+            else:
+                outcome = "timeout" if isinstance(handler.exception(), WorkflowTimeoutError) else "error"
+            record_run(run_id, time.perf_counter() - started_at, outcome)
+
+        handler = super().run(*args, **kwargs)
+        handler.add_done_callback(_record)
+        return handler
+
+    def _employee_context(self, employee_snapshot, label):
+        """
+        Returns the part of the employee snapshot an analysis step needs, within the step's token budget.
+
+        Parameters:
+            employee_snapshot (EmployeeSnapshot or str): Snapshot the workflow was started with.
+            label (str): Name of the analysis step.
+
+        Returns:
+            str: The snapshot sections for the step; plain text snapshots are returned whole.
+        """
+        if isinstance(employee_snapshot, EmployeeSnapshot):
+            section_names, max_tokens = STEP_CONTEXT[label]
+            context = employee_snapshot.context(section_names, max_tokens)
+            snapshot_tokens = employee_snapshot.token_count
+        else:
+            context = str(employee_snapshot)
+            snapshot_tokens = count_tokens(context)
+
+        # Remember what sending the whole snapshot would have cost, for the step metrics
+        self._context_tokens[label] = (snapshot_tokens, count_tokens(context))
+        return context
+
+    @contextmanager
+    def _step_metrics(self, label, stream_metrics):
+        """
+        Collects the metrics of a step's LLM request and records them when the block ends, also if it fails.
+
+        Parameters:
+            label (str): Name of the step the request is made for.
+            stream_metrics (StreamMetrics): Metrics of the request's streamed response.
+
+        Yields:
+            StepMetrics: Metrics the block fills in.
+        """
+        step_metrics = StepMetrics(self.step_names[label], self.run_id)
+        step_metrics.snapshot_tokens, step_metrics.context_tokens = self._context_tokens.get(label, (None, None))
+        error = None
+        try:
+            yield step_metrics
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            step_metrics.add_stream(stream_metrics)
+            step_metrics.finish(error)
+            record_step(step_metrics)
+
+    async def _retrieve(self, query, step_metrics, doc_types=None):
+        """
+        Searches the document library, serving repeated queries from the retrieval cache of the index version.
+        The query is embedded with an async request, so other steps and workflows keep running meanwhile.
+
+        Parameters:
+            query (str): Retrieval query.
+            step_metrics (StepMetrics): Metrics the embedding and search time are recorded in.
+            doc_types (list or None): Document types to search; None searches all documents.
+
+        Returns:
+            list: The retrieved nodes (NodeWithScore).
+        """
+        nodes = self.document_index.retrieval_cache.get(query)
+        if nodes is not None:
+            step_metrics.retrieval_cached = True
+            return nodes
+
+        query_bundle = QueryBundle(query)
+        with step_metrics.timed("embedding_seconds"):
+            query_bundle.embedding = await Settings.embed_model.aget_agg_embedding_from_queries(
+                query_bundle.embedding_strs
+            )
+        with step_metrics.timed("retrieval_seconds"):
+            nodes = await self.document_index.aretrieve(query_bundle, doc_types)
+
+        self.document_index.retrieval_cache.put(query, nodes)
+        return nodes
+
+    async def _start_query(self, prompt, label, step_metrics):
+        """
+        Starts the streamed LLM response of a step with the async LLM API.
+
+        Analysis steps answer from the documents retrieved with their short retrieval query rather than the
+        whole prompt, searching only the document types they need; synthesis sends its prompt straight to the LLM.
+
+        Parameters:
+            prompt (str): Prompt of the step.
+            label (str): Name of the step.
+            step_metrics (StepMetrics): Metrics the stage timings and prompt size are recorded in.
+
+        Returns:
+            async generator: The streamed response text chunks.
+        """
+        retrieval_query = STEP_RETRIEVAL_QUERIES.get(label)
+        if retrieval_query is None:
+            step_metrics.prompt_tokens = count_tokens(prompt)
+            response_gen = await Settings.llm.astream_complete(prompt)
+            return (chunk.delta async for chunk in response_gen)
+
+        nodes = await self._retrieve(retrieval_query, step_metrics, STEP_DOC_TYPES.get(label))
+        step_metrics.prompt_tokens = count_tokens(prompt) + sum(count_tokens(n.node.get_content()) for n in nodes)
+        response = await self.document_index.query_engine.asynthesize(QueryBundle(prompt), nodes)
+        return response.async_response_gen()
+
+    async def _query(self, prompt, label):
+        """
+        Sends a step's LLM request and collects its streamed response without blocking the event loop, so the
+        analysis steps, and the steps of other workflows on the same loop, overlap.
+
+        Time-to-first-token and tokens per second are recorded for every request, together with the step's
+        embedding and retrieval time and token counts, and the partial response is forwarded to the partial
+        callback as it streams in. With a checkpoint store, an analysis checkpointed by an earlier run is
+        returned without a request, and a newly finished one is checkpointed.
+
+        Parameters:
+            prompt (str): Prompt to send to the query engine.
+            label (str): Name of the step the request is made for.
+
+        Returns:
+            str: The full response text, with all streamed chunks joined.
+        """
+        # Resume an analysis finished by an earlier run for the same inputs
+        checkpointed = label in self.analysis_keys and self.checkpoint_key is not None
+        if checkpointed:
+            full_response = await asyncio.to_thread(self.checkpoints.get, self.checkpoint_key, label)
+            if full_response is not None:
+                self.resumed_analyses.append(label)
+                if self.partial_callback is not None:
+                    self.partial_callback(label, full_response)
+                return full_response
+
+        # Respect the LLM endpoint's rate limit before sending the request
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+
+        metrics = StreamMetrics(label)
+        with self._step_metrics(label, metrics) as step_metrics:
+            response_gen = await self._start_query(prompt, label, step_metrics)
+
+            # Collect the streamed response chunks, publishing the partial text at most every PARTIAL_UPDATE_INTERVAL
+            chunks = []
+            last_update = 0.0
+            async for chunk in atimed_stream(response_gen, metrics):
+                chunks.append(chunk)
+                if self.partial_callback is not None and time.perf_counter() - last_update >= PARTIAL_UPDATE_INTERVAL:
+                    self.partial_callback(label, ''.join(chunks))
+                    last_update = time.perf_counter()
+
+        full_response = ''.join(chunks)
+        if checkpointed:
+            await asyncio.to_thread(self.checkpoints.put, self.checkpoint_key, label, full_response)
+        if self.partial_callback is not None:
+            self.partial_callback(label, full_response)
+        return full_response
+
+    def _report_progress(self, ctx, label):
+        """
+        Marks an analysis as finished and advances the progress bar, regardless of completion order.
+
+        Parameters:
+            ctx (Context): Workflow context holding the list of finished analyses.
+            label (str): Human-readable name of the analysis that just finished.
+        """
+        completed = ctx.data.setdefault('completed_analyses', [])
+        completed.append(label)
+
+        total = len(self.analysis_events)
+        self._set_progress(int(len(completed) / total * 95), f"Finished {label} analysis ({len(completed)}/{total})...")
+
+    def _set_progress(self, percent, text):
+        """
+        Forwards a progress update to the progress callback, if one was given.
+
+        Parameters:
+            percent (int): Progress between 0 and 100.
+            text (str): Description of the current stage.
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(percent, text)
 
     @step(pass_context=True)
     async def analyse_comp(self, ctx: Context, ev: StartEvent) -> CompEvent:
@@ -60,8 +386,8 @@ class RetentionFlow(Workflow):
         Returns:
             CompEvent: Contains the analysis response.
         """
-        # Display progress for the compensation analysis
-        st.session_state['progress_bar'] = st.progress(0, text="Analyzing compensation data...")
+        # Give the step only the snapshot sections it needs
+        employee_context = self._employee_context(ev.employee_snapshot, "compensation")
 
         # Define prompt with questions on salary comparison and growth for the employee
         prompt = f"""
@@ -71,39 +397,32 @@ class RetentionFlow(Workflow):
         2. Consider starting and current salary of the employee. How does the salary growth compare to industry standard?
         -----------------------------------
         The employee with high risk of attrition is:
-        {st.session_state['employee_snapshot']}
+        {employee_context}
         """
 
-        # Query the language model with the prompt
-        response = self.query_engine.query(prompt)
-
-        # Stream and collect the response chunks for real-time frontend updates
-        chunks = []
-        for chunk in response.response_gen:
-            chunks.append(chunk)
-
-        # Join chunks to form a complete response string
-        full_response = ''.join(chunks)
+        # Query the language model off the event loop so the other analyses can run concurrently
+        full_response = await self._query(prompt, "compensation")
 
         # Store the full response in context for downstream use
         ctx.data['comp_analysis'] = full_response
+        self._report_progress(ctx, "compensation")
 
         return CompEvent(response=full_response)
 
     @step(pass_context=True)
-    async def analyse_reviews(self, ctx: Context, ev: CompEvent) -> ReviewsEvent:
+    async def analyse_reviews(self, ctx: Context, ev: StartEvent) -> ReviewsEvent:
         """
         Analyzes the performance reviews for the employee and returns a reviews analysis event.
 
         Parameters:
             ctx (Context): Workflow context to store intermediate data.
-            ev (CompEvent): Event containing compensation analysis results.
+            ev (StartEvent): Starting event to trigger the performance reviews analysis.
 
         Returns:
             ReviewsEvent: Contains the analysis response.
         """
-        # Update progress bar to show analysis status
-        st.session_state['progress_bar'].progress(25, text="Analyzing performance reviews...")
+        # Give the step only the snapshot sections it needs
+        employee_context = self._employee_context(ev.employee_snapshot, "performance reviews")
 
         # Define prompt to analyze performance reviews and provide retention insights
         prompt = f"""
@@ -113,37 +432,32 @@ class RetentionFlow(Workflow):
                 2. How do the performance reviews align with the attrition risk?
                 -----------------------------------
                 The employee with high risk of attrition is:
-                {st.session_state['employee_snapshot']}
+                {employee_context}
                 """
 
-        # Query the language model with the prompt
-        response = self.query_engine.query(prompt)
-
-        # Stream and collect response chunks
-        chunks = []
-        for chunk in response.response_gen:
-            chunks.append(chunk)
+        # Query the language model off the event loop so the other analyses can run concurrently
+        full_response = await self._query(prompt, "performance reviews")
 
-        # Form the complete response and store in context
-        full_response = ''.join(chunks)
+        # Store the full response in context and advance the progress bar
         ctx.data['reviews_analysis'] = full_response
+        self._report_progress(ctx, "performance reviews")
 
         return ReviewsEvent(response=full_response)
 
     @step(pass_context=True)
-    async def analyse_benefits(self, ctx: Context, ev: ReviewsEvent) -> BenefitsEvent:
+    async def analyse_benefits(self, ctx: Context, ev: StartEvent) -> BenefitsEvent:
         """
         Analyzes the benefits enrollment for the employee and returns a benefits analysis event.
 
         Parameters:
             ctx (Context): Workflow context to store intermediate data.
-            ev (ReviewsEvent): Event containing performance reviews analysis results.
+            ev (StartEvent): Starting event to trigger the benefits analysis.
 
         Returns:
             BenefitsEvent: Contains the analysis response.
         """
-        # Update progress bar for benefits analysis
-        st.session_state['progress_bar'].progress(50, text="Analyzing employee benefits...")
+        # Give the step only the snapshot sections it needs
+        employee_context = self._employee_context(ev.employee_snapshot, "benefits")
 
         # Define prompt to assess benefits usage and potential improvements for retention
         prompt = f"""
@@ -154,37 +468,32 @@ class RetentionFlow(Workflow):
                 Use the benefits documentation for reference.
                 -----------------------------------
                 The employee with high risk of attrition is:
-                {st.session_state['employee_snapshot']}
+                {employee_context}
                 """
 
-        # Query the language model with the prompt
-        response = self.query_engine.query(prompt)
-
-        # Stream and collect response chunks
-        chunks = []
-        for chunk in response.response_gen:
-            chunks.append(chunk)
+        # Query the language model off the event loop so the other analyses can run concurrently
+        full_response = await self._query(prompt, "benefits")
 
-        # Form the complete response and store in context
-        full_response = ''.join(chunks)
+        # Store the full response in context and advance the progress bar
         ctx.data['benefits_analysis'] = full_response
+        self._report_progress(ctx, "benefits")
 
         return BenefitsEvent(response=full_response)
 
     @step(pass_context=True)
-    async def analyse_survey(self, ctx: Context, ev: BenefitsEvent) -> SurveyEvent:
+    async def analyse_survey(self, ctx: Context, ev: StartEvent) -> SurveyEvent:
         """
         Analyzes the engagement survey results for the employee and returns a survey analysis event.
 
         Parameters:
             ctx (Context): Workflow context to store intermediate data.
-            ev (BenefitsEvent): Event containing benefits analysis results.
+            ev (StartEvent): Starting event to trigger the survey analysis.
 
         Returns:
             SurveyEvent: Contains the analysis response.
         """
-        # Update progress bar for survey analysis
-        st.session_state['progress_bar'].progress(75, text="Analyzing survey results...")
+        # Give the step only the snapshot sections it needs
+        employee_context = self._employee_context(ev.employee_snapshot, "survey")
 
         # Define prompt to interpret survey data and suggest retention improvements
         prompt = f"""
@@ -194,38 +503,77 @@ class RetentionFlow(Workflow):
                 2. Are there any areas of improvement based on the survey responses?
                 -----------------------------------
                 The employee with high risk of attrition is:
-                {st.session_state['employee_snapshot']}
+                {employee_context}
                 """
 
-        # Query the language model with the prompt
-        response = self.query_engine.query(prompt)
+        # Query the language model off the event loop so the other analyses can run concurrently
+        full_response = await self._query(prompt, "survey")
 
-        # Stream and collect response chunks
-        chunks = []
-        for chunk in response.response_gen:
-            chunks.append(chunk)
-
-        # Form the complete response and store in context
-        full_response = ''.join(chunks)
+        # Store the full response in context and advance the progress bar
         ctx.data['survey_analysis'] = full_response
+        self._report_progress(ctx, "survey")
 
         return SurveyEvent(response=full_response)
 
     @step(pass_context=True)
-    async def synthesize_responses(self, ctx: Context, ev: SurveyEvent) -> StopEvent:
+    async def synthesis_deadline(self, ctx: Context, ev: StartEvent) -> Optional[DeadlineEvent]:
+        """
+        Waits until SYNTHESIS_RESERVE_SECONDS before the workflow timeout, then tells synthesis to start.
+        The wait is cancelled when the run ends earlier.
+
+        Parameters:
+            ctx (Context): Workflow context.
+            ev (StartEvent): Starting event of the run.
+
+        Returns:
+            Optional[DeadlineEvent]: The deadline, or None if the timeout leaves no time to reserve.
+        """
+        if self._timeout is None or self._timeout <= SYNTHESIS_RESERVE_SECONDS:
+            return None
+
+        await asyncio.sleep(self._timeout - SYNTHESIS_RESERVE_SECONDS)
+        return DeadlineEvent()
+
+    @step(pass_context=True)
+    async def synthesize_responses(
+        self, ctx: Context, ev: Union[CompEvent, ReviewsEvent, BenefitsEvent, SurveyEvent, DeadlineEvent]
+    ) -> Optional[StopEvent]:
         """
-        Synthesizes the analysis from compensation, reviews, benefits, and survey data 
-        to generate a final retention recommendation for the employee.
+        Joins the four concurrent analyses and, once the last one arrives, synthesizes them
+        into a final retention recommendation for the employee. If the deadline arrives first,
+        synthesizes from the analyses finished so far.
 
         Parameters:
             ctx (Context): Workflow context to store intermediate data.
-            ev (SurveyEvent): Event containing survey analysis results.
+            ev (CompEvent | ReviewsEvent | BenefitsEvent | SurveyEvent | DeadlineEvent): Event from one of the
+                analysis steps, or the synthesis deadline.
 
         Returns:
-            StopEvent: Contains the final retention recommendations.
+            Optional[StopEvent]: Contains the final retention recommendations, or None while analyses are still pending.
         """
-        # Update progress bar for final synthesis step
-        st.session_state['progress_bar'].progress(99, text="Summarizing...")
+        # Synthesis runs once, from the last analysis or from the deadline, whichever comes first
+        if ctx.data.get('synthesis_started'):
+            return None
+
+        if isinstance(ev, DeadlineEvent):
+            # Synthesize from the finished analyses, unless there are none to synthesize from
+            self.missing_analyses = [label for label in self.analysis_labels
+                                     if self.analysis_keys[label] not in ctx.data]
+            if len(self.missing_analyses) == len(self.analysis_labels):
+                return None
+        elif ctx.collect_events(ev, self.analysis_events) is None:
+            # Wait until all four analysis events have been received, in whatever order they finish
+            return None
+        ctx.data['synthesis_started'] = True
+
+        # Analyses that did not finish in time are marked as unavailable in the prompt
+        analyses = {
+            label: ctx.data.get(key, "Not available: the analysis did not finish in time.")
+            for label, key in self.analysis_keys.items()
+        }
+
+        # Update progress for final synthesis step
+        self._set_progress(99, "Summarizing...")
 
         # Define prompt for synthesizing comprehensive retention recommendations
         prompt = f"""
@@ -239,40 +587,79 @@ class RetentionFlow(Workflow):
                 
                 Keep your recommendations concise and to the point.
                 -----------------------------------
-                Compensation analysis: {ctx.data['comp_analysis']}
+                Compensation analysis: {analyses['compensation']}
                 -----------------------------------
-                Performance reviews analysis: {ctx.data['reviews_analysis']}
+                Performance reviews analysis: {analyses['performance reviews']}
                 -----------------------------------
-                Benefits enrollment analysis: {ctx.data['benefits_analysis']}
+                Benefits enrollment analysis: {analyses['benefits']}
                 -----------------------------------
-                Engagement survey analysis: {ctx.data['survey_analysis']}
+                Engagement survey analysis: {analyses['survey']}
                 """
 
-        # Query the language model with the final prompt
-        response = self.query_engine.query(prompt)
-
-        # Clear progress bar after final analysis
-        st.session_state['progress_bar'].empty()
-
-        # Stream and collect response chunks for final output
-        chunks = []
-        for chunk in st.write_stream(response.response_gen):
-            chunks.append(chunk)
+        # Without a page to stream into, just collect the recommendation
+        if not self.stream_output:
+            full_response = await self._query(prompt, "synthesis")
+            self._set_progress(100, "Done")
+            return StopEvent(result=full_response)
 
-        # Form the complete recommendation response
-        full_response = ''.join(chunks)
+        # Query the language model with the final prompt
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        metrics = StreamMetrics("synthesis")
+        with self._step_metrics("synthesis", metrics) as step_metrics:
+            response_gen = await self._start_query(prompt, "synthesis", step_metrics)
+
+            # Clear progress bar after final analysis
+            self._set_progress(100, "Done")
+
+            # Stream the recommendation into the page token by token and collect the complete response
+            placeholder = st.empty()
+            chunks = []
+            async for chunk in atimed_stream(response_gen, metrics):
+                chunks.append(chunk)
+                placeholder.markdown(''.join(chunks))
+            full_response = ''.join(chunks)
+        st.caption(format_metrics(metrics))
 
         return StopEvent(result=full_response)
 
 
-async def run_workflow():
+async def run_workflow(employee_snapshot=None):
     """
     Initiates and runs the RetentionFlow workflow with a specified timeout and verbosity.
+    The four analysis steps fan out from the start event and run concurrently.
+
+    Parameters:
+        employee_snapshot (EmployeeSnapshot, str or None): Snapshot of the employee; defaults to the one in session state.
     
     Returns:
         StopEvent: Final event containing comprehensive retention recommendations.
     """
-    w = RetentionFlow(timeout=120, verbose=True)
-    result = await w.run()
+    if employee_snapshot is None:
+        employee_snapshot = st.session_state['employee_snapshot']
+
+    # Display progress bar shared by the concurrently running analysis steps
+    st.session_state['progress_bar'] = st.progress(0, text="Analyzing employee data...")
+
+    # Show each analysis as it streams in, in its own collapsible section
+    analysis_placeholders = {}
+    for label in RetentionFlow.analysis_labels:
+        with st.expander(f"{label.capitalize()} analysis"):
+            analysis_placeholders[label] = st.empty()
+
+    def show_partial_analysis(label, text):
+        if label in analysis_placeholders:
+            analysis_placeholders[label].markdown(text)
+
+    def update_progress_bar(percent, text):
+        # Remove the progress bar once the recommendation starts streaming
+        if percent >= 100:
+            st.session_state['progress_bar'].empty()
+        else:
+            st.session_state['progress_bar'].progress(percent, text=text)
+
+    w = RetentionFlow(timeout=120, verbose=True, progress_callback=update_progress_bar,
+                      partial_callback=show_partial_analysis)
+    result = await w.run(employee_snapshot=employee_snapshot)
     return result
 